@@ -0,0 +1,175 @@
+# bench_records.py
+# This script will handle benchmarking the record save/load paths and the dashboard payload
+# builders at several dataset sizes. It runs offline against a throw-away data directory filled
+# with synthetic records (no Streamlit server needed), reports throughput and peak Python memory
+# for every step, and saves the results as JSON under benchmarks/results/ so each run can be
+# compared with the previous one.
+#
+# Usage:
+#   python -m benchmarks.bench_records                    # 1k, 10k and 100k SOAP notes
+#   python -m benchmarks.bench_records --sizes 1000 10000
+#
+#=======================================================================================
+
+import argparse
+import glob
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime
+
+from utils import data_handler, record_cache, record_store, synthetic_data, write_log
+from utils.dashboard_payloads import build_progress_series, build_radar_data, build_rom_data
+from utils.metric_series import cohort_frame
+from utils.visit_metrics import load_visit_metrics
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+VISITS_PER_PATIENT = 50
+
+
+def measure(name, operations, func):
+    # Run func once, returning throughput and the peak memory allocated while it ran
+    tracemalloc.start()
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result = {
+        "name": name,
+        "operations": operations,
+        "seconds": round(elapsed, 4),
+        "ops_per_second": round(operations / elapsed, 1) if elapsed else None,
+        "peak_memory_mb": round(peak / 1024 / 1024, 2),
+    }
+    print(f"  {name:<28} {operations:>8} ops  {elapsed:8.3f}s  {result['ops_per_second']:>10} ops/s"
+          f"  {result['peak_memory_mb']:>8} MB")
+    return result
+
+
+def run_size(size, seed=0):
+    num_patients = max(1, size // VISITS_PER_PATIENT)
+    visits = synthetic_data.generate_visits(num_patients, size // num_patients, seed=seed)
+    soap_notes = list(synthetic_data.soap_records(visits, seed))
+    people = list(synthetic_data.patient_records(visits, seed))
+    patient_ids = [patient_info["patient_id"] for patient_info, _ in people]
+
+    data_dir = tempfile.mkdtemp(prefix="bodyres_bench_")
+    data_handler.DATA_DIR = data_dir
+    record_cache.clear()
+    results = []
+    try:
+        print(f"{len(soap_notes)} SOAP notes, {num_patients} patients")
+
+        # Patient and plan records go straight to disk + store; they are not what is being timed.
+        # The intake forms go first because SOAP notes are only accepted for patients on file.
+        for patient_info, _ in people:
+            with open(os.path.join(data_dir, f"patient_info_{patient_info['patient_id']}.json"), "w") as f:
+                json.dump(patient_info, f)
+        record_store.index_records("patient_info", [p for p, _ in people], data_dir)
+
+        def write_soap_notes():
+            for note in soap_notes:
+                data_handler.save_soap_info(**dict(note, visit_date=date.fromisoformat(note["visit_date"])))
+        results.append(measure("save_soap_info", len(soap_notes), write_soap_notes))
+
+        for _, treatment_plan in people:
+            plan_date = treatment_plan["plan_start_date"].replace("-", "")
+            with open(os.path.join(data_dir, f"treatment_plan_{treatment_plan['patient_id']}_{plan_date}.json"), "w") as f:
+                json.dump(treatment_plan, f)
+        record_store.index_records("treatment_plans", [t for _, t in people], data_dir)
+
+        def read_files_cold():
+            record_cache.clear()
+            for patient_id in patient_ids:
+                for _ in data_handler.iter_soap_notes(patient_id):
+                    pass
+        results.append(measure("read soap files (cold)", len(soap_notes), read_files_cold))
+
+        def read_files_cached():
+            for patient_id in patient_ids:
+                for _ in data_handler.iter_soap_notes(patient_id):
+                    pass
+        results.append(measure("read soap files (cached)", len(soap_notes), read_files_cached))
+
+        def query_store():
+            for patient_id in patient_ids:
+                record_store.query_soap_notes(patient_id, data_dir=data_dir)
+        results.append(measure("record_store query", len(soap_notes), query_store))
+
+        def assemble_histories():
+            record_cache.clear()
+            for patient_id in patient_ids:
+                build_progress_series(patient_id)
+        results.append(measure("build_progress_series", num_patients, assemble_histories))
+
+        results.append(measure("load_visit_metrics (all)", len(soap_notes),
+                               lambda: load_visit_metrics(data_dir=data_dir)))
+        results.append(measure("metric_series cohort_frame", len(soap_notes), lambda: cohort_frame(data_dir)))
+
+        def build_payloads():
+            for patient_id in patient_ids:
+                build_radar_data(data_handler.load_patient_info(patient_id))
+                build_rom_data(data_handler.load_latest_soap_note(patient_id))
+        results.append(measure("radar + rom payloads", num_patients, build_payloads))
+    finally:
+        data_handler.DATA_DIR = "./data"
+        write_log.close()
+        record_store.close_connections()
+        shutil.rmtree(data_dir, ignore_errors=True)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_with_previous(report):
+    # Print the change in throughput against the most recent saved run
+    previous_files = sorted(glob.glob(os.path.join(RESULTS_DIR, "*.json")))
+    if not previous_files:
+        return
+    with open(previous_files[-1], "r") as f:
+        previous = json.load(f)
+    print(f"\nCompared with {os.path.basename(previous_files[-1])} ({previous.get('revision')}):")
+    for size, results in report["sizes"].items():
+        before = {r["name"]: r for r in previous["sizes"].get(size, [])}
+        for result in results:
+            old = before.get(result["name"])
+            if old and old["ops_per_second"] and result["ops_per_second"]:
+                change = (result["ops_per_second"] / old["ops_per_second"] - 1) * 100
+                print(f"  {size:>7} {result['name']:<28} {change:+7.1f}% ops/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark record save/load and dashboard payload paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="number of SOAP notes per run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-save", action="store_true", help="don't write a results file")
+    args = parser.parse_args(argv)
+
+    report = {"revision": git_revision(), "timestamp": datetime.now().isoformat(timespec="seconds"), "sizes": {}}
+    for size in args.sizes:
+        print(f"\n== {size} records")
+        report["sizes"][str(size)] = run_size(size, args.seed)
+
+    compare_with_previous(report)
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d_%H%M%S}_{report['revision'] or 'local'}.json")
+        with open(path, "w") as f:
+            json.dump(report, f, indent=4)
+        print(f"\nResults saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+# cohort_analytics_info.py
+# This script will handle the clinic-wide analytics page: statistics aggregated across every
+# patient's SOAP notes and treatment plans.
+#
+#=======================================================================================
+
+import streamlit as st
+from utils.cohort_analytics import (load_cohort, pain_improvement_by_diagnosis,
+                                    rom_recovery_by_modality, weekly_visit_counts)
+
+def cohort_analytics_page():
+    st.title("Clinic Analytics")
+
+    visits = load_cohort()
+    if visits.empty:
+        st.warning("No SOAP notes recorded yet.")
+        return
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Patients", visits["patient_id"].nunique())
+    col2.metric("Visits", len(visits))
+    col3.metric("Mean Pain Level", f"{visits['pain_level'].mean():.1f}")
+
+    st.subheader("Pain Improvement by Diagnosis")
+    st.dataframe(pain_improvement_by_diagnosis(visits))
+
+    st.subheader("ROM Recovery by Treatment Modality")
+    st.caption("Average total range of motion gained (degrees) since the first visit, by week of care")
+    st.line_chart(rom_recovery_by_modality(visits))
+
+    st.subheader("Visits per Week")
+    st.bar_chart(weekly_visit_counts(visits))
@@ -0,0 +1,98 @@
+# patient_summary_info.py
+# This script will handle the Patient Summary page: key facts, treatment progress, pain history,
+# recent SOAP notes, upcoming appointments and current recommendations for one patient, plus the
+# comprehensive PDF report download.
+#
+#=======================================================================================
+
+import streamlit as st
+import pandas as pd
+import altair as alt
+from utils.data_handler import flush_saves
+from utils.record_store import list_patients
+from utils.patient_summary import build_patient_summary
+from utils.patient_report import patient_report_pdf
+
+def patient_summary_page():
+    st.title("Patient Summary")
+
+    # Saves from the form pages may still be queued; wait for them so they show up here
+    flush_saves()
+
+    patients = list_patients()
+    if not patients:
+        st.warning("No patient records found. Save a patient's information first.")
+        return
+    patient_names = dict(patients)
+    patient_id = st.selectbox("Select Patient", list(patient_names),
+                              format_func=lambda pid: f"{patient_names[pid]} ({pid})")
+    patient_name = patient_names[patient_id]
+
+    # One summary (intake facts, metrics, recent notes, follow-ups, plan) shared with the batch reports
+    summary = build_patient_summary(patient_id)
+
+    # Display patient information
+    if summary:
+        st.header(f"Summary for {patient_name}")
+        col1, col2 = st.columns(2)
+        with col1:
+            st.subheader("Patient Information")
+            for key, value in summary["info"].items():
+                st.write(f"**{key}:** {value}")
+
+        with col2:
+            st.subheader("Treatment Progress")
+            if summary["progress"]:
+                progress_data = pd.DataFrame(summary["progress"], columns=['Metric', 'Initial', 'Current'])
+                st.dataframe(progress_data)
+            else:
+                st.write("No SOAP notes recorded yet.")
+
+        # Treatment history chart
+        st.subheader("Treatment History")
+        history_data = pd.DataFrame(summary["pain_history"], columns=['Date', 'Pain Level'])
+        history_data['Date'] = pd.to_datetime(history_data['Date'])
+
+        chart = alt.Chart(history_data).mark_line(point=True).encode(
+            x='Date',
+            y='Pain Level',
+            tooltip=['Date', 'Pain Level']
+        ).properties(width=700, height=300)
+        st.altair_chart(chart, use_container_width=True)
+
+        # Recent SOAP notes
+        st.subheader("Recent SOAP Notes")
+        for note in summary["recent_notes"]:
+            with st.expander(f"SOAP Note - {note['visit_date']}"):
+                st.write(f"**Subjective:** {note['chief_complaint']}")
+                st.write(f"**Objective:** {note['palpation']}")
+                st.write(f"**Assessment:** {note['diagnosis']} (prognosis: {note['prognosis']})")
+                st.write(f"**Plan:** {', '.join(note['treatment_provided'])} - {note['treatment_frequency']}")
+
+        # Upcoming appointments
+        st.subheader("Upcoming Appointments")
+        for appt in summary["upcoming_appointments"]:
+            st.write(f"**{appt}** - Follow-up")
+        if not summary["upcoming_appointments"]:
+            st.write("No upcoming appointments.")
+
+        # Treatment recommendations
+        st.subheader("Current Treatment Recommendations")
+        if summary["has_treatment_plan"]:
+            for i, recommendation in enumerate(summary["recommendations"], start=1):
+                st.write(f"{i}. {recommendation}")
+        else:
+            st.write("No treatment plan on file.")
+
+        # Generate report button
+        if st.button("Generate Comprehensive Patient Report"):
+            st.success("Comprehensive patient report generated!")
+            st.download_button(
+                label="Download Patient Report",
+                data=patient_report_pdf(patient_id),
+                file_name=f"{patient_name}_report.pdf",
+                mime="application/pdf"
+            )
+
+    else:
+        st.warning("Please select a patient to view their summary.")
@@ -81,83 +81,62 @@ import streamlit as st
 from streamlit_elements import elements, dashboard, mui, nivo
 import plotly.graph_objects as go
 import plotly.express as px
-from datetime import datetime, timedelta
-import random 
-import json
-
-def load_patient_data():
-    with open('./data/patient_info_123.json', 'r') as f:
-        patient_info = json.load(f)
-    with open('./data/soap_notes__240731.json', 'r') as f:
-        soap_notes = json.load(f)
-    with open('./data/treatment_plan_awdawd_20240717.json', 'r') as f:
-        treatment_plan = json.load(f)
-    return patient_info, soap_notes, treatment_plan
-
-def generate_dummy_heatmap_data(num_visits=30):
-    pain_types = ["Sharp", "Shooting", "Aching", "Burning", "Tingling", "Numbness"]
-    start_date = datetime(2024, 1, 1)
-    
-    all_visits_data = []
-
-    for visit in range(num_visits):
-        visit_date = (start_date + timedelta(days=visit*7)).strftime("%Y-%m-%d")
-        
-        heatmap_data = [
-            {
-                "id": pain_type,
-                "data": [
-                    {
-                        "x": visit_date,
-                        "y": max(1, min(10, random.gauss(5, 2) - visit * 0.1))  # Gradually decreasing trend
-                    }
-                ]
-            }
-            for pain_type in pain_types
-        ]
-        
-        all_visits_data.extend(heatmap_data)
+import pandas as pd
 
-    return all_visits_data
+from utils.dashboard_payloads import downsample_heatmap, default_heatmap_mode, HEATMAP_MODES
+from utils.data_handler import flush_saves, iter_soap_notes, load_dashboard, load_recent_soap_notes
+from utils.record_store import list_patients
+from utils.metric_series import patient_frame
+from utils.visit_metrics import ROM_COLUMNS
+from utils import synthetic_data
 
 def generate_progressive_pain_data(num_visits=30):
-    pain_types = ["Sharp", "Shooting", "Aching", "Burning", "Tingling", "Numbness"]
-    start_date = datetime(2024, 1, 1)
-    
-    all_data = []
-
-    for visit in range(num_visits):
-        visit_date = (start_date + timedelta(days=visit*7)).strftime("%Y-%m-%d")
-        
-        # Simulate decreasing burning and tingling
-        burning = max(1, min(10, 8 - visit * 0.2 + random.uniform(-0.5, 0.5)))
-        tingling = max(1, min(10, 9 - visit * 0.25 + random.uniform(-0.5, 0.5)))
-        
-        # Simulate increasing aching
-        aching = min(10, max(1, 3 + visit * 0.15 + random.uniform(-0.5, 0.5)))
-        
-        # Other pain types with some random fluctuation
-        sharp = max(1, min(10, 5 + random.uniform(-1, 1)))
-        shooting = max(1, min(10, 4 + random.uniform(-1, 1)))
-        numbness = max(1, min(10, 3 + random.uniform(-1, 1)))
-
-        visit_data = [
-            {"id": "Sharp", "data": [{"x": visit_date, "y": sharp}]},
-            {"id": "Shooting", "data": [{"x": visit_date, "y": shooting}]},
-            {"id": "Aching", "data": [{"x": visit_date, "y": aching}]},
-            {"id": "Burning", "data": [{"x": visit_date, "y": burning}]},
-            {"id": "Tingling", "data": [{"x": visit_date, "y": tingling}]},
-            {"id": "Numbness", "data": [{"x": visit_date, "y": numbness}]}
-        ]
-        
-        all_data.extend(visit_data)
+    # Burning and tingling ease off while aching builds (see synthetic_data.PAIN_TRENDS)
+    return synthetic_data.heatmap_payload(synthetic_data.generate_visits(1, num_visits))
+
 
-    return all_data
+VISIT_TABLE_FIELDS = ["visit_date", "pain_level", "chief_complaint", "diagnosis", "treatment_provided", "prognosis"]
+
+def visit_row(soap_note):
+    # One table row per note; list fields are joined so the table stays one line per visit
+    return {field.replace("_", " ").title(): ", ".join(value) if isinstance(value, list) else value
+            for field, value in ((field, soap_note.get(field)) for field in VISIT_TABLE_FIELDS)}
 
 
 def progress_tracker_page():
     st.title("Patient Dashboard")
-    patient_info, soap_notes, treatment_plan = load_patient_data()
+
+    # Saves from the form pages may still be queued; wait for them so they show up here
+    flush_saves()
+
+    patients = list_patients()
+    if not patients:
+        st.warning("No patient records found. Save a patient's information first.")
+        return
+    patient_id = st.selectbox("Select Patient", [patient_id for patient_id, _ in patients],
+                              format_func=lambda pid: f"{pid} - {dict(patients)[pid]}")
+
+    # Every tile and chart payload is precomputed on save; this is one lookup
+    payloads = load_dashboard(patient_id)
+    if payloads is None:
+        st.info("The dashboard needs the patient's information, at least one SOAP note and a treatment plan.")
+        return
+    patient_info = {**payloads["overview"], **payloads["lifestyle"]}
+    soap_notes = payloads["latest_visit"]
+    treatment_plan = payloads["treatment_plan"]
+    progress_series = payloads["progress_series"]
+
+    # Long histories are aggregated here so the heatmap payload stays small
+    heatmap_mode_labels = {"visit": "Every visit", "week": "Per week", "month": "Per month",
+                           "rolling": "Rolling mean", "last": "Last N visits"}
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        heatmap_mode = st.radio("Pain heatmap", HEATMAP_MODES, horizontal=True,
+                                index=HEATMAP_MODES.index(default_heatmap_mode(progress_series["visit_dates"])),
+                                format_func=heatmap_mode_labels.get)
+    with col2:
+        heatmap_window = st.number_input("Visits (rolling / last N)", min_value=1, max_value=52, value=8,
+                                         disabled=heatmap_mode not in ("rolling", "last"))
 
     with elements("dashboard"):
         layout = [
@@ -191,16 +170,7 @@ def progress_tracker_page():
             # First time patient Pain Metrics
             #+++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
-            pain_data = patient_info['pain_characteristics']
-
-            radar_data = [
-                {
-                    'taste': pain_type,
-                    'intensity': characteristics['intensity'],
-                    'frequency': {'Constant': 10, 'Intermittent': 5, 'Occasional': 2}[characteristics['frequency']],
-                }
-                for pain_type, characteristics in pain_data.items()
-            ]
+            radar_data = payloads["radar_data"]
 
             st.title('Pain Characteristics Visualization')
 
@@ -247,9 +217,11 @@ def progress_tracker_page():
             #+++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
             # Heatmap (best used over a longer period of time)
-            # Generate dummy data for 30 visits
-            dummy_heatmap_data = generate_dummy_heatmap_data(30)
-            progress_heatmap_data = generate_progressive_pain_data(20)
+            # Fall back to the demo data until the patient has SOAP notes on file
+            if progress_series["visit_dates"]:
+                progress_heatmap_data = downsample_heatmap(progress_series["heatmap"], heatmap_mode, heatmap_window)
+            else:
+                progress_heatmap_data = generate_progressive_pain_data(20)
             
 ##    heatmap_data = [
 ##        {
@@ -313,13 +285,7 @@ def progress_tracker_page():
             with mui.Paper(key="range_of_motion", sx={"p": 2}):
                 mui.Typography("Range of Motion", variant="h6")
                 with mui.Box(sx={"height": 300}):
-                    rom_data = [
-                        {"joint": "Cervical Spine", "flexion": soap_notes['cervical_spine_flexion'], "extension": soap_notes['cervical_spine_extension']},
-                        {"joint": "Thoracic Spine", "flexion": soap_notes['thoracic_spine_flexion'], "extension": soap_notes['thoracic_spine_extension']},
-                        {"joint": "Lumbar Spine", "flexion": soap_notes['lumbar_spine_flexion'], "extension": soap_notes['lumbar_spine_extension']},
-                        {"joint": "Shoulders", "flexion": soap_notes['shoulders_flexion'], "extension": soap_notes['shoulders_extension']},
-                        {"joint": "Hips", "flexion": soap_notes['hips_flexion'], "extension": soap_notes['hips_extension']}
-                    ]
+                    rom_data = payloads["rom_data"]
                     nivo.Bar(
                         data=rom_data,
                         keys=["flexion", "extension"],
@@ -361,7 +327,7 @@ def progress_tracker_page():
                 mui.Typography(f"Initial Phase: {treatment_plan['initial_phase']}")
                 mui.Typography(f"Maintenance Phase: {treatment_plan['maintenance_phase']}")
                 mui.Typography("Treatment Modalities:", variant="subtitle1")
-                for modality in treatment_plan['treatment_modalities']:
+                for modality in treatment_plan['treatment_modalities'] or []:
                     mui.Typography(f"• {modality}")
 
             with mui.Paper(key="lifestyle_factors", sx={"p": 2}):
@@ -379,3 +345,34 @@ def progress_tracker_page():
                 mui.Typography(f"Prognosis: {soap_notes['prognosis']}")
                 mui.Typography(f"Follow-up: {soap_notes['follow_up']}")
 
+    #+++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+    # Pain and Range of Motion over time (a slice of the memory-mapped metric series)
+    #+++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    st.subheader("Progress Over Time")
+    metrics = patient_frame(patient_id)
+    if len(metrics) < len(progress_series["visit_dates"]):
+        st.caption(f"Showing the latest {len(metrics)} of {len(progress_series['visit_dates'])} visits "
+                   "(the series keeps BODYRES_MAX_VISITS visits per patient).")
+    col1, col2 = st.columns(2)
+    with col1:
+        pain_fig = px.line(metrics, x="visit_date", y="pain_level", markers=True,
+                           labels={"visit_date": "Visit Date", "pain_level": "Pain Level"})
+        pain_fig.update_yaxes(range=[0, 10])
+        st.plotly_chart(pain_fig, use_container_width=True)
+    with col2:
+        rom_fig = px.line(metrics, x="visit_date", y=ROM_COLUMNS, markers=True,
+                          labels={"visit_date": "Visit Date", "value": "Degrees", "variable": "Measurement"})
+        st.plotly_chart(rom_fig, use_container_width=True)
+
+    #+++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+    # Recent visits (only the last few notes are read, through the record cache and the
+    # patient's memory-mapped container) and the full history on request (streamed in chunks)
+    #+++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    st.subheader("Recent Visits")
+    recent_count = st.number_input("Visits to show", min_value=1, max_value=100, value=10)
+    recent_notes = load_recent_soap_notes(patient_id, recent_count)
+    st.dataframe(pd.DataFrame([visit_row(note) for note in reversed(recent_notes)]), hide_index=True)
+    if st.toggle("Show full visit history"):
+        st.dataframe(pd.DataFrame([visit_row(note) for note in iter_soap_notes(patient_id)]), hide_index=True)
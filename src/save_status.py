@@ -0,0 +1,48 @@
+# save_status.py
+# This script will handle the status line under the form pages' Save buttons. Saves go through
+# data_handler.submit_record and complete in the background, so the page keeps the returned
+# Future in session state and this fragment polls it until the save has been written.
+#
+#=======================================================================================
+
+import streamlit as st
+
+POLL_INTERVAL = 0.5  # seconds between checks while a save is still running
+
+
+def track_save(key, future, success_message):
+    st.session_state[f"save_status_{key}"] = (future, success_message)
+
+
+def _show_result(future, success_message):
+    if not future.done():
+        st.info("Saving...")
+    elif future.exception() is not None:
+        st.error(f"The save failed: {future.exception()}")
+    else:
+        st.success(success_message)
+
+
+@st.fragment(run_every=POLL_INTERVAL)
+def _poll_save(key):
+    entry = st.session_state.get(f"save_status_{key}")
+    if entry is None:
+        return
+    if entry[0].done():
+        # A full run shows the result once and drops the entry, so this fragment isn't drawn (or
+        # polled) again
+        st.rerun()
+    _show_result(*entry)
+
+
+def show_save_status(key):
+    entry = st.session_state.get(f"save_status_{key}")
+    if entry is None:
+        return
+    future, success_message = entry
+    if future.done():
+        # Finished saves are shown once, on the next full run of the page
+        _show_result(future, success_message)
+        del st.session_state[f"save_status_{key}"]
+    else:
+        _poll_save(key)
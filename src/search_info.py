@@ -0,0 +1,69 @@
+# search_info.py
+# This script will handle the SOAP note search page: full-text search across every patient's
+# notes (chief complaint, palpation, diagnoses, neurological findings, home care instructions),
+# and structured filters over the multiselect fields of SOAP notes and treatment plans.
+#
+#=======================================================================================
+
+import streamlit as st
+from utils.search_index import search_soap_notes
+from utils.record_store import query_soap_notes
+from utils.facet_index import FACET_FIELDS, facet_values, match, matching_records
+
+def search_page():
+    st.title("Search SOAP Notes")
+
+    query = st.text_input("Search", placeholder='e.g. radiculopathy, radic*, "lower back"',
+                          help='Use * for prefix matches and "quotes" for exact phrases')
+    col1, col2 = st.columns(2)
+    with col1:
+        patient_id = st.text_input("Limit to Patient ID (optional)")
+    with col2:
+        limit = st.selectbox("Results", [25, 50, 100, 250], index=1)
+
+    facet_filter_section()
+
+    if not query:
+        return
+
+    hits = search_soap_notes(query, limit=limit, patient_id=patient_id or None)
+    st.write(f"{len(hits)} matching notes")
+    for hit in hits:
+        with st.expander(f"Patient {hit['patient_id']} - {hit['visit_date']}"):
+            st.markdown(hit["snippet"])
+            note = query_soap_notes(hit["patient_id"], hit["visit_date"], hit["visit_date"])
+            if note:
+                st.write(f"**Diagnosis:** {note[0]['diagnosis']}")
+                st.write(f"**Prognosis:** {note[0]['prognosis']}")
+
+
+FACET_RECORDS = {"soap_notes": ("SOAP notes", "notes", "Visit Date"),
+                 "treatment_plans": ("Treatment plans", "plans", "Plan Start Date")}
+
+def facet_filter_section():
+    # Structured filters over the multiselect fields of SOAP notes or treatment plans, answered from
+    # the bitmap facet index
+    with st.expander("Filter by findings and treatments"):
+        record_type = st.radio("Filter", list(FACET_RECORDS), format_func=lambda key: FACET_RECORDS[key][0],
+                               horizontal=True, key="facet_record_type")
+        _, noun, date_label = FACET_RECORDS[record_type]
+        selected = {}
+        for field in FACET_FIELDS[record_type]:
+            options = [value for value, _ in facet_values(record_type, field)]
+            selected[field] = st.multiselect(field.replace("_", " ").title(), options,
+                                             key=f"facet_{record_type}_{field}")
+        combine = st.radio(f"Within a field, {noun} must have", ["All selected values", "Any selected value"],
+                           horizontal=True)
+
+        if not any(selected.values()):
+            return
+        if combine == "All selected values":
+            bitmap = match(record_type, all_of=selected)
+        else:
+            bitmap = match(record_type, any_of=selected)
+        count = bitmap.bit_count()
+        st.write(f"{count} matching {noun}")
+        records = matching_records(record_type, bitmap, limit=100)
+        st.dataframe([{"Patient ID": patient_id, date_label: record_date} for patient_id, record_date in records])
+        if count > len(records):
+            st.caption(f"Showing the first {len(records)}")
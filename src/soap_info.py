@@ -1,120 +1,150 @@
 # soap_info.py
 # This script will handle all functions related to SOAP notes input by the doctor and storage
 #
+# The note is one st.form submitted by the save button, so typing into it doesn't rerun the app and
+# every field (patient, visit date, Subjective through Plan) is sent together when it is saved. The
+# vital-signs toggle can't live inside a form, so it is a fragment above it: showing or editing the
+# vitals only reruns that block, and they are read back through st.session_state on save. Saving
+# queues the note for the background writers (data_handler.submit_record) and the status below the
+# form follows it until it is written.
+#
 #=======================================================================================
 
 import streamlit as st
-from utils.data_handler import save_soap_info
+from src.save_status import show_save_status, track_save
+from utils.data_handler import submit_record
+from utils.records import SoapNote
+
+VITAL_SIGN_KEYS = ["blood_pressure", "heart_rate", "respiratory_rate", "temperature",
+                   "height_ft", "height_in", "weight_lbs"]
+
+
+@st.fragment
+def vital_signs_section():
+    # Values are read back through st.session_state when the note is saved
+    if st.checkbox("Record Vital Signs", key="vital_signs"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.text_input("Blood Pressure (mmHg)", key="blood_pressure")
+            st.number_input("Heart Rate (bpm)", min_value=0, max_value=200, key="heart_rate")
+        with col2:
+            st.number_input("Respiratory Rate (breaths/min)", min_value=0, max_value=60, key="respiratory_rate")
+            st.number_input("Temperature (°C)", min_value=35.0, max_value=42.0, step=0.1, key="temperature")
+        with col3:
+            st.number_input("Height (ft)", min_value=0, step=1, key="height_ft")
+            st.number_input("Height (in)", min_value=0, step=1, key="height_in")
+            st.number_input("Weight (lbs)", min_value=0, step=1, key="weight_lbs")
+
 
 def soap_notes_page():
     st.title("SOAP Notes")
-    patient_id = st.text_input("Patient ID")
-    visit_date = st.date_input("Visit Date")
 
-    # Subjective
-    st.header("Subjective")
+    st.subheader("Vital Signs")
+    vital_signs_section()
 
-    chief_complaint = st.text_area("Chief Complaint", help="Patient's main reason for visit")
+    # The whole note is submitted together with the save button
+    with st.form("soap_note"):
+        patient_id = st.text_input("Patient ID")
+        visit_date = st.date_input("Visit Date")
 
-    pain_location = st.multiselect("Pain Location",
-                                   ["Neck", "Upper Back", "Middle Back", "Lower Back", "Shoulders", "Hips", "Knees",
-                                    "Ankles", "Wrists", "Elbows"])
+        # Subjective
+        st.header("Subjective")
 
-    pain_characteristics = st.multiselect("Pain Characteristics",
-                                          ["Sharp", "Dull", "Aching", "Burning", "Tingling", "Numbness", "Throbbing",
-                                           "Shooting", "Stabbing"])
+        chief_complaint = st.text_area("Chief Complaint", help="Patient's main reason for visit")
 
-    pain_level = st.slider("Pain Level (0-10)", 0, 10, 5)
+        pain_location = st.multiselect("Pain Location",
+                                       ["Neck", "Upper Back", "Middle Back", "Lower Back", "Shoulders", "Hips", "Knees",
+                                        "Ankles", "Wrists", "Elbows"])
 
-    pain_frequency = st.select_slider("Pain Frequency",
-                                      options=["Constant", "Nearly Constant", "Intermittent", "Occasional", "Rare"])
+        pain_characteristics = st.multiselect("Pain Characteristics",
+                                              ["Sharp", "Dull", "Aching", "Burning", "Tingling", "Numbness", "Throbbing",
+                                               "Shooting", "Stabbing"])
 
-    aggravating_factors = st.multiselect("Aggravating Factors",
-                                         ["Sitting", "Standing", "Walking", "Lifting", "Bending", "Twisting",
-                                          "Lying down", "Stress", "Weather changes"])
+        pain_level = st.slider("Pain Level (0-10)", 0, 10, 5)
 
-    relieving_factors = st.multiselect("Relieving Factors",
-                                       ["Rest", "Ice", "Heat", "Stretching", "Exercise", "Medication", "Massage"])
+        pain_frequency = st.select_slider("Pain Frequency",
+                                          options=["Constant", "Nearly Constant", "Intermittent", "Occasional", "Rare"])
 
-    affected_activities = st.multiselect("Affected Daily Activities",
-                                         ["Work", "Sleep", "Exercise", "Household Chores", "Social Activities",
-                                          "Driving", "Personal Care"])
+        aggravating_factors = st.multiselect("Aggravating Factors",
+                                             ["Sitting", "Standing", "Walking", "Lifting", "Bending", "Twisting",
+                                              "Lying down", "Stress", "Weather changes"])
 
-    associated_symptoms = st.multiselect("Associated Symptoms",
-                                         ["Headache", "Dizziness", "Nausea", "Weakness", "Fatigue", "Stiffness",
-                                          "Muscle spasms"])
+        relieving_factors = st.multiselect("Relieving Factors",
+                                           ["Rest", "Ice", "Heat", "Stretching", "Exercise", "Medication", "Massage"])
 
-    # Objective
-    st.header("Objective")
+        affected_activities = st.multiselect("Affected Daily Activities",
+                                             ["Work", "Sleep", "Exercise", "Household Chores", "Social Activities",
+                                              "Driving", "Personal Care"])
 
-    vital_signs = st.checkbox("Record Vital Signs")
-    if vital_signs:
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            blood_pressure = st.text_input("Blood Pressure (mmHg)")
-            heart_rate = st.number_input("Heart Rate (bpm)", min_value=0, max_value=200)
-        with col2:
-            respiratory_rate = st.number_input("Respiratory Rate (breaths/min)", min_value=0, max_value=60)
-            temperature = st.number_input("Temperature (°C)", min_value=35.0, max_value=42.0, step=0.1)
-        with col3:
-            height_ft = st.number_input("Height (ft)", min_value=0, step=1)
-            height_in = st.number_input("Height (in)", min_value=0, step=1)
-            weight_lbs = st.number_input("Weight (lbs)", min_value=0, step=1)
-
-    st.subheader("Range of Motion (ROM)")
-    body_parts = ["Cervical_Spine", "Thoracic_Spine", "Lumbar_Spine", "Shoulders", "Hips"]
-    for part in body_parts:
-        col1, col2 = st.columns(2)
-        with col1:
-            st.number_input(f"{part} Flexion (degrees)", 0, 180, 90, key=f"{part.lower()}_flexion")
-        with col2:
-            st.number_input(f"{part} Extension (degrees)", 0, 180, 90, key=f"{part.lower()}_extension")
+        associated_symptoms = st.multiselect("Associated Symptoms",
+                                             ["Headache", "Dizziness", "Nausea", "Weakness", "Fatigue", "Stiffness",
+                                              "Muscle spasms"])
 
-    st.subheader("Orthopedic Tests")
-    tests = ["Straight_Leg_Raise", "Kernig_Sign", "Brudzinski_Sign", "Spurling_Test", "Valsalva_Maneuver"]
-    for test in tests:
-        st.selectbox(f"{test}", ["Positive", "Negative", "Not Performed"], key=f"ortho_{test.lower()}")
+        # Objective
+        st.header("Objective")
 
-    st.subheader("Neurological Examination")
-    neuro_tests = ["Deep_Tendon_Reflexes", "Muscle_Strength", "Sensation"]
-    for test in neuro_tests:
-        st.text_area(f"{test} Results", key=f"neuro_{test.lower()}")
+        st.subheader("Range of Motion (ROM)")
+        body_parts = ["Cervical_Spine", "Thoracic_Spine", "Lumbar_Spine", "Shoulders", "Hips"]
+        for part in body_parts:
+            col1, col2 = st.columns(2)
+            with col1:
+                st.number_input(f"{part} Flexion (degrees)", 0, 180, 90, key=f"{part.lower()}_flexion")
+            with col2:
+                st.number_input(f"{part} Extension (degrees)", 0, 180, 90, key=f"{part.lower()}_extension")
 
-    st.subheader("Palpation Findings")
-    palpation = st.text_area("Palpation Findings")
+        st.subheader("Orthopedic Tests")
+        tests = ["Straight_Leg_Raise", "Kernig_Sign", "Brudzinski_Sign", "Spurling_Test", "Valsalva_Maneuver"]
+        for test in tests:
+            st.selectbox(f"{test}", ["Positive", "Negative", "Not Performed"], key=f"ortho_{test.lower()}")
 
-    # Assessment
-    st.header("Assessment")
+        st.subheader("Neurological Examination")
+        neuro_tests = ["Deep_Tendon_Reflexes", "Muscle_Strength", "Sensation"]
+        for test in neuro_tests:
+            st.text_area(f"{test} Results", key=f"neuro_{test.lower()}")
 
-    diagnosis = st.text_area("Diagnosis")
+        st.subheader("Palpation Findings")
+        palpation = st.text_area("Palpation Findings")
 
-    differential_diagnosis = st.text_area("Differential Diagnosis")
+        # Assessment
+        st.header("Assessment")
 
-    prognosis = st.select_slider("Prognosis",
-                                 options=["Poor", "Fair", "Good", "Very Good", "Excellent"])
+        diagnosis = st.text_area("Diagnosis")
 
-    # Plan
-    st.header("Plan")
+        differential_diagnosis = st.text_area("Differential Diagnosis")
 
-    treatment_provided = st.multiselect("Treatment Provided",
-                                        ["Spinal Manipulation", "Soft Tissue Therapy", "Electrical Stimulation",
-                                         "Ultrasound", "Exercise Prescription", "Hot/Cold Therapy"])
+        prognosis = st.select_slider("Prognosis",
+                                     options=["Poor", "Fair", "Good", "Very Good", "Excellent"])
 
-    treatment_frequency = st.selectbox("Recommended Treatment Frequency",
-                                       ["1x per week", "2x per week", "3x per week", "As needed"])
+        # Plan
+        st.header("Plan")
 
-    treatment_duration = st.selectbox("Recommended Treatment Duration",
-                                      ["2 weeks", "4 weeks", "6 weeks", "8 weeks", "12 weeks", "Ongoing"])
+        treatment_provided = st.multiselect("Treatment Provided",
+                                            ["Spinal Manipulation", "Soft Tissue Therapy", "Electrical Stimulation",
+                                             "Ultrasound", "Exercise Prescription", "Hot/Cold Therapy"])
 
-    home_care_instructions = st.text_area("Home Care Instructions")
+        treatment_frequency = st.selectbox("Recommended Treatment Frequency",
+                                           ["1x per week", "2x per week", "3x per week", "As needed"])
 
-    follow_up = st.date_input("Follow-up Appointment")
+        treatment_duration = st.selectbox("Recommended Treatment Duration",
+                                          ["2 weeks", "4 weeks", "6 weeks", "8 weeks", "12 weeks", "Ongoing"])
 
-    referrals = st.multiselect("Referrals",
-                               ["None", "X-ray", "MRI", "CT Scan", "Blood Work", "Specialist Consultation"])
+        home_care_instructions = st.text_area("Home Care Instructions")
 
-    if st.button("Save SOAP Notes"):
-        save_soap_info(patient_id, visit_date, 
+        follow_up = st.date_input("Follow-up Appointment")
+
+        referrals = st.multiselect("Referrals",
+                                   ["None", "X-ray", "MRI", "CT Scan", "Blood Work", "Specialist Consultation"])
+
+        save_requested = st.form_submit_button("Save SOAP Notes")
+
+    if save_requested:
+        if not patient_id.strip():
+            st.error("Enter the Patient ID before saving the note.")
+            return
+        vital_signs = st.session_state.get("vital_signs", False)
+        blood_pressure, heart_rate, respiratory_rate, temperature, height_ft, height_in, weight_lbs = (
+            st.session_state.get(key) if vital_signs else None for key in VITAL_SIGN_KEYS)
+        note = SoapNote(patient_id, visit_date, 
             chief_complaint, pain_location, pain_characteristics, pain_level,  # Subjective
             pain_frequency, aggravating_factors, relieving_factors, affected_activities,
             associated_symptoms,
@@ -133,5 +163,10 @@ def soap_notes_page():
             treatment_provided, treatment_frequency, treatment_duration,  # Plan
             home_care_instructions, follow_up, referrals  # These were missing
         )
-        st.success("SOAP notes saved successfully!")
+        try:
+            track_save("soap_notes", submit_record(note), "SOAP notes saved successfully!")
+        except (ValueError, RuntimeError) as error:
+            st.error(str(error))
+
+    show_save_status("soap_notes")
 
@@ -0,0 +1,45 @@
+# conftest.py
+# This script will handle the shared test fixtures: a throwaway data directory that data_handler
+# reads and writes for the length of one test, and small synthetic patient records.
+#
+#=======================================================================================
+
+import pytest
+
+from utils import data_handler, record_cache, synthetic_data
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    path = str(tmp_path / "data")
+    monkeypatch.setattr(data_handler, "DATA_DIR", path)
+    record_cache.clear()
+    yield path
+    data_handler.flush_saves()
+    data_handler._finish_compaction()
+    record_cache.clear()
+
+
+@pytest.fixture
+def clinic():
+    # Three patients with four visits each: {"patients": [...], "notes": [...], "plans": [...]}
+    visits = synthetic_data.generate_visits(3, 4, seed=1)
+    people = list(synthetic_data.patient_records(visits, seed=1))
+    return {
+        "patients": [patient_info for patient_info, _ in people],
+        "plans": [treatment_plan for _, treatment_plan in people],
+        "notes": list(synthetic_data.soap_records(visits, seed=1)),
+    }
+
+
+@pytest.fixture
+def saved_clinic(data_dir, clinic):
+    # The clinic saved through the normal save path: intake forms first, then notes and plans
+    from utils.records import PatientInfo, SoapNote, TreatmentPlan
+    for patient_info in clinic["patients"]:
+        data_handler.save_record(PatientInfo.from_dict(patient_info))
+    for note in clinic["notes"]:
+        data_handler.save_record(SoapNote.from_dict(note))
+    for treatment_plan in clinic["plans"]:
+        data_handler.save_record(TreatmentPlan.from_dict(treatment_plan))
+    return clinic
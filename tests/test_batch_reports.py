@@ -0,0 +1,69 @@
+# test_batch_reports.py
+# This script will handle the tests for the month-end report batch: one PDF per patient seen in
+# the month, and a re-run that reuses the manifest and only writes what is missing.
+#
+#=======================================================================================
+
+import os
+
+import pytest
+
+from utils import batch_reports
+
+# SYN000000 and SYN000001 have visits in July 2024; SYN000002 doesn't
+MONTH = "2024-07"
+
+
+def _run(data_dir, out_dir, **kwargs):
+    messages = []
+    manifest = batch_reports.batch_reports(MONTH, out_dir, data_dir, workers=1, progress=messages.append, **kwargs)
+    return manifest, messages
+
+
+def _mtimes(out_dir, manifest):
+    return {patient_id: os.stat(os.path.join(out_dir, filename)).st_mtime_ns
+            for patient_id, filename in manifest["reports"].items()}
+
+
+def test_batch_writes_one_report_per_active_patient(saved_clinic, data_dir, tmp_path):
+    out_dir = str(tmp_path / "reports")
+    manifest, messages = _run(data_dir, out_dir)
+    assert manifest["reports"] == {"SYN000000": "SYN000000.pdf", "SYN000001": "SYN000001.pdf"}
+    assert manifest["failed"] == {} and manifest["patients"] == 2
+    assert len(messages) == 2
+    assert batch_reports.load_manifest(out_dir)["reports"] == manifest["reports"]
+    for filename in manifest["reports"].values():
+        with open(os.path.join(out_dir, filename), "rb") as f:
+            assert f.read(5) == b"%PDF-"
+    assert not [name for name in os.listdir(out_dir) if name.endswith(".tmp")]
+
+
+def test_a_rerun_reuses_the_manifest_and_skips_finished_patients(saved_clinic, data_dir, tmp_path):
+    out_dir = str(tmp_path / "reports")
+    first, _ = _run(data_dir, out_dir)
+    mtimes = _mtimes(out_dir, first)
+
+    # Nothing left to do: no report is written again
+    second, messages = _run(data_dir, out_dir)
+    assert messages == []
+    assert second["created"] == first["created"] and second["reports"] == first["reports"]
+    assert _mtimes(out_dir, second) == mtimes
+
+    # A report that went missing is the only one written
+    os.remove(os.path.join(out_dir, "SYN000001.pdf"))
+    third, messages = _run(data_dir, out_dir)
+    assert len(messages) == 1
+    assert third["reports"] == first["reports"]
+    assert _mtimes(out_dir, third)["SYN000000"] == mtimes["SYN000000"]
+    assert os.path.exists(os.path.join(out_dir, "SYN000001.pdf"))
+
+    # Without resume every report is written again
+    fourth, messages = _run(data_dir, out_dir, resume=False)
+    assert len(messages) == 2 and fourth["created"] != first["created"]
+
+
+def test_an_output_directory_holds_one_month(saved_clinic, data_dir, tmp_path):
+    out_dir = str(tmp_path / "reports")
+    _run(data_dir, out_dir)
+    with pytest.raises(ValueError, match=MONTH):
+        batch_reports.batch_reports("2024-10", out_dir, data_dir, workers=1, progress=lambda message: None)
@@ -0,0 +1,87 @@
+# test_bulk_import.py
+# This script will handle the tests for the bulk importer: records land in the data directory and
+# the index, invalid files are quarantined, and reruns resume from the checkpoint.
+#
+#=======================================================================================
+
+import glob
+import json
+import os
+
+import pytest
+
+from utils import bulk_import, data_handler, record_store, synthetic_data
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = str(tmp_path / "legacy")
+    synthetic_data.write_records(synthetic_data.generate_visits(3, 4, seed=2), path, seed=2)
+    return path
+
+
+def _import(source, data_dir):
+    return bulk_import.bulk_import(source, data_dir, workers=2, batch_size=5, progress=lambda message: None)
+
+
+def test_import_writes_records_and_index(source, data_dir):
+    done, errors = _import(source, data_dir)
+    assert (done, errors) == (18, [])
+    for path in glob.glob(os.path.join(source, "soap_notes_*.json")):
+        with open(path) as f:
+            note = json.load(f)
+        assert data_handler.load_soap_note(note["patient_id"], note["visit_date"])["diagnosis"] == note["diagnosis"]
+    for patient_id, _ in record_store.list_patients(data_dir):
+        assert data_handler.load_patient_info(patient_id) == record_store.get_patient_info(patient_id, data_dir)
+
+
+def test_rerun_resumes_from_the_checkpoint(source, data_dir):
+    _import(source, data_dir)
+    assert _import(source, data_dir) == (0, [])
+
+
+def test_quarantined_file_is_imported_once_fixed(source, data_dir):
+    path = sorted(glob.glob(os.path.join(source, "soap_notes_*.json")))[0]
+    with open(path) as f:
+        note = json.load(f)
+    with open(path, "w") as f:
+        json.dump(dict(note, pain_level=42), f)
+
+    done, errors = _import(source, data_dir)
+    assert [error_path for error_path, _ in errors] == [path]
+    assert "pain_level must be at most 10" in errors[0][1]
+    assert os.path.exists(os.path.join(data_dir, bulk_import.QUARANTINE_DIRNAME, os.path.basename(path)))
+    assert data_handler.load_soap_note(note["patient_id"], note["visit_date"]) is None
+
+    with open(path, "w") as f:
+        json.dump(note, f)
+    assert _import(source, data_dir) == (1, [])
+    assert data_handler.load_soap_note(note["patient_id"], note["visit_date"])["pain_level"] == note["pain_level"]
+
+
+def test_note_for_an_unknown_patient_is_quarantined(source, data_dir):
+    for path in glob.glob(os.path.join(source, "patient_info_*.json")):
+        os.remove(path)
+    done, errors = _import(source, data_dir)
+    assert len(errors) == 15  # every note and plan
+    assert all("no intake form on file" in error for _, error in errors)
+
+
+def test_files_with_the_same_name_in_different_directories(source, data_dir):
+    _import(source, data_dir)
+    path = sorted(glob.glob(os.path.join(source, "soap_notes_*.json")))[0]
+    with open(path) as f:
+        note = json.load(f)
+    # The same file name again, in a shard directory of the source
+    os.makedirs(os.path.join(source, "ab"))
+    with open(os.path.join(source, "ab", os.path.basename(path)), "w") as f:
+        json.dump(dict(note, diagnosis="from the shard directory"), f)
+    assert _import(source, data_dir) == (1, [])
+    assert data_handler.load_soap_note(note["patient_id"], note["visit_date"])["diagnosis"] == "from the shard directory"
+    assert os.path.join("ab", os.path.basename(path)) in bulk_import.load_checkpoint(data_dir)
+
+
+def test_import_leaves_the_app_data_directory_alone(source, data_dir, tmp_path):
+    done, _ = _import(source, str(tmp_path / "imported"))
+    assert done == 18
+    assert data_handler.DATA_DIR == data_dir
@@ -0,0 +1,86 @@
+# test_dashboard_payloads.py
+# This script will handle the tests for the dashboard chart payloads: the progress series and the
+# heatmap downsampling modes.
+#
+#=======================================================================================
+
+from datetime import date, timedelta
+
+import pytest
+
+from utils import dashboard_payloads
+from utils.dashboard_payloads import MAX_HEATMAP_COLUMNS, default_heatmap_mode, downsample_heatmap
+
+
+def _heatmap(visit_dates, values=None):
+    values = values or list(range(len(visit_dates)))
+    return [{"id": pain_type, "data": [{"x": visit_date, "y": value} for visit_date, value in zip(visit_dates, values)]}
+            for pain_type in dashboard_payloads.PAIN_TYPES]
+
+
+def _days(count, start="2024-01-01", step=1):
+    first = date.fromisoformat(start)
+    return [(first + timedelta(days=i * step)).isoformat() for i in range(count)]
+
+
+def test_progress_series(clinic):
+    notes = sorted(clinic["notes"][:4], key=lambda note: note["visit_date"])
+    series = dashboard_payloads.progress_series(notes)
+    assert series["visit_dates"] == [note["visit_date"] for note in notes]
+    assert series["pain_level"] == [note["pain_level"] for note in notes]
+    for heatmap in series["heatmap"]:
+        assert [point["y"] for point in heatmap["data"]] == [
+            note["pain_level"] if heatmap["id"] in note["pain_characteristics"] else 0 for note in notes]
+
+
+def test_visit_mode_keeps_every_visit():
+    heatmap = _heatmap(_days(10))
+    assert downsample_heatmap(heatmap, "visit") is heatmap
+
+
+def test_week_mode_averages_each_week():
+    # Monday 2024-01-01 to Wednesday 2024-01-10: one full week and three days of the next
+    points = downsample_heatmap(_heatmap(_days(10)), "week")[0]["data"]
+    assert points == [{"x": "2024-01-01", "y": 3.0}, {"x": "2024-01-08", "y": 8.0}]
+
+
+def test_month_mode_averages_each_month():
+    visit_dates = ["2024-01-05", "2024-01-20", "2024-03-02"]
+    points = downsample_heatmap(_heatmap(visit_dates, [2, 4, 9]), "month")[0]["data"]
+    assert points == [{"x": "2024-01-01", "y": 3.0}, {"x": "2024-03-01", "y": 9.0}]
+
+
+def test_rolling_mode_is_capped_and_ends_on_the_last_visit():
+    visit_dates = _days(500)
+    points = downsample_heatmap(_heatmap(visit_dates), "rolling", window=4)[0]["data"]
+    assert len(points) <= MAX_HEATMAP_COLUMNS
+    # Mean of the last four visits (values 496..499)
+    assert points[-1] == {"x": visit_dates[-1], "y": 497.5}
+    # A short history: the first cells average only the visits so far
+    points = downsample_heatmap(_heatmap(_days(3)), "rolling", window=4)[0]["data"]
+    assert [point["y"] for point in points] == [0.0, 0.5, 1.0]
+
+
+def test_last_mode_keeps_the_latest_visits():
+    visit_dates = _days(10)
+    assert [point["x"] for point in downsample_heatmap(_heatmap(visit_dates), "last", window=3)[0]["data"]] == \
+        visit_dates[-3:]
+    assert len(downsample_heatmap(_heatmap(_days(2)), "last", window=3)[0]["data"]) == 2
+
+
+def test_empty_history_in_every_mode():
+    for mode in dashboard_payloads.HEATMAP_MODES:
+        assert all(series["data"] == [] for series in downsample_heatmap(_heatmap([]), mode))
+    with pytest.raises(ValueError):
+        downsample_heatmap(_heatmap([]), "year")
+
+
+def test_default_mode_stays_within_the_column_cap():
+    assert default_heatmap_mode(_days(MAX_HEATMAP_COLUMNS)) == "visit"
+    # Weekly visits over two years fit monthly bins
+    assert default_heatmap_mode(_days(MAX_HEATMAP_COLUMNS + 1, step=7)) == "month"
+    # Five years of visits don't
+    long_history = _days(300, step=7)
+    assert default_heatmap_mode(long_history) == "rolling"
+    points = downsample_heatmap(_heatmap(long_history), default_heatmap_mode(long_history))[0]["data"]
+    assert len(points) <= MAX_HEATMAP_COLUMNS
@@ -0,0 +1,55 @@
+# test_dashboard_views.py
+# This script will handle the tests for the stored patient dashboards: the payload patched by each
+# save matches a full build, whatever order the records arrive in.
+#
+#=======================================================================================
+
+import json
+
+from utils import dashboard_views, data_handler
+from utils.records import PatientInfo, SoapNote, TreatmentPlan
+
+
+def _built(patient_id, data_dir):
+    # A full build, through JSON like the stored copy
+    return json.loads(json.dumps(dashboard_views.build_dashboard(patient_id, data_dir)))
+
+
+def test_saves_patch_the_stored_dashboard(saved_clinic, data_dir):
+    for patient_info in saved_clinic["patients"]:
+        patient_id = patient_info["patient_id"]
+        assert data_handler.load_dashboard(patient_id) == _built(patient_id, data_dir)
+
+
+def test_out_of_order_and_resaved_visits(data_dir, clinic):
+    patient_info, plan = clinic["patients"][0], clinic["plans"][0]
+    patient_id = patient_info["patient_id"]
+    notes = sorted((note for note in clinic["notes"] if note["patient_id"] == patient_id),
+                   key=lambda note: note["visit_date"])
+    data_handler.save_record(PatientInfo.from_dict(patient_info))
+    data_handler.save_record(TreatmentPlan.from_dict(plan))
+    # The dashboard appears with the first note; the others are spliced in around it
+    for note in [notes[1], notes[3], notes[0], notes[2]]:
+        data_handler.save_record(SoapNote.from_dict(note))
+    data_handler.save_record(SoapNote.from_dict(dict(notes[3], pain_level=0, diagnosis="amended")))
+    data_handler.save_record(SoapNote.from_dict(dict(notes[0], pain_level=9)))
+    data_handler.save_record(PatientInfo.from_dict(dict(patient_info, occupation="Pilot")))
+    data_handler.save_record(TreatmentPlan.from_dict(dict(plan, plan_duration="12 weeks")))
+
+    dashboard = dashboard_views.load_dashboard(patient_id, data_dir)
+    assert dashboard == _built(patient_id, data_dir)
+    assert dashboard["progress_series"]["visit_dates"] == [note["visit_date"] for note in notes]
+    assert dashboard["latest_visit"]["diagnosis"] == "amended"
+    assert dashboard["overview"]["occupation"] == "Pilot"
+    assert dashboard["treatment_plan"]["plan_duration"] == "12 weeks"
+
+
+def test_a_save_does_not_reread_the_note_history(saved_clinic, data_dir, monkeypatch):
+    def iter_soap_notes(*args, **kwargs):
+        raise AssertionError("the note history was read")
+
+    monkeypatch.setattr(dashboard_views.record_store, "iter_soap_notes", iter_soap_notes)
+    note = saved_clinic["notes"][0]
+    data_handler.save_record(SoapNote.from_dict(dict(note, pain_level=1)))
+    series = data_handler.load_dashboard(note["patient_id"])["progress_series"]
+    assert series["pain_level"][series["visit_dates"].index(note["visit_date"])] == 1
@@ -0,0 +1,54 @@
+# test_data_layout.py
+# This script will handle the tests for the flat and sharded data directory layouts: where files go,
+# and migrating a saved clinic to sharded and back without losing a record.
+#
+#=======================================================================================
+
+import os
+
+from utils import data_handler, data_layout, record_cache
+from utils.records import SoapNote
+
+
+def test_sharded_paths(tmp_path):
+    data_dir = str(tmp_path)
+    assert data_layout.record_path("P1", "patient_info_P1.json", data_dir) == os.path.join(data_dir,
+                                                                                          "patient_info_P1.json")
+    data_layout.migrate(data_dir, "sharded", progress=lambda message: None)
+    path = data_layout.record_path("P1", "patient_info_P1.json", data_dir, create=True)
+    assert path == os.path.join(data_dir, data_layout.shard_of("P1"), "patient_info_P1.json")
+    assert os.path.isdir(os.path.dirname(path))
+    assert data_layout.patient_id_of("soap_notes_P1_240731.json") == "P1"
+    assert data_layout.patient_id_of("soap_notes_P1.revs") == "P1"
+    assert data_layout.patient_id_of("layout.json") is None
+
+
+def _everything(clinic):
+    record_cache.clear()
+    return {patient_info["patient_id"]: (
+        data_handler.load_patient_info(patient_info["patient_id"]),
+        list(data_handler.iter_soap_notes(patient_info["patient_id"])),
+        data_handler.load_soap_note_history(patient_info["patient_id"], clinic["notes"][0]["visit_date"]))
+        for patient_info in clinic["patients"]}
+
+
+def test_migrate_to_sharded_and_back(saved_clinic, data_dir):
+    note = saved_clinic["notes"][0]
+    data_handler.save_record(SoapNote.from_dict(dict(note, diagnosis="amended")))
+    before = _everything(saved_clinic)
+    top_level = sorted(os.listdir(data_dir))
+
+    assert data_layout.migrate(data_dir, "sharded", progress=lambda message: None) > 0
+    assert not [name for name in os.listdir(data_dir) if data_layout.patient_id_of(name)]
+    assert _everything(saved_clinic) == before
+    # A save after the migration lands in the patient's shard
+    data_handler.save_record(SoapNote.from_dict(dict(note, diagnosis="amended again")))
+    assert os.path.exists(data_layout.record_path(note["patient_id"], f"soap_notes_{note['patient_id']}.revs",
+                                                  data_dir))
+    before = _everything(saved_clinic)
+    # Re-running moves nothing
+    assert data_layout.migrate(data_dir, "sharded", progress=lambda message: None) == 0
+
+    data_layout.migrate(data_dir, "flat", progress=lambda message: None)
+    assert _everything(saved_clinic) == before
+    assert sorted(os.listdir(data_dir)) == sorted(top_level + [data_layout.LAYOUT_FILENAME])
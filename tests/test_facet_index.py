@@ -0,0 +1,70 @@
+# test_facet_index.py
+# This script will handle the tests for the bitmap facet index: all_of / any_of / none_of filters,
+# value counts, and bits cleared when a record is re-saved without a value.
+#
+#=======================================================================================
+
+from utils import facet_index
+
+
+def _note(patient_id, visit_date, **facets):
+    return dict({field: [] for field in facet_index.FACET_FIELDS["soap_notes"]},
+                patient_id=patient_id, visit_date=visit_date, **facets)
+
+
+NOTES = [
+    _note("P1", "2024-01-01", pain_location=["Lower Back", "Neck"], pain_characteristics=["Sharp"]),
+    _note("P1", "2024-01-08", pain_location=["Lower Back"], pain_characteristics=["Aching"]),
+    _note("P2", "2024-01-03", pain_location=["Neck"], pain_characteristics=["Sharp", "Aching"]),
+    _note("P3", "2024-01-05", pain_location=None, pain_characteristics=["Burning"]),
+]
+
+
+def _matches(data_dir, **filters):
+    bitmap = facet_index.match("soap_notes", data_dir=data_dir, **filters)
+    return facet_index.matching_records("soap_notes", bitmap, data_dir=data_dir)
+
+
+def test_filters(tmp_path):
+    data_dir = str(tmp_path)
+    facet_index.index_records("soap_notes", NOTES, data_dir)
+    assert _matches(data_dir, all_of={"pain_location": ["Lower Back", "Neck"]}) == [("P1", "2024-01-01")]
+    assert _matches(data_dir, all_of={"pain_location": ["Neck"], "pain_characteristics": ["Sharp"]}) == [
+        ("P1", "2024-01-01"), ("P2", "2024-01-03")]
+    assert _matches(data_dir, any_of={"pain_characteristics": ["Aching", "Burning"]}) == [
+        ("P1", "2024-01-08"), ("P2", "2024-01-03"), ("P3", "2024-01-05")]
+    # any_of ANDs across fields
+    assert _matches(data_dir, any_of={"pain_location": ["Neck"], "pain_characteristics": ["Aching"]}) == [
+        ("P2", "2024-01-03")]
+    assert _matches(data_dir, none_of={"pain_location": ["Neck"]}) == [("P1", "2024-01-08"), ("P3", "2024-01-05")]
+    assert _matches(data_dir, all_of={"pain_location": ["Lower Back"]}, none_of={"pain_characteristics": ["Sharp"]}) \
+        == [("P1", "2024-01-08")]
+    assert _matches(data_dir, all_of={"pain_location": ["Hips"]}) == []
+    assert facet_index.facet_values("soap_notes", "pain_characteristics", data_dir) == [
+        ("Aching", 2), ("Sharp", 2), ("Burning", 1)]
+
+
+def test_a_resaved_record_clears_the_values_it_dropped(tmp_path):
+    data_dir = str(tmp_path)
+    facet_index.index_records("soap_notes", NOTES, data_dir)
+    # Re-saved without a pain location at all, and with one characteristic swapped
+    facet_index.index_records("soap_notes", [_note("P1", "2024-01-01", pain_location=None,
+                                                   pain_characteristics=["Burning"])], data_dir)
+    assert _matches(data_dir, all_of={"pain_location": ["Neck"]}) == [("P2", "2024-01-03")]
+    assert _matches(data_dir, all_of={"pain_characteristics": ["Burning"]}) == [
+        ("P1", "2024-01-01"), ("P3", "2024-01-05")]
+    assert ("Sharp", 1) in facet_index.facet_values("soap_notes", "pain_characteristics", data_dir)
+    # The record kept its doc id: re-saving doesn't add records
+    assert len(_matches(data_dir)) == len(NOTES)
+
+
+def test_treatment_plan_facets(tmp_path):
+    data_dir = str(tmp_path)
+    plans = [{"patient_id": "P1", "plan_start_date": "2024-01-01", "treatment_modalities": ["Spinal Manipulation"],
+              "chiro_techniques": ["Diversified"], "treatment_areas": ["Lumbar"]},
+             {"patient_id": "P2", "plan_start_date": "2024-02-01", "treatment_modalities": ["Massage"],
+              "chiro_techniques": None, "treatment_areas": ["Cervical", "Lumbar"]}]
+    facet_index.index_records("treatment_plans", plans, data_dir)
+    bitmap = facet_index.match("treatment_plans", all_of={"treatment_areas": ["Lumbar"]},
+                               none_of={"treatment_modalities": ["Massage"]}, data_dir=data_dir)
+    assert facet_index.matching_records("treatment_plans", bitmap, data_dir=data_dir) == [("P1", "2024-01-01")]
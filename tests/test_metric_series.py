@@ -0,0 +1,76 @@
+# test_metric_series.py
+# This script will handle the tests for the memory-mapped metric series: the saved notes show up in
+# date order, a re-saved visit overwrites its slot, the visit cap, and a rebuild from the record store.
+#
+#=======================================================================================
+
+import numpy as np
+
+from utils import data_handler, metric_series
+from utils.records import ROM_FIELDS, SoapNote
+
+
+def _patient_notes(clinic, patient_id):
+    return sorted((note for note in clinic["notes"] if note["patient_id"] == patient_id),
+                  key=lambda note: note["visit_date"])
+
+
+def _expected(notes):
+    # (visit dates, pain level and first ROM value of each visit)
+    return [note["visit_date"] for note in notes], [
+        [np.nan if note[column] is None else round(note[column], 2) for column in ("pain_level", ROM_FIELDS[0])]
+        for note in notes]
+
+
+def _stored(patient_id, data_dir):
+    visit_days, values = metric_series.patient_series(patient_id, data_dir)
+    columns = [metric_series.COLUMNS.index("pain_level"), metric_series.COLUMNS.index(ROM_FIELDS[0])]
+    # float32 slots: compare to the hundredth
+    return [str(day) for day in visit_days], np.round(values[:, columns].astype(float), 2).tolist()
+
+
+def _same(stored, expected):
+    assert stored[0] == expected[0]
+    np.testing.assert_array_equal(stored[1], expected[1])
+
+
+def test_saved_notes_are_in_date_order(saved_clinic, data_dir):
+    for patient_info in saved_clinic["patients"]:
+        notes = _patient_notes(saved_clinic, patient_info["patient_id"])
+        _same(_stored(patient_info["patient_id"], data_dir), _expected(notes))
+    visit_days, _ = metric_series.patient_series("nobody", data_dir)
+    assert len(visit_days) == 0
+
+
+def test_a_resaved_visit_overwrites_its_slot(saved_clinic, data_dir):
+    patient_id = saved_clinic["patients"][0]["patient_id"]
+    notes = _patient_notes(saved_clinic, patient_id)
+    notes[1] = dict(notes[1], pain_level=(notes[1]["pain_level"] + 1) % 10)
+    data_handler.save_record(SoapNote.from_dict(notes[1]))
+    _same(_stored(patient_id, data_dir), _expected(notes))
+
+
+def test_only_the_latest_visits_are_kept(tmp_path, clinic, monkeypatch):
+    monkeypatch.setattr(metric_series, "MAX_VISITS", 2)
+    data_dir = str(tmp_path)
+    patient_id = clinic["patients"][0]["patient_id"]
+    notes = _patient_notes(clinic, patient_id)
+    # Newest first, so the older visits arrive once the row is full
+    metric_series.update_series(notes[::-1], data_dir)
+    _same(_stored(patient_id, data_dir), _expected(notes[-2:]))
+
+
+def test_rebuild_matches_the_saved_series(saved_clinic, data_dir):
+    before = {patient_info["patient_id"]: _stored(patient_info["patient_id"], data_dir)
+              for patient_info in saved_clinic["patients"]}
+    assert metric_series.rebuild(data_dir) == len(saved_clinic["patients"])
+    for patient_id, stored in before.items():
+        _same(_stored(patient_id, data_dir), stored)
+
+
+def test_patient_frame_is_a_copy(saved_clinic, data_dir):
+    patient_id = saved_clinic["patients"][0]["patient_id"]
+    before = _stored(patient_id, data_dir)
+    frame = metric_series.patient_frame(patient_id, data_dir)
+    frame.iloc[:, frame.columns.get_loc("pain_level")] = -1
+    _same(_stored(patient_id, data_dir), before)
@@ -0,0 +1,28 @@
+# test_patient_summary.py
+# This script will handle the tests for the per-patient summary behind the Patient Summary page,
+# the summary PDF and the batch report job.
+#
+#=======================================================================================
+
+from datetime import date
+
+from utils import data_handler, patient_summary
+from utils.records import TreatmentPlan
+
+
+def test_summary_as_of_a_day(saved_clinic, data_dir):
+    patient_id = saved_clinic["patients"][0]["patient_id"]
+    notes = sorted((note for note in saved_clinic["notes"] if note["patient_id"] == patient_id),
+                   key=lambda note: note["visit_date"])
+    summary = patient_summary.build_patient_summary(patient_id, date.fromisoformat(notes[1]["visit_date"]), data_dir)
+    assert summary["info"]["Total Visits"] == 2
+    assert summary["info"]["Last Visit"] == notes[1]["visit_date"]
+    assert [note["visit_date"] for note in summary["recent_notes"]] == [notes[1]["visit_date"], notes[0]["visit_date"]]
+    assert patient_summary.build_patient_summary("nobody", data_dir=data_dir) is None
+
+
+def test_a_plan_with_empty_lists(saved_clinic, data_dir):
+    plan = dict(saved_clinic["plans"][0], treatment_modalities=None, exercises=None, lifestyle_changes=None)
+    data_handler.save_record(TreatmentPlan.from_dict(plan))
+    summary = patient_summary.build_patient_summary(plan["patient_id"], data_dir=data_dir)
+    assert summary["has_treatment_plan"] and summary["recommendations"] == []
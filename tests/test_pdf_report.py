@@ -0,0 +1,67 @@
+# test_pdf_report.py
+# This script will handle the smoke tests for the PDF writer: the header, a cross-reference table
+# whose offsets land on their objects, and a trailer that points back at it.
+#
+#=======================================================================================
+
+import io
+import re
+import zlib
+
+from utils import patient_report
+from utils.pdf_report import ReportDocument, line_chart
+
+
+def _check_structure(pdf):
+    assert pdf.startswith(b"%PDF-1.4\n")
+    assert pdf.endswith(b"%%EOF\n")
+    # startxref points at the xref table
+    xref_position = int(re.search(rb"startxref\n(\d+)\n%%EOF\n$", pdf).group(1))
+    assert pdf[xref_position:].startswith(b"xref\n")
+    first, count = map(int, re.match(rb"xref\n(\d+) (\d+)\n", pdf[xref_position:]).groups())
+    assert first == 0
+    entries = re.findall(rb"(\d{10}) (\d{5}) ([fn]) \n", pdf[xref_position:])
+    assert len(entries) == count
+    # The trailer's /Size matches the table and /Root is the catalog
+    trailer = re.search(rb"trailer\n<< /Size (\d+) /Root (\d+) 0 R >>", pdf)
+    assert int(trailer.group(1)) == count
+    # Every in-use entry is the byte offset of that object
+    for obj_id, (offset, _, kind) in enumerate(entries):
+        if kind == b"n":
+            assert pdf[int(offset):].startswith(f"{obj_id} 0 obj\n".encode())
+    root = int(trailer.group(2))
+    assert b"/Type /Catalog" in pdf[int(entries[root][0]):]
+
+
+def test_patient_report(saved_clinic, data_dir):
+    patient_id = saved_clinic["patients"][0]["patient_id"]
+    pdf = patient_report.patient_report_pdf(patient_id, data_dir)
+    _check_structure(pdf)
+    assert b"/Type /Page " in pdf
+
+
+def test_summary_report(saved_clinic, data_dir):
+    out = io.BytesIO()
+    assert patient_report.write_patient_summary_report(saved_clinic["patients"][0]["patient_id"], out,
+                                                       data_dir=data_dir)
+    _check_structure(out.getvalue())
+    assert not patient_report.write_patient_summary_report("nobody", io.BytesIO(), data_dir=data_dir)
+
+
+def test_long_document_spans_pages_and_reuses_charts():
+    out = io.BytesIO()
+    doc = ReportDocument(out, "Long (report)", "with \\ escapes")
+    chart = line_chart("Pain", ("a", "b", "c"), (("Pain", (3, 5, 2)),))
+    for number in range(120):
+        doc.text(f"Line {number} " + "word " * 30)
+        if number % 40 == 0:
+            doc.chart("Pain", chart)
+    doc.close()
+    pdf = out.getvalue()
+    _check_structure(pdf)
+    pages = int(re.search(rb"/Type /Pages /Kids \[[^\]]*\] /Count (\d+)", pdf).group(1))
+    assert pages > 1
+    # The chart is written once however many times it is drawn
+    assert pdf.count(b"/Subtype /Form") == 1
+    streams = [zlib.decompress(data) for data in re.findall(rb"stream\n(.*?)\nendstream", pdf, re.S)]
+    assert sum(stream.count(b"/Pain Do") for stream in streams) == 3
@@ -0,0 +1,104 @@
+# test_record_cache.py
+# This script will handle the tests for the parsed-record cache: LRU eviction, invalidating one
+# patient's records, and not caching a load that raced with a save.
+#
+#=======================================================================================
+
+import threading
+
+import pytest
+
+from utils import data_handler, record_cache
+from utils.records import PatientInfo
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    record_cache.clear()
+    yield
+    record_cache.clear()
+
+
+def _loader(value, calls):
+    def load():
+        calls.append(value)
+        return value
+    return load
+
+
+def test_hits_misses_and_cached_none():
+    calls = []
+    assert record_cache.get("patient_info", "P1", None, _loader({"a": 1}, calls)) == {"a": 1}
+    assert record_cache.get("patient_info", "P1", None, _loader({"a": 2}, calls)) == {"a": 1}
+    # A missing record is cached too
+    assert record_cache.get("patient_info", "P2", None, _loader(None, calls)) is None
+    assert record_cache.get("patient_info", "P2", None, _loader({"b": 1}, calls)) is None
+    assert calls == [{"a": 1}, None]
+    assert record_cache.stats()["hits"] == 2 and record_cache.stats()["misses"] == 2
+
+
+def test_least_recently_used_entries_are_evicted(monkeypatch):
+    monkeypatch.setattr(record_cache, "MAX_ENTRIES", 3)
+    calls = []
+    for patient_id in ["P1", "P2", "P3"]:
+        record_cache.get("patient_info", patient_id, None, _loader(patient_id, calls))
+    # P1 is used again, so P2 is now the least recently used
+    record_cache.get("patient_info", "P1", None, _loader("P1", calls))
+    record_cache.get("patient_info", "P4", None, _loader("P4", calls))
+    assert record_cache.stats()["entries"] == 3
+    calls.clear()
+    for patient_id in ["P1", "P3", "P4", "P2"]:
+        record_cache.get("patient_info", patient_id, None, _loader(patient_id, calls))
+    assert calls == ["P2"]
+
+
+def test_a_zero_size_cache_stores_nothing(monkeypatch):
+    monkeypatch.setattr(record_cache, "MAX_ENTRIES", 0)
+    calls = []
+    for _ in range(2):
+        record_cache.get("patient_info", "P1", None, _loader("P1", calls))
+    assert calls == ["P1", "P1"]
+
+
+def test_invalidate_drops_only_that_patients_records_of_that_type():
+    calls = []
+    record_cache.get("soap_notes", "P1", "240101", _loader("P1 note 1", calls))
+    record_cache.get("soap_notes", "P1", "240108", _loader("P1 note 2", calls))
+    record_cache.get("patient_info", "P1", None, _loader("P1 intake", calls))
+    record_cache.get("soap_notes", "P2", "240101", _loader("P2 note", calls))
+    record_cache.invalidate("soap_notes", "P1")
+    calls.clear()
+    record_cache.get("soap_notes", "P1", "240101", _loader("P1 note 1", calls))
+    record_cache.get("soap_notes", "P1", "240108", _loader("P1 note 2", calls))
+    record_cache.get("patient_info", "P1", None, _loader("P1 intake", calls))
+    record_cache.get("soap_notes", "P2", "240101", _loader("P2 note", calls))
+    assert calls == ["P1 note 1", "P1 note 2"]
+
+
+def test_a_load_that_raced_a_save_is_not_cached():
+    loading, saved = threading.Event(), threading.Event()
+
+    def slow_load():
+        # Reads the old record, then a save lands before the load finishes
+        loading.set()
+        saved.wait(5)
+        return "old"
+
+    result = []
+    reader = threading.Thread(target=lambda: result.append(record_cache.get("patient_info", "P1", None, slow_load)))
+    reader.start()
+    loading.wait(5)
+    record_cache.invalidate("patient_info", "P1")
+    saved.set()
+    reader.join()
+    # The reader gets what it read, but the next read loads again instead of serving the stale copy
+    assert result == ["old"]
+    assert record_cache.get("patient_info", "P1", None, lambda: "new") == "new"
+
+
+def test_a_save_refreshes_the_cached_record(data_dir, clinic):
+    patient_info = clinic["patients"][0]
+    data_handler.save_record(PatientInfo.from_dict(patient_info))
+    assert data_handler.load_patient_info(patient_info["patient_id"]) == patient_info
+    data_handler.save_record(PatientInfo.from_dict(dict(patient_info, occupation="Pilot")))
+    assert data_handler.load_patient_info(patient_info["patient_id"])["occupation"] == "Pilot"
@@ -0,0 +1,74 @@
+# test_record_format.py
+# This script will handle the tests for the on-disk record formats: encoding and detection, reads
+# across a directory holding mixed formats, and converting a data directory there and back.
+#
+#=======================================================================================
+
+import glob
+import os
+
+import pytest
+
+from utils import data_handler, record_cache, record_format, records, soap_container
+
+
+def test_encode_and_detect(clinic):
+    note = clinic["notes"][0]
+    for fmt in ["json", "binary"]:
+        encoded = record_format.encode("soap_notes", note, fmt)
+        assert record_format.detect_format(encoded) == fmt
+        assert record_format.decode(encoded) == note
+    with pytest.raises(ValueError):
+        record_format.detect_format(b"not a record")
+    with pytest.raises(ValueError):
+        record_format.encode("soap_notes", note, "yaml")
+
+
+def test_records_that_dont_fit_the_binary_layout_stay_json(clinic):
+    note = dict(clinic["notes"][0], added_later="field")
+    encoded = record_format.encode("soap_notes", note, "binary")
+    assert record_format.detect_format(encoded) == "json"
+    assert record_format.decode(encoded) == note
+
+
+def test_reads_are_the_same_in_every_format(tmp_path, clinic):
+    plan = clinic["plans"][0]
+    for fmt in ["json", "binary"]:
+        path = str(tmp_path / f"plan.{fmt}")
+        record_format.write_record(path, "treatment_plans", plan, fmt)
+        assert record_format.read_record(path) == plan
+    assert record_format.read_record(str(tmp_path / "missing.json")) is None
+    assert not glob.glob(str(tmp_path / "*.tmp"))
+
+
+def _record_bytes(data_dir):
+    return sum(os.path.getsize(path) for pattern in ["*.json", "*.notes"]
+               for path in glob.glob(os.path.join(data_dir, pattern)))
+
+
+def _everything(clinic):
+    return {patient_info["patient_id"]: (data_handler.load_patient_info(patient_info["patient_id"]),
+                                         list(data_handler.iter_soap_notes(patient_info["patient_id"])))
+            for patient_info in clinic["patients"]}
+
+
+def test_convert_round_trip_covers_files_and_containers(saved_clinic, data_dir):
+    before = _everything(saved_clinic)
+    size = _record_bytes(data_dir)
+
+    converted, kept, _, _ = record_format.convert(data_dir, "binary", data_handler.RECORD_PATTERNS,
+                                                  progress=lambda message: None)
+    assert (converted, kept) == (len(saved_clinic["patients"]) * 2 + len(saved_clinic["notes"]), 0)
+    patient_id = saved_clinic["patients"][0]["patient_id"]
+    with open(soap_container.container_paths(patient_id, data_dir)[0], "rb") as f:
+        assert records.MAGIC in f.read()
+    record_cache.clear()
+    assert _everything(saved_clinic) == before
+    assert _record_bytes(data_dir) < size
+
+    record_format.convert(data_dir, "json", data_handler.RECORD_PATTERNS, progress=lambda message: None)
+    record_cache.clear()
+    assert _everything(saved_clinic) == before
+    # Nothing left to convert the second time round
+    assert record_format.convert(data_dir, "json", data_handler.RECORD_PATTERNS,
+                                 progress=lambda message: None)[:2] == (0, 0)
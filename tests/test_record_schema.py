@@ -0,0 +1,84 @@
+# test_record_schema.py
+# This script will handle the tests for the compiled record schemas: each kind of check, and
+# data_handler refusing bad records and notes for patients without an intake form.
+#
+#=======================================================================================
+
+import os
+
+import pytest
+
+from utils import data_handler, record_schema
+from utils.records import PatientInfo, SoapNote
+
+SCHEMA = {
+    "patient_id": {"type": "id", "required": True, "nullable": False},
+    "name": {"type": "str", "min_length": 1},
+    "visit_date": {"type": "date"},
+    "visit_time": {"type": "time"},
+    "count": {"type": "integer", "minimum": 0, "maximum": 10},
+    "weight": {"type": "number"},
+    "flag": {"type": "bool"},
+    "gender": {"type": "str", "enum": ["Male", "Female"]},
+    "tags": {"type": "list", "items": "str"},
+    "pain": {"type": "object", "properties": {"level": {"type": "integer", "maximum": 10}}},
+    "scores": {"type": "object", "values": "integer"},
+}
+
+
+def test_a_valid_record_has_no_errors():
+    validate = record_schema.compile_schema(SCHEMA)
+    assert validate({"patient_id": "P-1", "name": "Ann", "visit_date": "2024-07-31", "visit_time": "09:30",
+                     "count": 3, "weight": 61.5, "flag": True, "gender": "Female", "tags": ["a", "b"],
+                     "pain": {"level": 4}, "scores": {"a": 1, "b": None}}) == []
+    # Optional fields may be missing or empty
+    assert validate({"patient_id": "P-1", "name": None}) == []
+
+
+@pytest.mark.parametrize("field, value, error", [
+    ("patient_id", "../etc", "is not a valid ID"),
+    ("name", "  ", "must not be blank"),
+    ("visit_date", "31/07/2024", "must be a YYYY-MM-DD date"),
+    ("visit_time", "late", "must be an HH:MM[:SS] time"),
+    ("count", 11, "must be at most 10"),
+    ("count", -1, "must be at least 0"),
+    ("count", 2.5, "must be a whole number"),
+    ("weight", True, "must be a number"),
+    ("flag", "yes", "must be true or false"),
+    ("gender", "X", "must be one of Male, Female"),
+    ("tags", ["a", 1], "[1] must be text"),
+    ("tags", ["a", None], "[1] is empty"),
+    ("pain", {"level": 12}, "(level must be at most 10)"),
+    ("scores", {"a": 1, "b": "2"}, "(b must be a whole number)"),
+])
+def test_each_check_reports_its_field(field, value, error):
+    errors = record_schema.compile_schema(SCHEMA)(dict({"patient_id": "P1"}, **{field: value}))
+    assert len(errors) == 1 and errors[0].startswith(f"{field} {error}")
+
+
+def test_required_and_nullable():
+    validate = record_schema.compile_schema(SCHEMA)
+    assert validate({}) == ["patient_id is missing"]
+    assert validate({"patient_id": None}) == ["patient_id is empty"]
+    assert validate([]) == ["record must be an object"]
+
+
+def test_save_refuses_an_invalid_record(data_dir, clinic):
+    note = dict(clinic["notes"][0], pain_level=14, visit_date="2024-13-01")
+    data_handler.save_record(PatientInfo.from_dict(clinic["patients"][0]))
+    with pytest.raises(ValueError) as raised:
+        data_handler.validate_record("soap_notes", note)
+    assert "pain_level must be at most 10" in str(raised.value)
+    assert "visit_date must be a YYYY-MM-DD date" in str(raised.value)
+
+
+def test_a_note_needs_its_patients_intake_form(data_dir, clinic):
+    note = clinic["notes"][0]
+    with pytest.raises(ValueError, match="no intake form on file"):
+        data_handler.save_record(SoapNote.from_dict(note))
+    assert not os.path.exists(data_dir) or not [name for name in os.listdir(data_dir) if name.startswith("soap")]
+    # known_patients stands in for the record store (bulk import checks against the batch being imported)
+    data_handler.check_patient("soap_notes", note, {note["patient_id"]})
+    with pytest.raises(ValueError):
+        data_handler.check_patient("soap_notes", note, set())
+    data_handler.check_patient("patient_info", clinic["patients"][0])
@@ -0,0 +1,63 @@
+# test_record_store.py
+# This script will handle the tests for the indexed record store and rebuilding it from files.
+#
+#=======================================================================================
+
+import glob
+import json
+import os
+
+from utils import data_handler, facet_index, record_cache, record_store, search_index
+
+
+def test_saves_are_indexed(saved_clinic, data_dir):
+    patient_ids = [patient_id for patient_id, _ in record_store.list_patients(data_dir)]
+    assert sorted(patient_ids) == sorted(p["patient_id"] for p in saved_clinic["patients"])
+    patient_id = saved_clinic["patients"][0]["patient_id"]
+    notes = record_store.query_soap_notes(patient_id, data_dir=data_dir)
+    assert [note["visit_date"] for note in notes] == sorted(
+        note["visit_date"] for note in saved_clinic["notes"] if note["patient_id"] == patient_id)
+    assert record_store.get_latest_soap_note(patient_id, data_dir) == notes[-1]
+
+
+def test_rebuild_restores_a_lost_store(saved_clinic, data_dir, monkeypatch):
+    patient_id = saved_clinic["patients"][0]["patient_id"]
+    before = record_store.query_soap_notes(patient_id, data_dir=data_dir)
+    # As after a restart with records.db deleted
+    record_store.close_connections()
+    monkeypatch.setattr(search_index, "_initialized", set())
+    monkeypatch.setattr(facet_index, "_initialized", set())
+    for suffix in ("", "-wal", "-shm"):
+        path = os.path.join(data_dir, record_store.DB_FILENAME + suffix)
+        if os.path.exists(path):
+            os.remove(path)
+
+    assert data_handler.rebuild_record_store() == []
+    assert record_store.query_soap_notes(patient_id, data_dir=data_dir) == before
+    assert record_store.get_patient_info(patient_id, data_dir) == data_handler.load_patient_info(patient_id)
+
+
+def test_rebuild_command(saved_clinic, data_dir, capsys):
+    assert data_handler.main(["--rebuild", "--data-dir", data_dir]) == 0
+    assert "Rebuilt the record store" in capsys.readouterr().out
+
+
+def test_notes_load_from_the_container_index_and_the_store(saved_clinic, data_dir, monkeypatch):
+    patient_id = saved_clinic["patients"][0]["patient_id"]
+    notes = sorted((note for note in saved_clinic["notes"] if note["patient_id"] == patient_id),
+                   key=lambda note: note["visit_date"])
+    # An older visit kept as a per-visit file from before the containers, indexed by a rebuild
+    legacy = dict(notes[0], visit_date="2020-01-06", diagnosis="legacy")
+    with open(os.path.join(data_dir, f"soap_notes_{patient_id}_200106.json"), "w") as f:
+        json.dump(legacy, f)
+    record_store.index_records("soap_notes", [legacy], data_dir)
+    record_cache.clear()
+
+    def no_glob(*args, **kwargs):
+        raise AssertionError("the data directory was scanned")
+
+    monkeypatch.setattr(glob, "glob", no_glob)
+    assert list(data_handler.iter_soap_notes(patient_id)) == [legacy] + notes
+    assert data_handler.load_recent_soap_notes(patient_id, 2) == notes[-2:]
+    assert data_handler.load_latest_soap_note(patient_id) == notes[-1]
+    assert data_handler.load_soap_note(patient_id, "2020-01-06") == legacy
@@ -0,0 +1,64 @@
+# test_records.py
+# This script will handle the tests for the typed record classes: the saved-document dicts and the
+# binary layout both round-trip, and bad arguments are refused the way the old save functions did.
+#
+#=======================================================================================
+
+import pytest
+
+from utils import data_handler, records
+from utils.records import PatientInfo, SoapNote, TreatmentPlan
+
+
+def test_dicts_round_trip(clinic):
+    for record_class, key in [(PatientInfo, "patients"), (SoapNote, "notes"), (TreatmentPlan, "plans")]:
+        for data in clinic[key]:
+            assert record_class.from_dict(data).to_dict() == data
+
+
+def test_binary_round_trip(clinic):
+    for record_class, key in [(PatientInfo, "patients"), (SoapNote, "notes"), (TreatmentPlan, "plans")]:
+        for data in clinic[key]:
+            record = record_class.from_dict(data)
+            encoded = record.to_bytes()
+            assert encoded[:2] == records.MAGIC
+            assert records.from_bytes(encoded) == record
+            assert records.dict_from_bytes(encoded) == data
+
+
+def test_missing_rom_values_survive_the_binary_layout(clinic):
+    data = dict(clinic["notes"][0], **{field: None for field in records.ROM_FIELDS[:3]})
+    assert records.dict_from_bytes(SoapNote.from_dict(data).to_bytes()) == data
+
+
+def test_corrupt_binary_record_is_refused(clinic):
+    encoded = SoapNote.from_dict(clinic["notes"][0]).to_bytes()
+    with pytest.raises(ValueError):
+        records.from_bytes(b"XX" + encoded[2:])
+    with pytest.raises(ValueError):
+        records.from_bytes(encoded[:4] + b"[1, 2]")
+
+
+def test_positional_arguments_follow_the_old_save_functions(clinic):
+    data = clinic["plans"][0]
+    assert TreatmentPlan(*[data[param] for param in TreatmentPlan.PARAMS]).to_dict() == data
+
+
+def test_bad_arguments_are_refused(clinic):
+    data = clinic["plans"][0]
+    with pytest.raises(TypeError):
+        TreatmentPlan(*[data[param] for param in TreatmentPlan.PARAMS[:-1]])
+    with pytest.raises(TypeError):
+        TreatmentPlan(**dict(data, surprise=1))
+    patient_info = dict(clinic["patients"][0])
+    patient_info["pain_characteristics"] = dict(patient_info["pain_characteristics"],
+                                                sharp={"intensity": 3, "frequency": "Hourly"})
+    with pytest.raises(ValueError):
+        PatientInfo.from_dict(patient_info)
+
+
+def test_save_functions_return_the_saved_dict(data_dir, clinic):
+    data_handler.save_record(PatientInfo.from_dict(clinic["patients"][0]))
+    note = [note for note in clinic["notes"] if note["patient_id"] == clinic["patients"][0]["patient_id"]][0]
+    assert data_handler.save_soap_info(*[note[param] for param in SoapNote.PARAMS]) == note
+    assert data_handler.load_soap_note(note["patient_id"], note["visit_date"]) == note
@@ -0,0 +1,123 @@
+# test_save_queue.py
+# This script will handle the tests for the background save pipeline: per-patient ordering, a bad
+# save failing alone, flushing, notes queued behind a failed intake form, and saves racing
+# write-log compaction.
+#
+#=======================================================================================
+
+import glob
+import os
+import threading
+import time
+
+import pytest
+
+from utils import data_handler, record_cache, save_queue, soap_revisions, write_log
+from utils.records import PatientInfo, SoapNote
+
+
+def test_saves_for_one_key_keep_their_order():
+    written = []
+
+    def write_batch(items):
+        time.sleep(0.001)
+        written.extend(items)
+        return items
+
+    saves = save_queue.SaveQueue(write_batch, workers=3, batch_size=4)
+    futures = [saves.submit(key, (key, number)) for number in range(50) for key in "abcde"]
+    saves.flush()
+    assert [future.result() for future in futures] == [(key, number) for number in range(50) for key in "abcde"]
+    for key in "abcde":
+        assert [number for item_key, number in written if item_key == key] == list(range(50))
+    saves.close()
+
+
+def test_a_bad_save_fails_alone():
+    def write_batch(items):
+        if "bad" in items:
+            raise ValueError("bad item")
+        return [item.upper() for item in items]
+
+    saves = save_queue.SaveQueue(write_batch, workers=1, batch_size=8)
+    futures = [saves.submit("key", item) for item in ["one", "bad", "two"]]
+    saves.flush()
+    assert futures[0].result() == "ONE" and futures[2].result() == "TWO"
+    with pytest.raises(ValueError):
+        futures[1].result()
+    saves.close()
+
+
+def test_submitted_records_are_saved_by_flush(data_dir, clinic):
+    patient_info = clinic["patients"][0]
+    notes = [note for note in clinic["notes"] if note["patient_id"] == patient_info["patient_id"]]
+    futures = [data_handler.submit_record(PatientInfo.from_dict(patient_info))]
+    # The notes pass validation while their patient's intake form is still queued
+    futures += [data_handler.submit_record(SoapNote.from_dict(note)) for note in notes]
+    data_handler.flush_saves()
+    assert all(future.done() for future in futures)
+    assert list(data_handler.iter_soap_notes(patient_info["patient_id"])) == sorted(
+        notes, key=lambda note: note["visit_date"])
+
+
+def test_notes_queued_behind_a_failed_intake_form_fail_too(data_dir, clinic, monkeypatch):
+    patient_info = clinic["patients"][0]
+    note = [note for note in clinic["notes"] if note["patient_id"] == patient_info["patient_id"]][0]
+    store_record = data_handler._store_record
+
+    def failing_store(record_type, *args, **kwargs):
+        if record_type == "patient_info":
+            raise OSError("disk full")
+        return store_record(record_type, *args, **kwargs)
+
+    monkeypatch.setattr(data_handler, "_store_record", failing_store)
+    intakes = [data_handler.submit_record(PatientInfo.from_dict(patient_info)) for _ in range(2)]
+    note_future = data_handler.submit_record(SoapNote.from_dict(note))
+    data_handler.flush_saves()
+    assert all(isinstance(future.exception(), OSError) for future in intakes)
+    with pytest.raises(ValueError, match="no intake form on file"):
+        note_future.result()
+    assert patient_info["patient_id"] not in data_handler._queued_intakes
+    assert data_handler.load_soap_note(note["patient_id"], note["visit_date"]) is None
+    with pytest.raises(ValueError):
+        data_handler.submit_record(SoapNote.from_dict(note))
+
+
+def test_saves_racing_compaction_stay_consistent(saved_clinic, data_dir, monkeypatch):
+    monkeypatch.setattr(write_log, "COMPACT_BYTES", 20000)
+    notes = saved_clinic["notes"]
+    errors = []
+
+    def amend(note, rounds=15):
+        try:
+            for number in range(rounds):
+                data_handler.save_record(SoapNote.from_dict(dict(note, diagnosis=f"revision {number}")))
+        except Exception as error:
+            errors.append(error)
+
+    def compact():
+        try:
+            for _ in range(10):
+                data_handler.compact_write_log()
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=amend, args=(note,)) for note in notes[:8]]
+    threads.append(threading.Thread(target=compact))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert not glob.glob(os.path.join(data_dir, "**", "*.tmp"), recursive=True)
+
+    # Replaying whatever is left changes nothing, and every copy agrees on the last save
+    data_handler.recover_write_log()
+    record_cache.clear()
+    for note in notes[:8]:
+        latest = dict(note, diagnosis="revision 14")
+        assert data_handler.load_soap_note(note["patient_id"], note["visit_date"]) == latest
+        assert data_handler._indexed_record("soap_notes", latest) == latest
+        history = data_handler.load_soap_note_history(note["patient_id"], note["visit_date"])
+        assert history[-1]["record"] == latest
+        assert history[-1]["hash"] == soap_revisions.record_hash(latest)
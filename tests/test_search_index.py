@@ -0,0 +1,66 @@
+# test_search_index.py
+# This script will handle the tests for full-text SOAP note search: turning user input into a safe
+# FTS5 query, ranked lookups, and re-saved notes replacing their index entry.
+#
+#=======================================================================================
+
+import pytest
+
+from utils import data_handler, search_index
+from utils.records import SoapNote
+
+
+@pytest.mark.parametrize("text, query", [
+    ("radiculopathy", '"radiculopathy"'),
+    ("lower back", '"lower" AND "back"'),
+    ('"lower back pain"', '"lower back pain"'),
+    ("radic*", '"radic"*'),
+    ("radic* spasm", '"radic"* AND "spasm"'),
+    # FTS5 operators and punctuation in user input are searched as plain words, never parsed
+    ("NOT pain", '"NOT" AND "pain"'),
+    ("neck-pain", '"neck pain"'),
+    ("(spasm) OR ^disc: -", '"spasm" AND "OR" AND "disc"'),
+    ('"unclosed phrase', '"unclosed" AND "phrase"'),
+    ("* ( ) :", ""),
+    ("", ""),
+])
+def test_build_match_query(text, query):
+    assert search_index.build_match_query(text) == query
+
+
+def _save_note(saved_clinic, **changes):
+    note = dict(saved_clinic["notes"][0], **changes)
+    data_handler.save_record(SoapNote.from_dict(note))
+    return note
+
+
+def test_search_finds_and_ranks_notes(saved_clinic, data_dir):
+    note = _save_note(saved_clinic, diagnosis="Costochondritis, costochondritis suspected at every visit",
+                      palpation="Costochondral tenderness")
+    results = search_index.search_soap_notes("costochondritis", data_dir=data_dir)
+    assert [(result["patient_id"], result["visit_date"]) for result in results] == [
+        (note["patient_id"], note["visit_date"])]
+    assert "**" in results[0]["snippet"]
+    assert [result["visit_date"] for result in search_index.search_soap_notes("costochond*", data_dir=data_dir)] == [
+        note["visit_date"]]
+    assert search_index.search_soap_notes("costochondritis", patient_id="nobody", data_dir=data_dir) == []
+    # Operator characters in the input don't raise an FTS5 syntax error
+    assert search_index.search_soap_notes('costochondritis AND ("', data_dir=data_dir)
+    assert search_index.search_soap_notes("()", data_dir=data_dir) == []
+
+    # More mentions rank higher
+    other = dict(saved_clinic["notes"][1], diagnosis="Costochondritis")
+    data_handler.save_record(SoapNote.from_dict(other))
+    results = search_index.search_soap_notes("costochondritis", data_dir=data_dir)
+    assert [result["visit_date"] for result in results] == [note["visit_date"], other["visit_date"]]
+    assert results[0]["score"] > results[1]["score"]
+
+
+def test_a_resaved_note_replaces_its_entry(saved_clinic, data_dir):
+    _save_note(saved_clinic, diagnosis="Suspected spondylolisthesis")
+    assert len(search_index.search_soap_notes("spondylolisthesis", data_dir=data_dir)) == 1
+    note = _save_note(saved_clinic, diagnosis="Confirmed scoliosis")
+    assert search_index.search_soap_notes("spondylolisthesis", data_dir=data_dir) == []
+    results = search_index.search_soap_notes("scoliosis", data_dir=data_dir)
+    assert [(result["patient_id"], result["visit_date"]) for result in results] == [
+        (note["patient_id"], note["visit_date"])]
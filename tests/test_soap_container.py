@@ -0,0 +1,99 @@
+# test_soap_container.py
+# This script will handle the tests for the per-patient SOAP note containers: appends and reads,
+# compaction, recovering from a stale or torn index, and packing the old per-visit files.
+#
+#=======================================================================================
+
+import json
+import os
+
+from utils import soap_container
+
+
+def _notes(clinic, patient_index=0):
+    patient_id = clinic["patients"][patient_index]["patient_id"]
+    return [note for note in clinic["notes"] if note["patient_id"] == patient_id]
+
+
+def test_appended_notes_read_back(tmp_path, clinic):
+    data_dir = str(tmp_path)
+    notes = _notes(clinic)
+    for note in notes:
+        soap_container.append_note(note, data_dir)
+    patient_id = notes[0]["patient_id"]
+    assert soap_container.visit_dates(patient_id, data_dir) == sorted(note["visit_date"] for note in notes)
+    assert soap_container.read_notes(patient_id, data_dir=data_dir) == {note["visit_date"]: note for note in notes}
+    wanted = [notes[1]["visit_date"], "1999-01-01"]
+    assert soap_container.read_notes(patient_id, wanted, data_dir) == {notes[1]["visit_date"]: notes[1]}
+    assert soap_container.read_notes("nobody", data_dir=data_dir) == {}
+
+
+def test_a_resaved_visit_wins_and_compaction_keeps_only_it(tmp_path, clinic):
+    data_dir = str(tmp_path)
+    notes = _notes(clinic)
+    for note in notes:
+        soap_container.append_note(note, data_dir)
+    amended = dict(notes[0], diagnosis="amended")
+    soap_container.append_note(amended, data_dir)
+    patient_id = notes[0]["patient_id"]
+    assert soap_container.read_notes(patient_id, [amended["visit_date"]], data_dir)[amended["visit_date"]] == amended
+
+    data_path = soap_container.container_paths(patient_id, data_dir)[0]
+    size = os.path.getsize(data_path)
+    soap_container.compact(patient_id, data_dir)
+    assert os.path.getsize(data_path) < size
+    assert soap_container.read_notes(patient_id, data_dir=data_dir) == dict(
+        {note["visit_date"]: note for note in notes}, **{amended["visit_date"]: amended})
+
+
+def test_a_stale_index_is_rebuilt_from_the_data_file(tmp_path, clinic):
+    data_dir = str(tmp_path)
+    notes = _notes(clinic)
+    for note in notes:
+        soap_container.append_note(note, data_dir)
+    patient_id = notes[0]["patient_id"]
+    data_path, index_path = container_paths = soap_container.container_paths(patient_id, data_dir)
+    # An index pointing at the wrong offsets, e.g. left behind by a compaction cut off mid-way
+    with open(index_path, "wb") as f:
+        f.write(soap_container.INDEX_ENTRY.pack(notes[0]["visit_date"].encode("ascii"), 7, 20))
+    assert soap_container.read_notes(patient_id, data_dir=data_dir) == {note["visit_date"]: note for note in notes}
+    # The repaired index was written back
+    assert soap_container.visit_dates(patient_id, data_dir) == sorted(note["visit_date"] for note in notes)
+    assert all(os.path.exists(path) for path in container_paths)
+
+
+def test_a_torn_append_is_ignored(tmp_path, clinic):
+    data_dir = str(tmp_path)
+    notes = _notes(clinic)
+    for note in notes[:-1]:
+        soap_container.append_note(note, data_dir)
+    patient_id = notes[0]["patient_id"]
+    data_path, index_path = soap_container.container_paths(patient_id, data_dir)
+    # A crash part-way through appending the last note: half a record, and half an index entry
+    encoded = json.dumps(notes[-1]).encode("utf-8")
+    with open(data_path, "ab") as f:
+        f.write(soap_container.RECORD_HEADER.pack(soap_container.HEADER_MAGIC,
+                                                  notes[-1]["visit_date"].encode("ascii"), len(encoded)))
+        f.write(encoded[:len(encoded) // 2])
+    with open(index_path, "ab") as f:
+        f.write(b"\0" * (soap_container.INDEX_ENTRY.size // 2))
+    assert soap_container.read_notes(patient_id, data_dir=data_dir) == {note["visit_date"]: note
+                                                                       for note in notes[:-1]}
+    # The next append lands after the torn record and reads back
+    soap_container.append_note(notes[-1], data_dir)
+    assert soap_container.read_notes(patient_id, data_dir=data_dir) == {note["visit_date"]: note for note in notes}
+
+
+def test_pack_legacy_files(tmp_path, clinic):
+    data_dir = str(tmp_path)
+    notes = _notes(clinic)
+    soap_container.append_note(notes[0], data_dir)
+    for note in notes:
+        visit_key = note["visit_date"].replace("-", "")[2:]
+        with open(os.path.join(data_dir, f"soap_notes_{note['patient_id']}_{visit_key}.json"), "w") as f:
+            json.dump(dict(note, diagnosis="older copy") if note is notes[0] else note, f)
+    assert soap_container.pack_legacy_files(data_dir, progress=lambda message: None) == len(notes)
+    assert not [name for name in os.listdir(data_dir) if name.endswith(".json")]
+    # A visit already in the container keeps the container's copy
+    assert soap_container.read_notes(notes[0]["patient_id"], data_dir=data_dir) == {
+        note["visit_date"]: note for note in notes}
@@ -0,0 +1,83 @@
+# test_soap_revisions.py
+# This script will handle the tests for the SOAP note revision trail: deltas, skipped unchanged saves,
+# the baseline kept for notes saved before revisions, and replays that must not add revisions.
+#
+#=======================================================================================
+
+import json
+import os
+
+from utils import data_handler, record_cache, soap_container, soap_revisions, write_log
+from utils.records import SoapNote
+
+
+def test_diff_and_apply_delta_round_trip():
+    old = {"a": 1, "b": [1, 2], "c": "x"}
+    new = {"a": 1, "b": [1, 2, 3], "d": None}
+    delta = soap_revisions.diff(old, new)
+    assert delta == {"set": {"b": [1, 2, 3], "d": None}, "unset": ["c"]}
+    assert soap_revisions.apply_delta(old, delta) == new
+    assert soap_revisions.apply_delta(None, soap_revisions.diff(None, new)) == new
+    assert soap_revisions.record_hash({"a": 1, "b": 2}) == soap_revisions.record_hash({"b": 2, "a": 1})
+
+
+def test_history_holds_every_version(saved_clinic, data_dir):
+    note = saved_clinic["notes"][0]
+    versions = [note] + [dict(note, diagnosis=f"revision {number}", pain_level=number) for number in range(3)]
+    for version in versions[1:]:
+        data_handler.save_record(SoapNote.from_dict(version))
+    history = data_handler.load_soap_note_history(note["patient_id"], note["visit_date"])
+    assert [version["revision"] for version in history] == [1, 2, 3, 4]
+    assert [version["record"] for version in history] == versions
+    assert all(soap_revisions.record_hash(version["record"]) == version["hash"] for version in history)
+    assert history[1]["changed"] == ["diagnosis", "pain_level"]
+    # Only the changed fields are stored after the first revision
+    with open(soap_revisions.revisions_path(note["patient_id"], data_dir)) as f:
+        entries = [json.loads(line) for line in f if json.loads(line)["visit_date"] == note["visit_date"]]
+    assert sorted(entries[-1]["set"]) == ["diagnosis", "pain_level"]
+
+
+def test_an_unchanged_save_writes_nothing(saved_clinic, data_dir):
+    note = saved_clinic["notes"][0]
+    data_path = soap_container.container_paths(note["patient_id"], data_dir)[0]
+    sizes = [os.path.getsize(path) for path in (data_path, write_log.log_path(data_dir),
+                                                soap_revisions.revisions_path(note["patient_id"], data_dir))]
+    data_handler.save_record(SoapNote.from_dict(dict(reversed(list(note.items())))))
+    assert [os.path.getsize(path) for path in (data_path, write_log.log_path(data_dir),
+                                               soap_revisions.revisions_path(note["patient_id"], data_dir))] == sizes
+
+
+def test_a_note_saved_before_revisions_keeps_its_original(saved_clinic, data_dir):
+    note = saved_clinic["notes"][0]
+    # As if the note had been saved before the revisions file existed
+    os.remove(soap_revisions.revisions_path(note["patient_id"], data_dir))
+    soap_revisions._indexes.clear()
+    amended = dict(note, diagnosis="amended")
+    data_handler.save_record(SoapNote.from_dict(amended))
+    history = data_handler.load_soap_note_history(note["patient_id"], note["visit_date"])
+    assert [version["record"] for version in history] == [note, amended]
+
+
+def test_replaying_the_log_adds_no_revisions(saved_clinic, data_dir):
+    note = saved_clinic["notes"][0]
+    data_handler.save_record(SoapNote.from_dict(dict(note, diagnosis="amended")))
+    paths = [soap_container.container_paths(note["patient_id"], data_dir)[0],
+             soap_revisions.revisions_path(note["patient_id"], data_dir)]
+    sizes = [os.path.getsize(path) for path in paths]
+    assert data_handler.recover_write_log() > 0
+    assert [os.path.getsize(path) for path in paths] == sizes
+    record_cache.clear()
+    assert data_handler.load_soap_note(note["patient_id"], note["visit_date"]) == dict(note, diagnosis="amended")
+
+
+def test_a_revision_written_before_a_crash_is_not_doubled(saved_clinic, data_dir):
+    note = saved_clinic["notes"][0]
+    amended = dict(note, diagnosis="amended")
+    # The crash came after the revision was recorded but before the container write
+    soap_revisions.record_revision(amended, note, data_dir)
+    write_log.append("soap_notes", SoapNote.from_dict(amended).filename(), amended, data_dir)
+    data_handler.recover_write_log()
+    record_cache.clear()
+    assert data_handler.load_soap_note(note["patient_id"], note["visit_date"]) == amended
+    history = data_handler.load_soap_note_history(note["patient_id"], note["visit_date"])
+    assert [version["record"] for version in history] == [note, amended]
@@ -0,0 +1,100 @@
+# test_write_log.py
+# This script will handle the tests for the write-ahead log: replay, torn entries, compaction and
+# recovering saves cut off by a crash, the fsync timer and compaction in the background.
+#
+#=======================================================================================
+
+import json
+import os
+import threading
+import time
+
+from utils import data_handler, record_store, write_log
+from utils.records import SoapNote
+
+
+def _entry(filename, value):
+    return json.dumps({"type": "soap_notes", "file": filename, "record": {"value": value}}) + "\n"
+
+
+def test_replay_skips_a_torn_final_entry(tmp_path):
+    data_dir = str(tmp_path)
+    with open(write_log.log_path(data_dir), "w") as f:
+        f.write(_entry("a", 1) + _entry("b", 2) + '{"type": "soap_no')
+    assert [(filename, record) for _, filename, record in write_log.replay(data_dir)] == [
+        ("a", {"value": 1}), ("b", {"value": 2})]
+
+
+def test_compact_applies_the_latest_entry_per_file_and_empties_the_log(tmp_path):
+    data_dir = str(tmp_path)
+    for filename, value in [("a", 1), ("b", 2), ("a", 3)]:
+        write_log.append("soap_notes", filename, {"value": value}, data_dir)
+    applied = []
+    assert write_log.compact(lambda record_type, filename, record: applied.append((filename, record)),
+                             data_dir) == 2
+    assert sorted(applied) == [("a", {"value": 3}), ("b", {"value": 2})]
+    assert list(write_log.replay(data_dir)) == []
+
+
+def test_rotated_log_left_by_a_crash_is_replayed_first(tmp_path):
+    data_dir = str(tmp_path)
+    path = write_log.log_path(data_dir)
+    with open(path + write_log.ROTATED_SUFFIX, "w") as f:
+        f.write(_entry("a", 1) + '{"torn')
+    with open(path, "w") as f:
+        f.write(_entry("a", 2) + _entry("b", 3))
+    applied = {}
+    write_log.compact(lambda record_type, filename, record: applied.update({filename: record}), data_dir)
+    assert applied == {"a": {"value": 2}, "b": {"value": 3}}
+    assert not os.path.exists(path + write_log.ROTATED_SUFFIX)
+
+
+def test_recovery_finishes_a_save_cut_off_after_logging(saved_clinic, data_dir):
+    note = dict(saved_clinic["notes"][0], pain_level=9, diagnosis="Logged but never written")
+    note = SoapNote.from_dict(note).to_dict()
+    # The crash: logged, but neither written to the container nor indexed
+    write_log.append("soap_notes", SoapNote.from_dict(note).filename(), note, data_dir)
+    write_log.sync(data_dir)
+
+    data_handler.recover_write_log()
+    assert data_handler.load_soap_note(note["patient_id"], note["visit_date"]) == note
+    assert record_store.query_soap_notes(note["patient_id"], note["visit_date"], note["visit_date"],
+                                         data_dir) == [note]
+    assert list(write_log.replay(data_dir)) == []
+
+
+def test_a_lone_append_is_synced_after_the_interval(tmp_path, monkeypatch):
+    data_dir = str(tmp_path)
+    monkeypatch.setattr(write_log, "FSYNC_INTERVAL", 0.05)
+    synced = []
+    sync = write_log._sync
+
+    def record_sync(path):
+        synced.append(path)
+        sync(path)
+
+    monkeypatch.setattr(write_log, "_sync", record_sync)
+    path = write_log.log_path(data_dir)
+    write_log.append("soap_notes", "a", {"value": 1}, data_dir)
+    assert path not in synced
+    time.sleep(0.2)
+    assert synced.count(path) == 1
+    write_log.rotate(data_dir)
+
+
+def test_a_full_log_is_compacted_off_the_saving_thread(saved_clinic, data_dir, monkeypatch):
+    monkeypatch.setattr(write_log, "COMPACT_BYTES", 1)
+    compacted_on = []
+    compact_write_log = data_handler.compact_write_log
+
+    def compact(wait=True):
+        compacted_on.append(threading.current_thread())
+        return compact_write_log(wait)
+
+    monkeypatch.setattr(data_handler, "compact_write_log", compact)
+    note = dict(saved_clinic["notes"][0], diagnosis="amended")
+    data_handler.save_record(SoapNote.from_dict(note))
+    data_handler._finish_compaction()
+    assert compacted_on and threading.current_thread() not in compacted_on
+    assert list(write_log.replay(data_dir)) == []
+    assert data_handler.load_soap_note(note["patient_id"], note["visit_date"]) == note
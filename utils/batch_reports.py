@@ -0,0 +1,173 @@
+# batch_reports.py
+# This script will handle the end-of-month batch of patient summary PDFs. Every patient with a
+# SOAP visit in the month gets the same summary the Patient Summary page shows, written as
+# <patient_id>.pdf in the output directory next to a manifest.json.
+#
+# [How it runs]
+# The record store is first copied (SQLite backup API) into <out>/.snapshot/, so every worker
+# reads one consistent, read-only view of the records while the app keeps saving. Patients are
+# fanned out across a process pool; each report is written to a temp file and renamed into place,
+# and the manifest is rewritten after every finished report. Re-running with the same output
+# directory reuses the snapshot and skips every patient already in the manifest.
+#
+# Usage:
+#   python -m utils.batch_reports --month 2024-06 --out ./reports/2024-06
+#
+#=======================================================================================
+
+import argparse
+import calendar
+import glob
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime
+
+from utils.patient_report import write_patient_summary_report
+from utils.record_store import DB_FILENAME, get_connection
+
+MANIFEST_FILENAME = "manifest.json"
+SNAPSHOT_DIRNAME = ".snapshot"
+
+
+def month_range(month):
+    # "YYYY-MM" -> (first day, last day)
+    first = datetime.strptime(month, "%Y-%m").date()
+    last = first.replace(day=calendar.monthrange(first.year, first.month)[1])
+    return first, last
+
+
+def report_filename(patient_id):
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", patient_id) + ".pdf"
+
+
+def active_patients(month, data_dir="./data"):
+    first, last = month_range(month)
+    conn = get_connection(data_dir)
+    rows = conn.execute("SELECT DISTINCT patient_id FROM soap_notes WHERE visit_date BETWEEN ? AND ? "
+                        "ORDER BY patient_id", (first.isoformat(), last.isoformat()))
+    return [row[0] for row in rows]
+
+#=======================================================================================
+# Snapshot and manifest
+#=======================================================================================
+
+def create_snapshot(data_dir, out_dir):
+    snapshot_dir = os.path.join(out_dir, SNAPSHOT_DIRNAME)
+    snapshot_path = os.path.join(snapshot_dir, DB_FILENAME)
+    if os.path.exists(snapshot_path):
+        return snapshot_dir
+    os.makedirs(snapshot_dir, exist_ok=True)
+    tmp_path = snapshot_path + ".tmp"
+    target = sqlite3.connect(tmp_path)
+    with target:
+        get_connection(data_dir).backup(target)
+    target.close()
+    os.replace(tmp_path, snapshot_path)
+    return snapshot_dir
+
+
+def load_manifest(out_dir):
+    path = os.path.join(out_dir, MANIFEST_FILENAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_manifest(out_dir, manifest):
+    path = os.path.join(out_dir, MANIFEST_FILENAME)
+    tmp_path = path + ".tmp"
+    manifest["updated"] = datetime.now().isoformat()
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+#=======================================================================================
+# Report generation
+#=======================================================================================
+
+def _write_report(patient_id, out_dir, snapshot_dir, as_of):
+    # Runs in a worker process: returns (patient_id, filename, None) or (patient_id, None, error)
+    filename = report_filename(patient_id)
+    path = os.path.join(out_dir, filename)
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            if not write_patient_summary_report(patient_id, f, date.fromisoformat(as_of), snapshot_dir):
+                raise ValueError("no patient information on file")
+        os.replace(tmp_path, path)
+        return patient_id, filename, None
+    except Exception as e:
+        # Reported for this patient; one bad record (whatever it trips) doesn't stop the batch
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return patient_id, None, str(e)
+
+
+def _report_done(manifest, out_dir, patient_id):
+    filename = manifest["reports"].get(patient_id)
+    return filename is not None and os.path.exists(os.path.join(out_dir, filename))
+
+
+def batch_reports(month, out_dir, data_dir="./data", workers=None, resume=True, progress=print):
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = load_manifest(out_dir) if resume else None
+    if manifest and manifest["month"] != month:
+        raise ValueError(f"{out_dir} holds reports for {manifest['month']}, not {month}")
+    if not manifest:
+        # A fresh run takes a fresh snapshot (including any WAL files left next to the old one)
+        for path in glob.glob(os.path.join(out_dir, SNAPSHOT_DIRNAME, DB_FILENAME + "*")):
+            os.remove(path)
+        manifest = {"month": month, "created": datetime.now().isoformat(), "reports": {}, "failed": {}}
+
+    snapshot_dir = create_snapshot(data_dir, out_dir)
+    manifest["snapshot"] = os.path.join(SNAPSHOT_DIRNAME, DB_FILENAME)
+    as_of = month_range(month)[1].isoformat()
+    patients = active_patients(month, snapshot_dir)
+    pending = [patient_id for patient_id in patients if not _report_done(manifest, out_dir, patient_id)]
+    manifest["patients"] = len(patients)
+    save_manifest(out_dir, manifest)
+
+    done = len(patients) - len(pending)
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_write_report, patient_id, out_dir, snapshot_dir, as_of) for patient_id in pending]
+        for future in as_completed(futures):
+            patient_id, filename, error = future.result()
+            if error:
+                manifest["failed"][patient_id] = error
+            else:
+                manifest["reports"][patient_id] = filename
+                manifest["failed"].pop(patient_id, None)
+            save_manifest(out_dir, manifest)
+            done += 1
+            elapsed = time.perf_counter() - start
+            progress(f"Wrote {done}/{len(patients)} reports ({done / elapsed:.1f} reports/s), "
+                     f"{len(manifest['failed'])} failed")
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write summary PDFs for every patient seen in a month.")
+    parser.add_argument("--month", default=date.today().strftime("%Y-%m"), help="month to report on (YYYY-MM)")
+    parser.add_argument("--out", default=None, help="output directory (default: ./reports/<month>)")
+    parser.add_argument("--data-dir", default="./data", help="directory holding the record store")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--restart", action="store_true", help="ignore the manifest and rebuild every report")
+    args = parser.parse_args(argv)
+
+    out_dir = args.out or os.path.join("reports", args.month)
+    manifest = batch_reports(args.month, out_dir, args.data_dir, args.workers, resume=not args.restart)
+    for patient_id, error in manifest["failed"].items():
+        print(f"  failed: {patient_id}: {error}", file=sys.stderr)
+    print(f"Done: {len(manifest['reports'])}/{manifest['patients']} reports in {out_dir}")
+    return 1 if manifest["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
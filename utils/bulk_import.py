@@ -0,0 +1,192 @@
+# bulk_import.py
+# This script will handle bulk importing legacy records (the patient_info_*.json,
+# soap_notes_*.json and treatment_plan_*.json files written by data_handler) into a data
+# directory. Files are parsed and validated in parallel across CPU cores, dates are normalized to
+# ISO format the same way the save_* functions do, and records are written to the data directory's
+# record files and indexed in batches (data_handler.import_records). A checkpoint file records
+# every imported file so an interrupted run picks up where it stopped.
+#
+# Records are checked against data_handler's schemas (and SOAP notes / treatment plans against
+# the patients on file). Files that fail are not loaded: a copy goes to <data-dir>/quarantine/
+# with the reason appended to quarantine/reasons.jsonl, and they are not checkpointed, so once
+# fixed in the source they are picked up by the next run. Files are identified (checkpoint and
+# quarantine) by their path relative to the source directory, so a sharded source with the same
+# file name in two directories keeps them apart.
+#
+# Usage:
+#   python -m utils.bulk_import --source ./legacy_data --data-dir ./data
+#
+#=======================================================================================
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from utils import data_handler, data_layout, record_format, record_store
+from utils.data_handler import RECORD_PATTERNS, check_fields, check_patient, import_records
+
+CHECKPOINT_FILENAME = ".import_checkpoint.json"
+QUARANTINE_DIRNAME = "quarantine"
+
+DATE_FIELDS = {
+    "patient_info": ["dob", "visit_date", "pain_onset"],
+    "soap_notes": ["visit_date", "follow_up"],
+    "treatment_plans": ["plan_start_date"],
+}
+
+LEGACY_DATE_FORMATS = ["%Y-%m-%d", "%m/%d/%Y", "%Y%m%d", "%Y-%m-%dT%H:%M:%S"]
+
+
+def normalize_date(value):
+    if not isinstance(value, str) or not value:
+        return value
+    for fmt in LEGACY_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date().isoformat()
+        except ValueError:
+            continue
+    raise ValueError(f"unrecognized date {value!r}")
+
+
+def parse_record_file(path, record_type):
+    # Runs in a worker process: returns (record_type, record, None) or (record_type, None, error)
+    try:
+        record = record_format.read_record(path)
+        for field in DATE_FIELDS[record_type]:
+            if field in record:
+                record[field] = normalize_date(record[field])
+        # The patient check needs the records loaded so far, so it runs in _load_batch
+        check_fields(record_type, record)
+        return record_type, record, None
+    except (OSError, ValueError, RuntimeError) as e:
+        return record_type, None, str(e)
+
+
+def _parse_batch(batch):
+    return [(path,) + parse_record_file(path, record_type) for path, record_type in batch]
+
+#=======================================================================================
+# Checkpointing
+#=======================================================================================
+
+def load_checkpoint(data_dir):
+    path = os.path.join(data_dir, CHECKPOINT_FILENAME)
+    if not os.path.exists(path):
+        return set()
+    with open(path, "r") as f:
+        return set(json.load(f)["imported"])
+
+
+def save_checkpoint(data_dir, imported):
+    path = os.path.join(data_dir, CHECKPOINT_FILENAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"imported": sorted(imported), "updated": datetime.now().isoformat()}, f)
+    os.replace(tmp_path, path)
+
+#=======================================================================================
+# Import
+#=======================================================================================
+
+def find_record_files(source_dir):
+    files = []
+    for record_type, pattern in RECORD_PATTERNS.items():
+        for path in data_layout.glob_records(pattern, source_dir):
+            files.append((path, record_type))
+    return files
+
+
+def quarantine(path, error, data_dir, name=None):
+    # name is the file's path relative to the import source (default: its file name)
+    name = name or os.path.basename(path)
+    directory = os.path.join(data_dir, QUARANTINE_DIRNAME)
+    os.makedirs(os.path.dirname(os.path.join(directory, name)), exist_ok=True)
+    shutil.copy2(path, os.path.join(directory, name))
+    with open(os.path.join(directory, "reasons.jsonl"), "a") as f:
+        f.write(json.dumps({"file": name, "source": path, "error": error,
+                            "quarantined": datetime.now().isoformat()}) + "\n")
+
+
+def _load_batch(results, source_dir, data_dir, known_patients):
+    # known_patients holds every patient_id with intake info, including the ones loaded by earlier batches
+    by_type = {record_type: [] for record_type in RECORD_PATTERNS}
+    errors = []
+    for path, record_type, record, error in results:
+        if not error:
+            try:
+                check_patient(record_type, record, known_patients)
+            except ValueError as e:
+                error = str(e)
+        if error:
+            errors.append((path, error))
+            quarantine(path, error, data_dir, os.path.relpath(path, source_dir))
+            continue
+        by_type[record_type].append(record)
+        if record_type == "patient_info":
+            known_patients.add(record["patient_id"])
+    for record_type, records in by_type.items():
+        if records:
+            import_records(record_type, records)
+    return errors
+
+
+def bulk_import(source_dir, data_dir="./data", workers=None, batch_size=500, resume=True, progress=print):
+    # Records are written where data_handler reads them, for the length of the import
+    saved_data_dir = data_handler.DATA_DIR
+    data_handler.DATA_DIR = data_dir
+    try:
+        return _bulk_import(source_dir, data_dir, workers, batch_size, resume, progress)
+    finally:
+        data_handler.DATA_DIR = saved_data_dir
+
+
+def _bulk_import(source_dir, data_dir, workers, batch_size, resume, progress):
+    imported = load_checkpoint(data_dir) if resume else set()
+    pending = [(path, record_type) for path, record_type in find_record_files(source_dir)
+               if os.path.relpath(path, source_dir) not in imported]
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+
+    # find_record_files lists the intake files first, so they are loaded before the notes and plans
+    known_patients = {patient_id for patient_id, _ in record_store.list_patients(data_dir)}
+    errors = []
+    done = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Batches are parsed in parallel but loaded (and checkpointed) in order
+        for batch, results in zip(batches, pool.map(_parse_batch, batches)):
+            batch_errors = _load_batch(results, source_dir, data_dir, known_patients)
+            errors.extend(batch_errors)
+            failed = {path for path, _ in batch_errors}
+            imported.update(os.path.relpath(path, source_dir) for path, _ in batch if path not in failed)
+            save_checkpoint(data_dir, imported)
+            done += len(batch)
+            elapsed = time.perf_counter() - start
+            progress(f"Imported {done}/{len(pending)} files ({done / elapsed:.0f} files/s), {len(errors)} invalid")
+    return done, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import legacy JSON records into the record store.")
+    parser.add_argument("--source", default="./data", help="directory holding the legacy JSON files")
+    parser.add_argument("--data-dir", default="./data", help="directory holding the record store")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=500, help="records per transaction")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and import everything")
+    args = parser.parse_args(argv)
+
+    done, errors = bulk_import(args.source, args.data_dir, args.workers, args.batch_size,
+                               resume=not args.restart)
+    for path, error in errors:
+        print(f"  invalid: {path}: {error}", file=sys.stderr)
+    print(f"Done: {done} files processed, {len(errors)} invalid"
+          + (f" (copied to {os.path.join(args.data_dir, QUARANTINE_DIRNAME)})" if errors else ""))
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+# cohort_analytics.py
+# This script will handle clinic-wide (multi-patient) statistics built on top of the SOAP notes.
+# Everything starts from the visit metrics table (one numeric row per visit) joined to each
+# patient's active treatment plan, and is computed with pandas group-bys so it scales to
+# hundreds of thousands of visits without touching the SOAP JSON documents.
+#
+# [Statistics]
+# Mean pain_level improvement per diagnosis (first visit vs. latest visit)
+# ROM recovery curves by treatment modality (total ROM gained, by week of care)
+# Visit counts per week
+#
+#=======================================================================================
+
+import json
+
+import pandas as pd
+
+from utils.record_store import get_connection
+from utils.visit_metrics import load_visit_metrics, ROM_COLUMNS
+
+ACTIVE_PLANS_SQL = """
+SELECT patient_id,
+       json_extract(data, '$.diagnosis') AS diagnosis,
+       json_extract(data, '$.treatment_modalities') AS treatment_modalities
+FROM treatment_plans AS plans
+WHERE plan_start_date = (SELECT MAX(plan_start_date) FROM treatment_plans
+                         WHERE patient_id = plans.patient_id)
+"""
+
+
+def load_active_plans(data_dir="./data"):
+    plans = pd.read_sql_query(ACTIVE_PLANS_SQL, get_connection(data_dir))
+    plans["diagnosis"] = plans["diagnosis"].fillna("").str.strip().replace("", "Unspecified")
+    plans["treatment_modalities"] = plans["treatment_modalities"].map(
+        lambda modalities: json.loads(modalities) if modalities else [])
+    return plans
+
+
+def load_cohort(data_dir="./data"):
+    # One row per visit, with the patient's active plan diagnosis and modalities attached
+    # Not the metric series: it only keeps each patient's latest BODYRES_MAX_VISITS visits
+    visits = load_visit_metrics(data_dir=data_dir)
+    plans = load_active_plans(data_dir)
+    visits = visits.merge(plans, on="patient_id", how="left")
+    visits["diagnosis"] = visits["diagnosis"].fillna("Unspecified")
+    visits["treatment_modalities"] = visits["treatment_modalities"].map(
+        lambda modalities: modalities if isinstance(modalities, list) else [])
+    return visits
+
+
+def pain_improvement_by_diagnosis(visits):
+    # visits are sorted by (patient_id, visit_date), so first/last are the first and latest visits
+    per_patient = visits.groupby("patient_id").agg(
+        diagnosis=("diagnosis", "first"),
+        initial_pain=("pain_level", "first"),
+        current_pain=("pain_level", "last"),
+        visits=("visit_date", "size"),
+    )
+    per_patient["improvement"] = per_patient["initial_pain"] - per_patient["current_pain"]
+    return (per_patient.groupby("diagnosis")
+            .agg(patients=("improvement", "size"),
+                 mean_improvement=("improvement", "mean"),
+                 mean_visits=("visits", "mean"))
+            .sort_values("mean_improvement", ascending=False))
+
+
+def rom_recovery_by_modality(visits):
+    # Total ROM gained since the patient's first visit, averaged per modality and week of care
+    total_rom = visits[ROM_COLUMNS].sum(axis=1, min_count=1)
+    by_patient = visits.groupby("patient_id")
+    recovery = pd.DataFrame({
+        "treatment_modalities": visits["treatment_modalities"],
+        "week": (visits["visit_date"] - by_patient["visit_date"].transform("min")).dt.days // 7,
+        "rom_gain": total_rom - total_rom.groupby(visits["patient_id"]).transform("first"),
+    })
+    recovery = recovery.explode("treatment_modalities").dropna(subset=["treatment_modalities"])
+    return (recovery.groupby(["treatment_modalities", "week"])["rom_gain"].mean()
+            .unstack("treatment_modalities"))
+
+
+def weekly_visit_counts(visits):
+    return visits.groupby(pd.Grouper(key="visit_date", freq="W-MON")).size().rename("visits")
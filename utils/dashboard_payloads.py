@@ -0,0 +1,142 @@
+# dashboard_payloads.py
+# This script will handle building the data structures the patient dashboard hands to its nivo
+# charts (radar, heatmap, ROM bars). They live here rather than in progress_tracker_info so they
+# can be reused and timed without a Streamlit server.
+#
+#=======================================================================================
+
+from datetime import date, timedelta
+
+PAIN_TYPES = ["Sharp", "Shooting", "Aching", "Burning", "Tingling", "Numbness"]
+ROM_JOINTS = ["cervical_spine", "thoracic_spine", "lumbar_spine", "shoulders", "hips"]
+PAIN_FREQUENCY_SCORES = {'Constant': 10, 'Intermittent': 5, 'Occasional': 2}
+
+# Heatmap aggregation modes, applied server-side before the payload is sent to the browser
+HEATMAP_MODES = ["visit", "week", "month", "rolling", "last"]
+MAX_HEATMAP_COLUMNS = 52
+
+
+def build_progress_series(patient_id):
+    # Imported here: data_handler imports this module (through dashboard_views) when it loads
+    from utils import data_handler
+    return progress_series(data_handler.iter_soap_notes(patient_id))
+
+
+def progress_series(soap_notes):
+    # Walk the patient's SOAP history oldest -> newest, one note at a time, appending each visit
+    # to the pain / ROM series so only the (small) series are kept in memory, never the notes.
+    visit_dates = []
+    pain_levels = []
+    rom_series = {f"{joint}_{motion}": [] for joint in ROM_JOINTS for motion in ("flexion", "extension")}
+    heatmap_series = {pain_type: [] for pain_type in PAIN_TYPES}
+
+    for note in soap_notes:
+        visit_date = note["visit_date"]
+        visit_dates.append(visit_date)
+        pain_levels.append(note["pain_level"])
+        for key, values in rom_series.items():
+            values.append(note.get(key))
+        reported = set(note.get("pain_characteristics", []))
+        for pain_type, points in heatmap_series.items():
+            points.append({"x": visit_date, "y": note["pain_level"] if pain_type in reported else 0})
+
+    heatmap_data = [{"id": pain_type, "data": points} for pain_type, points in heatmap_series.items()]
+    return {
+        "visit_dates": visit_dates,
+        "pain_level": pain_levels,
+        "rom": rom_series,
+        "heatmap": heatmap_data,
+    }
+
+
+def build_radar_data(patient_info):
+    # First-visit pain intensity and frequency per pain type, from the intake form; either may be
+    # left empty on the form, which scores 0
+    return [
+        {
+            'taste': pain_type,
+            'intensity': characteristics.get('intensity') or 0,
+            'frequency': PAIN_FREQUENCY_SCORES.get(characteristics.get('frequency'), 0),
+        }
+        for pain_type, characteristics in patient_info.get('pain_characteristics', {}).items()
+    ]
+
+
+def build_rom_data(soap_note):
+    return [
+        {"joint": joint.replace("_", " ").title(),
+         "flexion": soap_note[f"{joint}_flexion"],
+         "extension": soap_note[f"{joint}_extension"]}
+        for joint in ROM_JOINTS
+    ]
+
+
+#=======================================================================================
+# Heatmap downsampling
+#=======================================================================================
+
+def _week_start(iso_date):
+    day = date.fromisoformat(iso_date)
+    return (day - timedelta(days=day.weekday())).isoformat()
+
+
+def _month_start(iso_date):
+    return iso_date[:7] + "-01"
+
+
+def _bin_means(points, bin_of):
+    # points are in date order, so each bin is a contiguous run
+    binned = []
+    current, total, count = None, 0.0, 0
+    for point in points:
+        key = bin_of(point["x"])
+        if key != current and count:
+            binned.append({"x": current, "y": total / count})
+            total, count = 0.0, 0
+        current = key
+        total += point["y"]
+        count += 1
+    if count:
+        binned.append({"x": current, "y": total / count})
+    return binned
+
+
+def _rolling_means(points, window, max_columns):
+    # Mean of the trailing `window` visits, sampled so at most max_columns cells remain
+    step = max(1, -(-len(points) // max_columns))
+    sampled = []
+    total = 0.0
+    for i, point in enumerate(points):
+        total += point["y"]
+        if i >= window:
+            total -= points[i - window]["y"]
+        if (len(points) - 1 - i) % step == 0:
+            sampled.append({"x": point["x"], "y": total / min(i + 1, window)})
+    return sampled
+
+
+def downsample_heatmap(heatmap_data, mode="visit", window=4, max_columns=MAX_HEATMAP_COLUMNS):
+    # heatmap_data is one {"id", "data": [{"x": iso date, "y": value}, ...]} series per pain type
+    if mode == "visit":
+        return heatmap_data
+    if mode == "week":
+        reduce = lambda points: _bin_means(points, _week_start)
+    elif mode == "month":
+        reduce = lambda points: _bin_means(points, _month_start)
+    elif mode == "rolling":
+        reduce = lambda points: _rolling_means(points, window, max_columns)
+    elif mode == "last":
+        reduce = lambda points: points[-window:]
+    else:
+        raise ValueError(f"unknown heatmap mode {mode!r}")
+    return [{"id": series["id"], "data": reduce(series["data"])} for series in heatmap_data]
+
+
+def default_heatmap_mode(visit_dates, max_columns=MAX_HEATMAP_COLUMNS):
+    # Keep every visit while it fits, then monthly bins, then a sampled rolling mean (always bounded)
+    if len(visit_dates) <= max_columns:
+        return "visit"
+    first, last = date.fromisoformat(visit_dates[0]), date.fromisoformat(visit_dates[-1])
+    if (last.year - first.year) * 12 + last.month - first.month + 1 <= max_columns:
+        return "month"
+    return "rolling"
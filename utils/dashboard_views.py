@@ -0,0 +1,143 @@
+# dashboard_views.py
+# This script will handle the materialized patient dashboards: every payload the Progress
+# Tracker draws (overview, lifestyle, latest visit and treatment plan tiles, radar data, ROM bars
+# and the pain/ROM progress series behind the heatmap) is computed once and stored as one JSON row
+# per patient, so opening a dashboard is a single primary-key lookup. data_handler.index_records
+# refreshes the affected patients whenever one of their records is saved or imported by patching
+# the stored payload with just the saved records (one visit spliced into the series), so a save
+# never re-reads the patient's note history; only a patient's first complete dashboard is built
+# from the record store. Refreshes are writes on the shared connection, so they only run under
+# data_handler's index lock (see data_handler.load_dashboard), never from a page directly.
+#
+# [Table]
+# dashboard_views - one row per patient_id that has intake info, a SOAP note and a treatment plan
+#
+#=======================================================================================
+
+import json
+from bisect import bisect_left
+from datetime import datetime
+
+from utils import record_store
+from utils.dashboard_payloads import build_radar_data, build_rom_data, progress_series
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS dashboard_views ("
+    "patient_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated TEXT NOT NULL)"
+)
+
+OVERVIEW_FIELDS = ["patient_name", "patient_id", "dob", "occupation"]
+LIFESTYLE_FIELDS = ["sleep_hours", "exercise_frequency", "exercise_types", "stress_level"]
+LATEST_VISIT_FIELDS = ["visit_date", "chief_complaint", "diagnosis", "prognosis", "follow_up"]
+PLAN_FIELDS = ["plan_start_date", "plan_duration", "initial_phase", "maintenance_phase", "treatment_modalities"]
+
+
+def _connection(data_dir):
+    conn = record_store.get_connection(data_dir)
+    conn.execute(SCHEMA)
+    return conn
+
+
+def _tile(record, fields):
+    return {field: record.get(field) for field in fields}
+
+
+def build_dashboard(patient_id, data_dir="./data"):
+    # Returns None until the patient has intake info, at least one SOAP note and a treatment plan
+    patient_info = record_store.get_patient_info(patient_id, data_dir)
+    treatment_plan = record_store.get_active_treatment_plan(patient_id, data_dir)
+    if patient_info is None or treatment_plan is None:
+        return None
+    latest_note = None
+
+    def notes():
+        nonlocal latest_note
+        for note in record_store.iter_soap_notes(patient_id, data_dir):
+            latest_note = note
+            yield note
+
+    series = progress_series(notes())
+    if latest_note is None:
+        return None
+    return {
+        "overview": _tile(patient_info, OVERVIEW_FIELDS),
+        "lifestyle": _tile(patient_info, LIFESTYLE_FIELDS),
+        "latest_visit": _tile(latest_note, LATEST_VISIT_FIELDS),
+        "treatment_plan": _tile(treatment_plan, PLAN_FIELDS),
+        "radar_data": build_radar_data(patient_info),
+        "rom_data": build_rom_data(latest_note),
+        "progress_series": series,
+    }
+
+
+def _add_visit(dashboard, note):
+    # Splice one note into the stored series (replacing a re-saved visit), keeping date order
+    series = dashboard["progress_series"]
+    visit_dates = series["visit_dates"]
+    position = bisect_left(visit_dates, note["visit_date"])
+    replaced = int(position < len(visit_dates) and visit_dates[position] == note["visit_date"])
+    visit = progress_series([note])
+    for key in ("visit_dates", "pain_level"):
+        series[key][position:position + replaced] = visit[key]
+    for key, values in series["rom"].items():
+        values[position:position + replaced] = visit["rom"][key]
+    for heatmap, visit_heatmap in zip(series["heatmap"], visit["heatmap"]):
+        heatmap["data"][position:position + replaced] = visit_heatmap["data"]
+    if position == len(visit_dates) - 1:
+        dashboard["latest_visit"] = _tile(note, LATEST_VISIT_FIELDS)
+        dashboard["rom_data"] = build_rom_data(note)
+
+
+def _patch(dashboard, record_type, record):
+    if record_type == "soap_notes":
+        _add_visit(dashboard, record)
+    elif record_type == "patient_info":
+        dashboard["overview"] = _tile(record, OVERVIEW_FIELDS)
+        dashboard["lifestyle"] = _tile(record, LIFESTYLE_FIELDS)
+        dashboard["radar_data"] = build_radar_data(record)
+    elif record["plan_start_date"] >= (dashboard["treatment_plan"]["plan_start_date"] or ""):
+        # The tile shows the active plan: the one that starts last
+        dashboard["treatment_plan"] = _tile(record, PLAN_FIELDS)
+
+
+def _store(conn, patient_id, dashboard, updated):
+    if dashboard is None:
+        conn.execute("DELETE FROM dashboard_views WHERE patient_id = ?", (patient_id,))
+    else:
+        conn.execute("INSERT OR REPLACE INTO dashboard_views (patient_id, data, updated) VALUES (?, ?, ?)",
+                     (patient_id, json.dumps(dashboard), updated))
+
+
+def refresh_dashboards(record_type, records, data_dir="./data"):
+    # Patch the stored dashboards of these records' patients with just these records; a patient
+    # without a stored dashboard yet gets a full build (None until their records are complete)
+    conn = _connection(data_dir)
+    updated = datetime.now().isoformat()
+    by_patient = {}
+    for record in records:
+        by_patient.setdefault(record["patient_id"], []).append(record)
+    with conn:
+        for patient_id, patient_records in by_patient.items():
+            dashboard = load_dashboard(patient_id, data_dir)
+            if dashboard is None:
+                dashboard = build_dashboard(patient_id, data_dir)
+            else:
+                for record in patient_records:
+                    _patch(dashboard, record_type, record)
+            _store(conn, patient_id, dashboard, updated)
+
+
+def rebuild_dashboards(patient_ids, data_dir="./data"):
+    # Rebuild the stored dashboards of just these patients from the record store
+    conn = _connection(data_dir)
+    updated = datetime.now().isoformat()
+    with conn:
+        for patient_id in set(patient_ids):
+            _store(conn, patient_id, build_dashboard(patient_id, data_dir), updated)
+
+
+def load_dashboard(patient_id, data_dir="./data"):
+    # None when the patient has no stored dashboard
+    conn = _connection(data_dir)
+    row = conn.execute("SELECT data FROM dashboard_views WHERE patient_id = ?", (patient_id,)).fetchone()
+    return json.loads(row[0]) if row else None
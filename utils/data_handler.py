@@ -1,182 +1,520 @@
 # data_handler.py
 # This script will handle functions related to saving and loading data
 #
+# Usage (re-index every record file in a data directory, e.g. after copying files in by hand):
+#   python -m utils.data_handler --rebuild --data-dir ./data
+#
+#=======================================================================================
+
+import argparse
+import atexit
+import contextlib
+import os
+import sys
+import threading
+
+from utils import (dashboard_views, data_layout, facet_index, record_cache, record_format, record_schema,
+                   record_store, save_queue, search_index, soap_container, soap_revisions, visit_metrics, write_log)
+from utils.records import PAIN_FREQUENCIES, PAIN_TYPES, ROM_FIELDS, PatientInfo, SoapNote, TreatmentPlan
+
+DATA_DIR = "./data"
+
+#=======================================================================================
+# Schemas
+#=======================================================================================
+
+# Every record is checked against these before it is saved or imported (see record_schema for the
+# spec keys), so the store and the indexes built from it only ever hold well-formed records.
+PATIENT_ID = {"type": "id", "required": True, "nullable": False, "min_length": 1}
+RECORD_DATE = {"type": "date", "required": True, "nullable": False}
+TEXT_LIST = {"type": "list", "items": "str"}
+
+SCHEMAS = {
+    "patient_info": {
+        "patient_id": PATIENT_ID,
+        "patient_name": {"type": "str", "required": True, "nullable": False, "min_length": 1},
+        "visit_date": RECORD_DATE,
+        "dob": {"type": "date"},
+        "visit_time": {"type": "time"},
+        "pain_onset": {"type": "date"},
+        "gender": {"type": "str", "enum": ["Male", "Female", "Other"]},
+        "height_ft": {"type": "number", "minimum": 0},
+        "height_in": {"type": "number", "minimum": 0},
+        "weight_lbs": {"type": "number", "minimum": 0},
+        "exercise_types": TEXT_LIST,
+        "sleep_hours": {"type": "number", "minimum": 0, "maximum": 24},
+        "stress_level": {"type": "integer", "minimum": 0, "maximum": 10},
+        "pain_characteristics": {"type": "object", "properties": {
+            pain_type: {"type": "object", "properties": {
+                "intensity": {"type": "integer", "minimum": 0, "maximum": 10},
+                "frequency": {"type": "str", "enum": PAIN_FREQUENCIES},
+            }} for pain_type in PAIN_TYPES}},
+        "consent": {"type": "bool"},
+        "privacy_agreement": {"type": "bool"},
+    },
+    "soap_notes": {
+        "patient_id": PATIENT_ID,
+        "visit_date": RECORD_DATE,
+        "pain_location": TEXT_LIST,
+        "pain_characteristics": TEXT_LIST,
+        "pain_level": {"type": "integer", "minimum": 0, "maximum": 10},
+        "aggravating_factors": TEXT_LIST,
+        "relieving_factors": TEXT_LIST,
+        "affected_activities": TEXT_LIST,
+        "associated_symptoms": TEXT_LIST,
+        "vital_signs": {"type": "bool"},
+        "heart_rate": {"type": "number", "minimum": 0, "maximum": 300},
+        "respiratory_rate": {"type": "number", "minimum": 0, "maximum": 100},
+        "temperature": {"type": "number", "minimum": 25, "maximum": 45},
+        **{field: {"type": "number", "minimum": 0, "maximum": 360} for field in ROM_FIELDS},
+        **{f"ortho_{test}": {"type": "str", "enum": ["Positive", "Negative", "Not Performed"]}
+           for test in ["straight_leg_raise", "kernig_sign", "brudzinski_sign", "spurling_test", "valsalva_maneuver"]},
+        "treatment_provided": TEXT_LIST,
+        "follow_up": {"type": "date"},
+        "referrals": TEXT_LIST,
+    },
+    "treatment_plans": {
+        "patient_id": PATIENT_ID,
+        "patient_name": {"type": "str"},
+        "plan_start_date": RECORD_DATE,
+        **{field: TEXT_LIST for field in ["treatment_modalities", "chiro_techniques", "treatment_areas", "exercises",
+                                          "outcome_measures", "lifestyle_changes", "referrals"]},
+        "informed_consent": {"type": "bool"},
+    },
+}
+VALIDATORS = {record_type: record_schema.compile_schema(schema) for record_type, schema in SCHEMAS.items()}
+
+# Patients whose intake form is still in the save queue count as on file: patient_id -> number of their
+# intake forms queued. A form leaves the count when its save finishes; if the save failed, the patient
+# is only on file if the record store says so, and _save_batch checks the notes queued behind it again.
+_queued_intakes = {}
+_queued_lock = threading.Lock()
+
+def check_fields(record_type, record):
+    # Raise ValueError listing every field that doesn't match the record type's schema
+    errors = VALIDATORS[record_type](record)
+    if errors:
+        raise ValueError(f"Invalid {record_type.replace('_', ' ')} record: " + "; ".join(errors))
+
+def check_patient(record_type, record, known_patients=None):
+    # SOAP notes and treatment plans must belong to a patient with an intake form on file: looked up in
+    # the record store (or the save queue), or in known_patients (a set of patient_ids) when given
+    if record_type == "patient_info":
+        return
+    patient_id = record["patient_id"]
+    if known_patients is not None:
+        known = patient_id in known_patients
+    else:
+        known = _queued_intakes.get(patient_id, 0) > 0 or record_store.patient_exists(patient_id, DATA_DIR)
+    if not known:
+        raise ValueError(f"Invalid {record_type.replace('_', ' ')} record: patient {patient_id!r} has no intake "
+                         "form on file; save their patient information first")
+
+def validate_record(record_type, record):
+    check_fields(record_type, record)
+    check_patient(record_type, record)
+
+#=======================================================================================
+# Saving
 #=======================================================================================
 
-import json
-from datetime import date, time
-
-def save_patient_info(patient_name, patient_id, dob, gender,
-                      contact_number, email, visit_date, visit_time,
-                      occupation, height_ft, height_in, weight_lbs,
-                      emergency_name, emergency_relation, emergency_number,
-                      medical_history, current_medications, allergies,
-                      exercise_frequency, exercise_types, sleep_hours, stress_level,
-                      previous_chiro,
-                      primary_complaint, pain_onset, pain_cause,
-                      pain_intensity_sharp, pain_intensity_shooting, pain_intensity_aching,
-                      pain_intensity_burning, pain_intensity_tingling, pain_intensity_numbness,
-                      pain_freq_sharp, pain_freq_shooting, pain_freq_aching,
-                      pain_freq_burning, pain_freq_tingling, pain_freq_numbness,
-                      consent, privacy_agreement):
-    
-    patient_data = {
-        "patient_name": patient_name,
-        "patient_id": patient_id,
-        "dob": dob.isoformat() if isinstance(dob, date) else dob,
-        "gender": gender,
-        "contact_number": contact_number,
-        "email": email,
-        "visit_date": visit_date.isoformat() if isinstance(visit_date, date) else visit_date,
-        "visit_time": visit_time.isoformat() if isinstance(visit_time, time) else visit_time,
-        "occupation": occupation,
-        "height_ft": height_ft,
-        "height_in": height_in, 
-        "weight_lbs": weight_lbs,
-        "emergency_name": emergency_name,
-        "emergency_relation": emergency_relation,
-        "emergency_number": emergency_number,
-        "medical_history": medical_history,
-        "current_medications": current_medications,
-        "allergies": allergies,
-        "exercise_frequency": exercise_frequency,
-        "exercise_types": exercise_types,
-        "sleep_hours": sleep_hours,
-        "stress_level": stress_level,
-        "previous_chiro": previous_chiro,
-        "primary_complaint": primary_complaint,
-        "pain_onset": pain_onset.isoformat() if isinstance(pain_onset, date) else pain_onset, 
-        "pain_cause": pain_cause,
-        "pain_characteristics": {
-            "sharp": {"intensity": pain_intensity_sharp, "frequency": pain_freq_sharp},
-            "shooting": {"intensity": pain_intensity_shooting, "frequency": pain_freq_shooting},
-            "aching": {"intensity": pain_intensity_aching, "frequency": pain_freq_aching},
-            "burning": {"intensity": pain_intensity_burning, "frequency": pain_freq_burning},
-            "tingling": {"intensity": pain_intensity_tingling, "frequency": pain_freq_tingling},
-            "numbness": {"intensity": pain_intensity_numbness, "frequency": pain_freq_numbness}
-            },
-        "consent": consent,
-        "privacy_agreement": privacy_agreement
-    }
-
-    with open(f"./data/patient_info_{patient_id}.json", "w") as f:
-        json.dump(patient_data, f, indent=4)
-
-def save_soap_info(patient_id, visit_date, chief_complaint, pain_location, pain_characteristics, pain_level,
-                   pain_frequency, aggravating_factors, relieving_factors, affected_activities,
-                   associated_symptoms,
-                   vital_signs, blood_pressure, heart_rate, respiratory_rate,
-                   temperature, height_ft, height_in, weight_lbs,
-                   cervical_spine_flexion, cervical_spine_extension,
-                   thoracic_spine_flexion, thoracic_spine_extension,
-                   lumbar_spine_flexion, lumbar_spine_extension,
-                   shoulders_flexion, shoulders_extension,
-                   hips_flexion, hips_extension,
-                   ortho_straight_leg_raise, ortho_kernig_sign, ortho_brudzinski_sign,
-                   ortho_spurling_test, ortho_valsalva_maneuver,
-                   neuro_deep_tendon_reflexes, neuro_muscle_strength, neuro_sensation,
-                   palpation,
-                   diagnosis, differential_diagnosis, prognosis,
-                   treatment_provided, treatment_frequency, treatment_duration,
-                   home_care_instructions, follow_up, referrals):
-
-    soap_data = {
-        "patient_id": patient_id,
-        "visit_date": visit_date.isoformat() if isinstance(visit_date, date) else visit_date,
-        "chief_complaint": chief_complaint,
-        "pain_location": pain_location,
-        "pain_characteristics": pain_characteristics,
-        "pain_level": pain_level,
-        "pain_frequency": pain_frequency,
-        "aggravating_factors": aggravating_factors,
-        "relieving_factors": relieving_factors,
-        "affected_activities": affected_activities,
-        "associated_symptoms": associated_symptoms,
-        "vital_signs": vital_signs,
-        "blood_pressure": blood_pressure,
-        "heart_rate": heart_rate,
-        "respiratory_rate": respiratory_rate,
-        "temperature": temperature,
-        "height_ft": height_ft,
-        "height_in": height_in,
-        "weight_lbs": weight_lbs,
-        "cervical_spine_flexion": cervical_spine_flexion,
-        "cervical_spine_extension": cervical_spine_extension,
-        "thoracic_spine_flexion": thoracic_spine_flexion,
-        "thoracic_spine_extension": thoracic_spine_extension,
-        "lumbar_spine_flexion": lumbar_spine_flexion,
-        "lumbar_spine_extension": lumbar_spine_extension,
-        "shoulders_flexion": shoulders_flexion,
-        "shoulders_extension": shoulders_extension,
-        "hips_flexion": hips_flexion,
-        "hips_extension": hips_extension,
-        "ortho_straight_leg_raise": ortho_straight_leg_raise,
-        "ortho_kernig_sign": ortho_kernig_sign,
-        "ortho_brudzinski_sign": ortho_brudzinski_sign,
-        "ortho_spurling_test": ortho_spurling_test,
-        "ortho_valsalva_maneuver": ortho_valsalva_maneuver,
-        "neuro_deep_tendon_reflexes": neuro_deep_tendon_reflexes,
-        "neuro_muscle_strength": neuro_muscle_strength,
-        "neuro_sensation": neuro_sensation,
-        "palpation": palpation,
-        "diagnosis": diagnosis,
-        "differential_diagnosis": differential_diagnosis,
-        "prognosis": prognosis,
-        "treatment_provided": treatment_provided,
-        "treatment_frequency": treatment_frequency,
-        "treatment_duration": treatment_duration,
-        "home_care_instructions": home_care_instructions,
-        "follow_up": follow_up.isoformat() if isinstance(follow_up, date) else follow_up,
-        "referrals": referrals
-    }
-
-    with open(f"./data/soap_notes_{patient_id}_{visit_date.strftime('%y%m%d')}.json", "w") as f:
-        json.dump(soap_data, f, indent=4)
-        
-def save_treatment_plan_info(patient_name, patient_id, diagnosis,
-                             plan_start_date, plan_duration,
-                             initial_phase, maintenance_phase,
-                             treatment_modalities,
-                             chiro_techniques,
-                             treatment_areas,
-                             exercises, exercise_frequency,
-                             home_care,
-                             short_term_goals, long_term_goals,
-                             outcome_measures,
-                             precautions,
-                             lifestyle_changes,
-                             referrals,
-                             reevaluation_frequency,
-                             informed_consent):
-    
-    treatment_plan_data = {
-        "patient_name": patient_name,
-        "patient_id": patient_id,
-        "diagnosis": diagnosis,
-        "plan_start_date": plan_start_date.isoformat() if isinstance(plan_start_date, date) else plan_start_date,
-        "plan_duration": plan_duration,
-        "initial_phase": initial_phase,
-        "maintenance_phase": maintenance_phase,
-        "treatment_modalities": treatment_modalities,
-        "chiro_techniques": chiro_techniques,
-        "treatment_areas": treatment_areas,
-        "exercises": exercises,
-        "exercise_frequency": exercise_frequency,
-        "home_care": home_care,
-        "short_term_goals": short_term_goals,
-        "long_term_goals": long_term_goals,
-        "outcome_measures": outcome_measures,
-        "precautions": precautions,
-        "lifestyle_changes": lifestyle_changes,
-        "referrals": referrals,
-        "reevaluation_frequency": reevaluation_frequency,
-        "informed_consent": informed_consent
-    }
-
-    with open(f"./data/treatment_plan_{patient_id}_{plan_start_date.strftime('%Y%m%d')}.json", "w") as f:
-        json.dump(treatment_plan_data, f, indent=4)
-
-
-
-    
-    
+# The indexes share one SQLite connection per data directory, so batches are indexed one at a time.
+# _log_lock orders the log appends with the log rotation done by compaction, and a patient's record
+# files are only checked and written under that patient's lock (a fixed pool of PATIENT_LOCKS locks,
+# shared by patients whose IDs hash alike). Locks are taken patient locks -> _log_lock / _index_lock.
+PATIENT_LOCKS = 64
+_index_lock = threading.Lock()
+_log_lock = threading.Lock()
+_compact_lock = threading.Lock()
+_patient_locks = [threading.Lock() for _ in range(PATIENT_LOCKS)]
+_log_generation = 0
+_logged = {}    # filename -> log generation of its latest append
+
+@contextlib.contextmanager
+def _locked_patients(patient_ids):
+    # Acquired in a fixed order, so two batches with overlapping patients can't deadlock
+    with contextlib.ExitStack() as stack:
+        for index in sorted({hash(patient_id) % PATIENT_LOCKS for patient_id in patient_ids}):
+            stack.enter_context(_patient_locks[index])
+        yield
+
+def index_records(record_type, records, data_dir=None):
+    # Update the record store and every derived index (metrics, time series, search, facets, dashboards)
+    # for a batch of records
+    data_dir = data_dir or DATA_DIR
+    with _index_lock:
+        _index_records(record_type, records, data_dir)
+
+def _index_records(record_type, records, data_dir):
+    # metric_series is imported here rather than at the top so that importing data_handler (every page
+    # does, through main.py) doesn't load NumPy; the first save loads it, on a writer thread
+    from utils import metric_series
+    record_store.index_records(record_type, records, data_dir)
+    if record_type == "soap_notes":
+        visit_metrics.update_visit_metrics(records, data_dir)
+        metric_series.update_series(records, data_dir)
+        search_index.index_soap_notes(records, data_dir)
+    if record_type == "patient_info":
+        metric_series.update_intake(records, data_dir)
+    if record_type in facet_index.FACET_FIELDS:
+        facet_index.index_records(record_type, records, data_dir)
+    dashboard_views.refresh_dashboards(record_type, records, data_dir)
+
+_NOT_LOADED = object()
+
+def _store_record(record_type, filename, record, stored=_NOT_LOADED):
+    # Encoded in the configured record_format (JSON unless BODYRES_RECORD_FORMAT says otherwise). SOAP
+    # notes are appended to the patient's container, and the change from the stored version (looked
+    # up when not passed in) to the patient's revisions file; filename stays the write log's key
+    if record_type == "soap_notes":
+        if stored is _NOT_LOADED:
+            stored = _stored_record(record_type, filename, record)
+        soap_revisions.record_revision(record, stored, DATA_DIR)
+        soap_container.append_note(record, DATA_DIR)
+        record_cache.invalidate(record_type, record["patient_id"])
+    else:
+        record_format.write_record(data_layout.record_path(record["patient_id"], filename, DATA_DIR, create=True),
+                                   record_type, record)
+
+def _stored_record(record_type, filename, record):
+    if record_type == "soap_notes":
+        return load_soap_note(record["patient_id"], record["visit_date"])
+    return record_format.read_record(data_layout.record_path(record["patient_id"], filename, DATA_DIR))
+
+def _changed_entries(entries):
+    # -> [(record_type, filename, record, stored)] without the saves whose content hash matches what is
+    # stored (or an earlier entry of the same batch), so re-saving an unchanged form writes, logs and
+    # re-indexes nothing
+    changed = []
+    latest = {}
+    for record_type, filename, record in entries:
+        key = (record_type, record["patient_id"], filename)
+        stored = latest[key] if key in latest else _stored_record(record_type, filename, record)
+        if stored is None or soap_revisions.record_hash(record) != soap_revisions.record_hash(stored):
+            changed.append((record_type, filename, record, stored))
+        latest[key] = record
+    return changed
+
+def _indexed_record(record_type, record):
+    # The record store's copy of this record (None if it isn't indexed)
+    patient_id = record["patient_id"]
+    if record_type == "patient_info":
+        return record_store.get_patient_info(patient_id, DATA_DIR)
+    if record_type == "soap_notes":
+        rows = record_store.query_soap_notes(patient_id, record["visit_date"], record["visit_date"], DATA_DIR)
+    else:
+        rows = record_store.query_treatment_plans(patient_id, record["plan_start_date"], record["plan_start_date"],
+                                                  DATA_DIR)
+    return rows[0] if rows else None
+
+def _apply_record(record_type, filename, record):
+    # Replay of a logged save. Usually the save finished and both the stored copy and the record store
+    # match it, so nothing is written; a crash between the two steps redoes only what is missing
+    content_hash = soap_revisions.record_hash(record)
+    for _, _, record, stored in _changed_entries([(record_type, filename, record)]):
+        _store_record(record_type, filename, record, stored)
+        break
+    else:
+        indexed = _indexed_record(record_type, record)
+        if indexed is not None and soap_revisions.record_hash(indexed) == content_hash:
+            return
+    index_records(record_type, [record])
+    record_cache.invalidate(record_type, record["patient_id"])
+
+def _write_records(entries):
+    # entries are (record_type, filename, record). Log first, then materialize: a crash after the
+    # append is repaired by recover_write_log(). Each record type is indexed in one batch.
+    with _locked_patients(record["patient_id"] for _, _, record in entries):
+        entries = _changed_entries(entries)
+        if not entries:
+            return
+        with _log_lock:
+            for record_type, filename, record, _ in entries:
+                log_size = write_log.append(record_type, filename, record, DATA_DIR)
+                _logged[filename] = _log_generation
+        by_type = {}
+        for record_type, filename, record, stored in entries:
+            _store_record(record_type, filename, record, stored)
+            by_type.setdefault(record_type, []).append(record)
+        for record_type, records in by_type.items():
+            index_records(record_type, records)
+            for patient_id in {record["patient_id"] for record in records}:
+                record_cache.invalidate(record_type, patient_id)
+    if write_log.needs_compaction(log_size):
+        _start_compaction()
+
+_compaction_thread = None
+
+def _start_compaction():
+    # The save that fills the log hands the replay to a background thread instead of paying for it
+    global _compaction_thread
+    with _log_lock:
+        if _compaction_thread is None or not _compaction_thread.is_alive():
+            _compaction_thread = threading.Thread(target=compact_write_log, kwargs={"wait": False},
+                                                  name="write-log-compaction", daemon=True)
+            _compaction_thread.start()
+
+def _finish_compaction():
+    thread = _compaction_thread
+    if thread is not None:
+        thread.join()
+
+def compact_write_log(wait=True):
+    # Rotate the log under _log_lock, then replay the rotated entries without it, so saves carry on
+    # into the fresh log meanwhile. An entry whose file has been saved again since the rotation is
+    # skipped: that save writes the newer copy. One compaction runs at a time; with wait=False (the
+    # background compaction a full log starts) one that finds another already running leaves it to finish.
+    global _log_generation
+    if not _compact_lock.acquire(blocking=wait):
+        return 0
+    try:
+        with _log_lock:
+            generation = _log_generation
+            _log_generation += 1
+            rotated = write_log.rotate(DATA_DIR)
+
+        def apply(record_type, filename, record):
+            with _locked_patients([record["patient_id"]]):
+                if _logged.get(filename, generation) <= generation:
+                    _apply_record(record_type, filename, record)
+
+        applied = write_log.compact(apply, DATA_DIR, rotated)
+        with _log_lock:
+            for filename in [filename for filename, logged in _logged.items() if logged <= generation]:
+                del _logged[filename]
+        return applied
+    finally:
+        _compact_lock.release()
+
+def recover_write_log():
+    # Finish any saves interrupted by a crash and start a fresh log; run once at app start
+    return compact_write_log()
+
+def save_record(record):
+    # record is a records.PatientInfo, SoapNote or TreatmentPlan; raises ValueError if it fails validation
+    record_data = record.to_dict()
+    validate_record(record.RECORD_TYPE, record_data)
+    _write_records([(record.RECORD_TYPE, record.filename(), record_data)])
+    return record
+
+def _save_batch(records):
+    # A note or plan queued while its patient's intake form was also queued is checked again now that the
+    # form has been written (or has failed): a patient's saves are written in the order they were queued
+    intakes = {record.patient_id for record in records if record.RECORD_TYPE == "patient_info"}
+    for record in records:
+        if record.RECORD_TYPE != "patient_info" and record.patient_id not in intakes:
+            check_patient(record.RECORD_TYPE, record.to_dict())
+    _write_records([(record.RECORD_TYPE, record.filename(), record.to_dict()) for record in records])
+    return [record.to_dict() for record in records]
+
+_save_queue = save_queue.SaveQueue(_save_batch)
+
+def submit_record(record):
+    # Validate (raising ValueError here, in the caller), then queue the save for the background writers
+    # and return at once; the returned Future resolves to the saved dict (or raises the save's error).
+    # Blocks only while the save queue is full.
+    validate_record(record.RECORD_TYPE, record.to_dict())
+    future = _save_queue.submit(record.patient_id, record)
+    if record.RECORD_TYPE == "patient_info":
+        with _queued_lock:
+            _queued_intakes[record.patient_id] = _queued_intakes.get(record.patient_id, 0) + 1
+        future.add_done_callback(lambda _: _intake_done(record.patient_id))
+    return future
+
+def _intake_done(patient_id):
+    with _queued_lock:
+        _queued_intakes[patient_id] -= 1
+        if not _queued_intakes[patient_id]:
+            del _queued_intakes[patient_id]
+
+def flush_saves():
+    # Wait for every submitted save to reach the data directory; the pages that read records call it
+    # first, so a save queued on a form page shows up when the clinician switches pages
+    _save_queue.flush()
+
+# Registered after write_log's own atexit hook, so queued saves are written (and a running compaction
+# finishes) before the log is closed
+atexit.register(_finish_compaction)
+atexit.register(_save_queue.close)
+
+# The original save functions, kept for the pages: they take the same positional (or keyword)
+# arguments as before, in the order of the record class's PARAMS, and return the saved dict.
+
+def save_patient_info(*args, **kwargs):
+    return save_record(PatientInfo(*args, **kwargs)).to_dict()
+
+def save_soap_info(*args, **kwargs):
+    return save_record(SoapNote(*args, **kwargs)).to_dict()
+
+def save_treatment_plan_info(*args, **kwargs):
+    return save_record(TreatmentPlan(*args, **kwargs)).to_dict()
+
+RECORD_PATTERNS = {
+    "patient_info": "patient_info_*.json",
+    "soap_notes": "soap_notes_*.json",
+    "treatment_plans": "treatment_plan_*.json",
+}
+
+RECORD_CLASSES = {record_class.RECORD_TYPE: record_class for record_class in (PatientInfo, SoapNote, TreatmentPlan)}
+
+def import_records(record_type, records):
+    # Bulk-import path for records already validated: each is normalized through its record class and
+    # written to the data directory like a save (copies identical to the stored one are left alone, e.g.
+    # when importing the data directory into itself), then the whole batch is indexed. No write log:
+    # bulk_import re-runs any batch it didn't checkpoint.
+    records = [RECORD_CLASSES[record_type].from_dict(record) for record in records]
+    entries = [(record_type, record.filename(), record.to_dict()) for record in records]
+    with _locked_patients(record.patient_id for record in records):
+        for _, filename, record, stored in _changed_entries(entries):
+            _store_record(record_type, filename, record, stored)
+        index_records(record_type, [record for _, _, record in entries])
+    for patient_id in {record.patient_id for record in records}:
+        record_cache.invalidate(record_type, patient_id)
+
+def rebuild_record_store():
+    # Re-index every record file already in the data directory (e.g. files saved before the store existed).
+    # Records that fail validation are left out of the store; returns them as (patient_id, error) pairs.
+    skipped = []
+    known_patients = set()
+    for record_type, pattern in RECORD_PATTERNS.items():
+        records = [record_format.read_record(path) for path in data_layout.glob_records(pattern, DATA_DIR)]
+        if record_type == "soap_notes":
+            # Container notes come after the per-visit files so they win for the same visit
+            for patient_id in soap_container.container_patient_ids(DATA_DIR):
+                records.extend(soap_container.read_notes(patient_id, None, DATA_DIR).values())
+        valid = []
+        for record in records:
+            try:
+                check_fields(record_type, record)
+                check_patient(record_type, record, known_patients)
+            except ValueError as error:
+                skipped.append((record.get("patient_id") if isinstance(record, dict) else None, str(error)))
+                continue
+            valid.append(record)
+            if record_type == "patient_info":
+                known_patients.add(record["patient_id"])
+        index_records(record_type, valid)
+    # Saves patch the stored dashboards; a rebuild recomputes them whole
+    with _index_lock:
+        dashboard_views.rebuild_dashboards(known_patients, DATA_DIR)
+    return skipped
+
+#=======================================================================================
+# Loading
+#=======================================================================================
+
+def load_patient_info(patient_id):
+    path = data_layout.record_path(patient_id, f"patient_info_{patient_id}.json", DATA_DIR)
+    return record_cache.get("patient_info", patient_id, None, lambda: record_format.read_record(path))
+
+SOAP_NOTE_CHUNK = 50
+
+def _visit_key(visit_date):
+    return visit_date.replace("-", "")[2:]
+
+def _legacy_note_path(patient_id, visit_date):
+    # Per-visit file from before the containers; the name carries the visit date as yymmdd
+    return data_layout.record_path(patient_id, f"soap_notes_{patient_id}_{_visit_key(visit_date)}.json", DATA_DIR)
+
+def _soap_note_sources(patient_id):
+    # {yymmdd: container visit_date or per-visit file path}. The container index and the record store list
+    # the visits, so no directory is scanned; a visit only the record store knows was saved as a per-visit
+    # file (soap_container.pack_legacy_files moves those into the container)
+    container_dates = soap_container.visit_dates(patient_id, DATA_DIR)
+    in_container = set(container_dates)
+    sources = {}
+    for visit_date in record_store.soap_note_dates(patient_id, DATA_DIR):
+        if visit_date not in in_container:
+            path = _legacy_note_path(patient_id, visit_date)
+            if os.path.exists(path):
+                sources[_visit_key(visit_date)] = path
+    for visit_date in container_dates:
+        sources[_visit_key(visit_date)] = visit_date
+    return sources
+
+def _load_soap_notes(patient_id, visit_keys, sources):
+    # Cached notes come from record_cache; the uncached container visits are sliced out of one mmap
+    container_notes = {}
+
+    def load(visit_key):
+        source = sources[visit_key]
+        if source.endswith(".json"):
+            return record_format.read_record(source)
+        if not container_notes:
+            container_notes.update(soap_container.read_notes(
+                patient_id, [sources[key] for key in visit_keys if not sources[key].endswith(".json")], DATA_DIR))
+        return container_notes.get(source)
+
+    return [record_cache.get("soap_notes", patient_id, visit_key, lambda: load(visit_key)) for visit_key in visit_keys]
+
+def iter_soap_notes(patient_id):
+    # Yield a patient's SOAP notes in visit order, SOAP_NOTE_CHUNK at a time, so callers never hold the
+    # full history
+    sources = _soap_note_sources(patient_id)
+    visit_keys = sorted(sources)
+    for start in range(0, len(visit_keys), SOAP_NOTE_CHUNK):
+        yield from _load_soap_notes(patient_id, visit_keys[start:start + SOAP_NOTE_CHUNK], sources)
+
+def load_recent_soap_notes(patient_id, count=10):
+    # The last count visits, oldest first; only those records are read
+    sources = _soap_note_sources(patient_id)
+    return _load_soap_notes(patient_id, sorted(sources)[-count:] if count > 0 else [], sources)
+
+def load_soap_note(patient_id, visit_date):
+    # visit_date as an ISO string or date; None when there is no note for that day
+    # Only this visit's sources are looked up (no directory listing), since every SOAP save calls it
+    visit_date = str(visit_date)
+    visit_key = _visit_key(visit_date)
+    if visit_date in soap_container.visit_dates(patient_id, DATA_DIR):
+        sources = {visit_key: visit_date}
+    else:
+        path = _legacy_note_path(patient_id, visit_date)
+        if not os.path.exists(path):
+            return None
+        sources = {visit_key: path}
+    return _load_soap_notes(patient_id, [visit_key], sources)[0]
+
+def load_soap_note_history(patient_id, visit_date):
+    # Every saved version of one visit's note, oldest first (see soap_revisions.note_history)
+    return soap_revisions.note_history(patient_id, str(visit_date), DATA_DIR)
+
+def load_latest_soap_note(patient_id):
+    notes = load_recent_soap_notes(patient_id, 1)
+    return notes[0] if notes else None
+
+_dashboards_checked = set()
+
+def load_dashboard(patient_id):
+    # Dashboards are refreshed by every save; one missing for records indexed before the table existed
+    # is built on first view (once per process), under the index lock so it can't interleave with a
+    # save's transaction on the shared connection
+    dashboard = dashboard_views.load_dashboard(patient_id, DATA_DIR)
+    if dashboard is None and patient_id not in _dashboards_checked:
+        with _index_lock:
+            dashboard_views.rebuild_dashboards([patient_id], DATA_DIR)
+        _dashboards_checked.add(patient_id)
+        dashboard = dashboard_views.load_dashboard(patient_id, DATA_DIR)
+    return dashboard
+
+def main(argv=None):
+    global DATA_DIR
+    parser = argparse.ArgumentParser(description="Re-index every record file in a data directory.")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="rebuild the record store and derived indexes from the record files")
+    parser.add_argument("--data-dir", default="./data", help="directory holding the record files")
+    args = parser.parse_args(argv)
+    if not args.rebuild:
+        parser.print_help()
+        return 0
+    DATA_DIR = args.data_dir
+    # Finish any interrupted saves first so the rebuild sees them
+    recover_write_log()
+    skipped = rebuild_record_store()
+    for patient_id, error in skipped:
+        print(f"  skipped: {patient_id}: {error}", file=sys.stderr)
+    print(f"Rebuilt the record store in {DATA_DIR}" + (f" ({len(skipped)} invalid records left out)" if skipped else ""))
+    return 1 if skipped else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+# data_layout.py
+# This script will handle where each patient's record files live inside the data directory.
+#   flat    - every file directly in ./data (the original layout, and the default)
+#   sharded - files fan out into nested subdirectories named after a hash of the patient_id,
+#             e.g. ./data/3f/a2/patient_info_123.json, so no directory holds more than a
+#             handful of patients however large the clinic grows
+# The layout is recorded in layout.json at the top of the data directory; a directory without
+# it is flat. The record store, write log and metric series stay at the top level either way.
+#
+# Read and write paths go through patient_dir(), which maps a patient_id to its directory
+# (cached, so resolving a path never lists a directory), and the whole-directory scans
+# (rebuild, conversion, imports) use glob_records().
+#
+# Usage (move an existing data directory to the other layout; stop the app first):
+#   python -m utils.data_layout --to sharded --data-dir ./data
+#
+#=======================================================================================
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+
+LAYOUT_FILENAME = "layout.json"
+LAYOUTS = ["flat", "sharded"]
+SHARD_DEPTH = 2    # directory levels
+SHARD_WIDTH = 2    # hex characters per level (256 directories per level)
+
+# Every per-patient file name, with the patient_id it belongs to
+PATIENT_FILES = [
+    re.compile(r"patient_info_(?P<patient_id>.*)\.json$"),
+    re.compile(r"soap_notes_(?P<patient_id>.*)_\d{6}\.json$"),
+    re.compile(r"soap_notes_(?P<patient_id>.*)\.(notes|idx|revs)$"),
+    re.compile(r"treatment_plan_(?P<patient_id>.*)_\d{8}\.json$"),
+]
+
+_lock = threading.Lock()
+_layouts = {}
+_shard_map = {}
+
+
+def load_layout(data_dir="./data"):
+    # {"layout": "flat"} or {"layout": "sharded", "depth": ..., "width": ...}
+    with _lock:
+        layout = _layouts.get(data_dir)
+        if layout is None:
+            path = os.path.join(data_dir, LAYOUT_FILENAME)
+            layout = {"layout": "flat"}
+            if os.path.exists(path):
+                with open(path) as f:
+                    layout = json.load(f)
+            _layouts[data_dir] = layout
+        return layout
+
+
+def shard_of(patient_id, depth=SHARD_DEPTH, width=SHARD_WIDTH):
+    digest = hashlib.sha1(str(patient_id).encode("utf-8")).hexdigest()
+    return os.path.join(*(digest[level * width:(level + 1) * width] for level in range(depth)))
+
+
+def patient_dir(patient_id, data_dir="./data", create=False):
+    # The directory holding this patient's record files; create=True makes it for a write
+    layout = load_layout(data_dir)
+    if layout["layout"] == "flat":
+        return data_dir
+    key = (data_dir, patient_id)
+    directory = _shard_map.get(key)
+    if directory is None:
+        directory = _shard_map[key] = os.path.join(data_dir, shard_of(patient_id, layout["depth"], layout["width"]))
+    if create:
+        os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def record_path(patient_id, filename, data_dir="./data", create=False):
+    return os.path.join(patient_dir(patient_id, data_dir, create), filename)
+
+
+def _shard_globs(data_dir, pattern, depth, width):
+    return [os.path.join(data_dir, *["[0-9a-f]" * width] * level, pattern) for level in range(depth + 1)]
+
+
+def glob_records(pattern, data_dir="./data"):
+    # Every file matching pattern, at the top level and in the shard directories, sorted by file name
+    layout = load_layout(data_dir)
+    shard_globs = _shard_globs(data_dir, pattern, layout.get("depth", SHARD_DEPTH), layout.get("width", SHARD_WIDTH))
+    paths = [path for shard_glob in shard_globs for path in glob.glob(shard_glob)]
+    return sorted(paths, key=os.path.basename)
+
+
+def patient_id_of(filename):
+    for pattern in PATIENT_FILES:
+        match = pattern.match(filename)
+        if match:
+            return match.group("patient_id")
+    return None
+
+#=======================================================================================
+# Migration
+#=======================================================================================
+
+def migrate(data_dir="./data", to="sharded", depth=SHARD_DEPTH, width=SHARD_WIDTH, progress=print):
+    # Move every per-patient file to where the target layout keeps it, then record the layout.
+    # Safe to re-run: files already in place are left alone.
+    if to not in LAYOUTS:
+        raise ValueError(f"unknown data layout {to!r} (expected one of {', '.join(LAYOUTS)})")
+    moved = 0
+    for pattern in ("*.json", "*.notes", "*.idx", "*.revs"):
+        for path in glob_records(pattern, data_dir):
+            patient_id = patient_id_of(os.path.basename(path))
+            if patient_id is None:
+                continue
+            target_dir = data_dir if to == "flat" else os.path.join(data_dir, shard_of(patient_id, depth, width))
+            target = os.path.join(target_dir, os.path.basename(path))
+            if os.path.abspath(target) != os.path.abspath(path):
+                os.makedirs(target_dir, exist_ok=True)
+                os.replace(path, target)
+                moved += 1
+    if to == "flat":
+        # Drop the now-empty shard directories, deepest first
+        # (listed again here: os.walk's listing of a parent predates removing its children)
+        for root, _, _ in os.walk(data_dir, topdown=False):
+            if root != data_dir and not os.listdir(root) and re.fullmatch(r"[0-9a-f]+", os.path.basename(root)):
+                os.rmdir(root)
+
+    layout = {"layout": "flat"} if to == "flat" else {"layout": "sharded", "depth": depth, "width": width}
+    path = os.path.join(data_dir, LAYOUT_FILENAME)
+    with open(path + ".tmp", "w") as f:
+        json.dump(layout, f)
+    os.replace(path + ".tmp", path)
+    with _lock:
+        _layouts[data_dir] = layout
+        for key in [key for key in _shard_map if key[0] == data_dir]:
+            del _shard_map[key]
+    progress(f"Moved {moved} record files; {data_dir} now uses the {to} layout")
+    return moved
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Move a data directory between the flat and sharded layouts.")
+    parser.add_argument("--to", choices=LAYOUTS, required=True, help="layout to move to")
+    parser.add_argument("--data-dir", default="./data", help="directory holding the record files")
+    args = parser.parse_args(argv)
+    migrate(args.data_dir, args.to)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
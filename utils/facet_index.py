@@ -0,0 +1,174 @@
+# facet_index.py
+# This script will handle the bitmap facet index over the multiselect fields of SOAP notes and
+# treatment plans (pain_location, treatment_modalities, ...). Each record gets a small integer
+# doc id, and every (field, option value) pair keeps a bitmap with the bits of the records that
+# selected it. Combined filters such as "Lower Back AND Sharp AND Spinal Manipulation, referred
+# for MRI" are then a few bitwise ANDs / ORs over the whole clinic instead of a JSON scan.
+#
+# Bitmaps are Python ints, stored zlib-compressed in the record store database and updated
+# incrementally on every save.
+#
+#=======================================================================================
+
+import json
+import zlib
+
+from utils.record_store import get_connection
+
+FACET_FIELDS = {
+    "soap_notes": ["pain_location", "pain_characteristics", "aggravating_factors",
+                   "treatment_provided", "referrals"],
+    "treatment_plans": ["treatment_modalities", "chiro_techniques", "treatment_areas"],
+}
+DATE_FIELDS = {"soap_notes": "visit_date", "treatment_plans": "plan_start_date"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS facet_docs (
+    record_type TEXT NOT NULL,
+    doc_id INTEGER NOT NULL,
+    patient_id TEXT NOT NULL,
+    record_date TEXT NOT NULL,
+    facets TEXT NOT NULL,
+    PRIMARY KEY (record_type, doc_id),
+    UNIQUE (record_type, patient_id, record_date)
+);
+CREATE TABLE IF NOT EXISTS facet_bitmaps (
+    record_type TEXT NOT NULL,
+    field TEXT NOT NULL,
+    value TEXT NOT NULL,
+    bitmap BLOB NOT NULL,
+    PRIMARY KEY (record_type, field, value)
+);
+"""
+
+_initialized = set()
+
+
+def _connection(data_dir):
+    conn = get_connection(data_dir)
+    if data_dir not in _initialized:
+        conn.executescript(SCHEMA)
+        _initialized.add(data_dir)
+    return conn
+
+
+def _encode(bitmap):
+    return zlib.compress(bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little"))
+
+
+def _decode(blob):
+    return int.from_bytes(zlib.decompress(blob), "little")
+
+
+def _load_bitmap(conn, record_type, field, value):
+    row = conn.execute("SELECT bitmap FROM facet_bitmaps WHERE record_type = ? AND field = ? AND value = ?",
+                       (record_type, field, value)).fetchone()
+    return _decode(row[0]) if row else 0
+
+
+def _facets_of(record_type, record):
+    return {field: sorted(set(record.get(field) or [])) for field in FACET_FIELDS[record_type]}
+
+#=======================================================================================
+# Updates
+#=======================================================================================
+
+def index_records(record_type, records, data_dir="./data"):
+    # Flip only the bits whose option values changed since the record was last indexed
+    conn = _connection(data_dir)
+    date_field = DATE_FIELDS[record_type]
+    changes = {}  # (field, value) -> [bits to set, bits to clear]
+    with conn:
+        next_id = conn.execute("SELECT COALESCE(MAX(doc_id) + 1, 0) FROM facet_docs WHERE record_type = ?",
+                               (record_type,)).fetchone()[0]
+        for record in records:
+            facets = _facets_of(record_type, record)
+            key = (record_type, record["patient_id"], record[date_field])
+            row = conn.execute("SELECT doc_id, facets FROM facet_docs "
+                               "WHERE record_type = ? AND patient_id = ? AND record_date = ?", key).fetchone()
+            if row:
+                doc_id, old_facets = row[0], json.loads(row[1])
+                conn.execute("UPDATE facet_docs SET facets = ? WHERE record_type = ? AND doc_id = ?",
+                             (json.dumps(facets), record_type, doc_id))
+            else:
+                doc_id, old_facets = next_id, {}
+                next_id += 1
+                conn.execute("INSERT INTO facet_docs VALUES (?, ?, ?, ?, ?)", key[:1] + (doc_id,) + key[1:] +
+                             (json.dumps(facets),))
+            bit = 1 << doc_id
+            for field, values in facets.items():
+                old_values = set(old_facets.get(field, []))
+                for value in set(values) - old_values:
+                    changes.setdefault((field, value), [0, 0])[0] |= bit
+                for value in old_values - set(values):
+                    changes.setdefault((field, value), [0, 0])[1] |= bit
+
+        for (field, value), (set_bits, clear_bits) in changes.items():
+            bitmap = (_load_bitmap(conn, record_type, field, value) | set_bits) & ~clear_bits
+            conn.execute("INSERT OR REPLACE INTO facet_bitmaps VALUES (?, ?, ?, ?)",
+                         (record_type, field, value, _encode(bitmap)))
+
+#=======================================================================================
+# Queries
+#=======================================================================================
+
+def facet_values(record_type, field, data_dir="./data"):
+    # Option values seen so far with their record counts, most common first
+    rows = _connection(data_dir).execute(
+        "SELECT value, bitmap FROM facet_bitmaps WHERE record_type = ? AND field = ?", (record_type, field))
+    counts = {value: _decode(blob).bit_count() for value, blob in rows}
+    return sorted(((value, count) for value, count in counts.items() if count),
+                  key=lambda item: (-item[1], item[0]))
+
+
+def match(record_type, all_of=None, any_of=None, none_of=None, data_dir="./data"):
+    # all_of / any_of / none_of map field -> list of values; returns the matching bitmap.
+    # all_of: every listed value must be selected; any_of: per field, at least one of the values;
+    # none_of: none of the values may be selected.
+    conn = _connection(data_dir)
+    result = None
+    for field, values in (all_of or {}).items():
+        for value in values:
+            bitmap = _load_bitmap(conn, record_type, field, value)
+            result = bitmap if result is None else result & bitmap
+    for field, values in (any_of or {}).items():
+        if not values:
+            continue
+        union = 0
+        for value in values:
+            union |= _load_bitmap(conn, record_type, field, value)
+        result = union if result is None else result & union
+    if result is None:
+        # No positive filter: start from every indexed record
+        total = conn.execute("SELECT COALESCE(MAX(doc_id) + 1, 0) FROM facet_docs WHERE record_type = ?",
+                             (record_type,)).fetchone()[0]
+        result = (1 << total) - 1
+    for field, values in (none_of or {}).items():
+        for value in values:
+            result &= ~_load_bitmap(conn, record_type, field, value)
+    return result
+
+
+def doc_ids(bitmap):
+    # Decode a bitmap byte by byte, skipping empty bytes
+    ids = []
+    for index, byte in enumerate(bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")):
+        while byte:
+            low = byte & -byte
+            ids.append(index * 8 + low.bit_length() - 1)
+            byte ^= low
+    return ids
+
+
+def matching_records(record_type, bitmap, limit=None, data_dir="./data"):
+    # Resolve a bitmap to (patient_id, record_date) pairs
+    conn = _connection(data_dir)
+    ids = doc_ids(bitmap)[:limit] if limit else doc_ids(bitmap)
+    records = []
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        rows = conn.execute(
+            f"SELECT patient_id, record_date FROM facet_docs WHERE record_type = ? "
+            f"AND doc_id IN ({', '.join('?' * len(chunk))}) ORDER BY doc_id", [record_type] + chunk)
+        records.extend(rows.fetchall())
+    return records
@@ -0,0 +1,260 @@
+# metric_series.py
+# This script will handle the numeric time-series store behind the progress charts. The values
+# they plot (pain_level, the six intake pain intensities and the ten ROM measurements) are kept
+# in fixed-width NumPy arrays memory-mapped from the data directory, one row per patient and one
+# slot per visit, so a patient's history is a zero-copy slice and the whole clinic is one masked
+# read -- no JSON is parsed on the way to a chart.
+#
+# [Files]
+# metric_series.f4      - float32 values, shape (patients, max_visits, len(COLUMNS)), NaN = not recorded
+# metric_series_days.i4 - int32 visit dates (days since 1970-01-01), shape (patients, max_visits);
+#                         each row is sorted, with NO_VISIT filling the unused slots at the end
+# metric_series.json    - {"max_visits", "columns", "patients": {patient_id: row}}
+#
+# data_handler.index_records keeps it current: SOAP notes are inserted in date order (a re-saved
+# visit overwrites its slot) and a saved intake form rewrites the patient's intake columns. Only
+# the latest max_visits visits of a patient are kept (BODYRES_MAX_VISITS, applied when the store
+# is created), so statistics that need every visit (cohort analytics) read visit_metrics instead,
+# and the progress tracker says when a chart shows only the latest visits. A data directory
+# without the store is filled from the record store on first use.
+# Values are written straight into the shared mapping and left to the OS to flush; like the other
+# indexes it is derived data, so rebuild it from the record store if a machine crash loses pages.
+#
+# Usage (rebuild from the record store, e.g. after changing BODYRES_MAX_VISITS):
+#   python -m utils.metric_series --rebuild --data-dir ./data
+#
+#=======================================================================================
+
+import argparse
+import json
+import os
+import sys
+import threading
+from datetime import date
+
+import numpy as np
+
+from utils import record_store
+from utils.records import PAIN_TYPES, ROM_FIELDS
+
+INTAKE_COLUMNS = [f"intake_{pain_type}" for pain_type in PAIN_TYPES]
+COLUMNS = ["pain_level"] + INTAKE_COLUMNS + ROM_FIELDS
+VALUES_FILENAME = "metric_series.f4"
+DAYS_FILENAME = "metric_series_days.i4"
+META_FILENAME = "metric_series.json"
+MAX_VISITS = int(os.environ.get("BODYRES_MAX_VISITS", 512))
+NO_VISIT = np.iinfo(np.int32).max
+EPOCH = date(1970, 1, 1)
+
+_lock = threading.RLock()
+_stores = {}
+
+
+class _Store:
+    # The memory maps and patient rows of one data directory
+    def __init__(self, data_dir, meta):
+        self.data_dir = data_dir
+        self.max_visits = meta["max_visits"]
+        self.patients = meta["patients"]
+        self.meta_mtime = os.stat(os.path.join(data_dir, META_FILENAME)).st_mtime_ns
+        self.capacity = os.path.getsize(os.path.join(data_dir, DAYS_FILENAME)) // (4 * self.max_visits)
+        self.days = self.values = None
+        if self.capacity:
+            shape = (self.capacity, self.max_visits)
+            self.days = np.memmap(os.path.join(data_dir, DAYS_FILENAME), np.int32, "r+", shape=shape)
+            self.values = np.memmap(os.path.join(data_dir, VALUES_FILENAME), np.float32, "r+",
+                                    shape=shape + (len(COLUMNS),))
+
+
+def _paths(data_dir):
+    return [os.path.join(data_dir, filename) for filename in (VALUES_FILENAME, DAYS_FILENAME, META_FILENAME)]
+
+
+def _write_meta(data_dir, max_visits, patients):
+    path = os.path.join(data_dir, META_FILENAME)
+    with open(path + ".tmp", "w") as f:
+        json.dump({"max_visits": max_visits, "columns": COLUMNS, "patients": patients}, f)
+    os.replace(path + ".tmp", path)
+
+
+def _open(data_dir):
+    # The cached store, re-mapped when another writer changed the meta file
+    values_path, days_path, meta_path = _paths(data_dir)
+    with _lock:
+        if not os.path.exists(meta_path):
+            for path in (values_path, days_path):
+                open(path, "wb").close()
+            _write_meta(data_dir, MAX_VISITS, {})
+            _stores.pop(data_dir, None)
+            _fill_from_record_store(data_dir)
+        store = _stores.get(data_dir)
+        if store is None or os.stat(meta_path).st_mtime_ns != store.meta_mtime:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta["columns"] != COLUMNS:
+                raise ValueError(f"{meta_path} has different columns; rebuild it with python -m utils.metric_series --rebuild")
+            store = _stores[data_dir] = _Store(data_dir, meta)
+        return store
+
+
+def _grow(store, rows):
+    # Extend both files to hold at least `rows` patients (new rows are marked empty before use)
+    capacity = max(rows, 2 * store.capacity, 64)
+    for path, width in ((os.path.join(store.data_dir, DAYS_FILENAME), 4),
+                        (os.path.join(store.data_dir, VALUES_FILENAME), 4 * len(COLUMNS))):
+        with open(path, "r+b") as f:
+            f.truncate(capacity * store.max_visits * width)
+    store.capacity = capacity
+    shape = (capacity, store.max_visits)
+    store.days = np.memmap(os.path.join(store.data_dir, DAYS_FILENAME), np.int32, "r+", shape=shape)
+    store.values = np.memmap(os.path.join(store.data_dir, VALUES_FILENAME), np.float32, "r+",
+                             shape=shape + (len(COLUMNS),))
+
+
+def _row(store, patient_id):
+    row = store.patients.get(patient_id)
+    if row is None:
+        row = len(store.patients)
+        if row >= store.capacity:
+            _grow(store, row + 1)
+        store.days[row] = NO_VISIT
+        store.values[row] = np.nan
+        store.patients[patient_id] = row
+    return row
+
+
+def _intake_values(patient_info):
+    characteristics = (patient_info or {}).get("pain_characteristics") or {}
+    return [characteristics.get(pain_type, {}).get("intensity") for pain_type in PAIN_TYPES]
+
+
+def _float(value):
+    return np.nan if value is None else value
+
+
+def _save_patients(store):
+    # Values reach other processes through the shared mapping; only new rows need the meta file rewritten
+    _write_meta(store.data_dir, store.max_visits, store.patients)
+    store.meta_mtime = os.stat(os.path.join(store.data_dir, META_FILENAME)).st_mtime_ns
+
+#=======================================================================================
+# Writes
+#=======================================================================================
+
+def update_series(soap_notes, data_dir="./data"):
+    # Insert (or overwrite) each note's visit slot, keeping every patient's row in date order
+    with _lock:
+        store = _open(data_dir)
+        patient_count = len(store.patients)
+        intake = {}
+        for note in soap_notes:
+            patient_id = note["patient_id"]
+            if patient_id not in intake:
+                intake[patient_id] = _intake_values(record_store.get_patient_info(patient_id, data_dir))
+            row = _row(store, patient_id)
+            days, values = store.days[row], store.values[row]
+            day = (date.fromisoformat(note["visit_date"]) - EPOCH).days
+            count = int(np.searchsorted(days, NO_VISIT))
+            slot = int(np.searchsorted(days[:count], day))
+            if slot == count or days[slot] != day:
+                if count == store.max_visits:
+                    # Full: drop the oldest visit (or this one, if it is older than all the kept ones)
+                    if slot == 0:
+                        continue
+                    days[:slot - 1] = days[1:slot].copy()
+                    values[:slot - 1] = values[1:slot].copy()
+                    slot -= 1
+                else:
+                    days[slot + 1:count + 1] = days[slot:count].copy()
+                    values[slot + 1:count + 1] = values[slot:count].copy()
+                days[slot] = day
+            values[slot] = [_float(note.get("pain_level"))] + [_float(value) for value in intake[patient_id]] + [
+                _float(note.get(field)) for field in ROM_FIELDS]
+        if len(store.patients) != patient_count:
+            _save_patients(store)
+
+
+def update_intake(patient_infos, data_dir="./data"):
+    # A saved intake form rewrites the intake columns of every visit the patient already has
+    with _lock:
+        store = _open(data_dir)
+        for patient_info in patient_infos:
+            row = store.patients.get(patient_info["patient_id"])
+            if row is not None:
+                start = COLUMNS.index(INTAKE_COLUMNS[0])
+                store.values[row, :, start:start + len(INTAKE_COLUMNS)] = [
+                    _float(value) for value in _intake_values(patient_info)]
+
+
+def _fill_from_record_store(data_dir):
+    conn = record_store.get_connection(data_dir)
+    cursor = conn.execute("SELECT data FROM soap_notes ORDER BY patient_id, visit_date")
+    while True:
+        batch = cursor.fetchmany(1000)
+        if not batch:
+            break
+        update_series([json.loads(data) for (data,) in batch], data_dir)
+
+
+def rebuild(data_dir="./data"):
+    with _lock:
+        for path in _paths(data_dir):
+            if os.path.exists(path):
+                os.remove(path)
+        _stores.pop(data_dir, None)
+        return len(_open(data_dir).patients)
+
+#=======================================================================================
+# Reads
+#=======================================================================================
+
+def patient_series(patient_id, data_dir="./data"):
+    # (visit dates as datetime64[D], values of shape (visits, len(COLUMNS))), oldest first.
+    # The values are a view into the memory map: read-only use, and copy them to keep them past a save.
+    store = _open(data_dir)
+    row = store.patients.get(patient_id)
+    if row is None:
+        return np.empty(0, "datetime64[D]"), np.empty((0, len(COLUMNS)), np.float32)
+    days = store.days[row]
+    count = int(np.searchsorted(days, NO_VISIT))
+    return days[:count].astype("datetime64[D]"), store.values[row, :count]
+
+
+def patient_frame(patient_id, data_dir="./data"):
+    import pandas as pd
+
+    # A copy of the (small) slice, so changing the frame can't write into the shared memory map
+    visit_days, values = patient_series(patient_id, data_dir)
+    frame = pd.DataFrame(values, columns=COLUMNS, copy=True)
+    frame.insert(0, "visit_date", pd.to_datetime(visit_days))
+    return frame
+
+
+def cohort_frame(data_dir="./data"):
+    # Every stored visit of every patient, sorted by (patient_id, visit_date)
+    import pandas as pd
+
+    store = _open(data_dir)
+    patient_ids = np.array(sorted(store.patients, key=store.patients.get), dtype=object)
+    if not len(patient_ids):
+        return pd.DataFrame(columns=["patient_id", "visit_date"] + COLUMNS)
+    days = store.days[:len(patient_ids)]
+    present = days != NO_VISIT
+    frame = pd.DataFrame(store.values[:len(patient_ids)][present], columns=COLUMNS)
+    frame.insert(0, "visit_date", pd.to_datetime(days[present].astype("datetime64[D]")))
+    frame.insert(0, "patient_id", np.repeat(patient_ids, present.sum(axis=1)))
+    return frame.sort_values(["patient_id", "visit_date"], kind="stable", ignore_index=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild the memory-mapped pain / ROM time-series store.")
+    parser.add_argument("--rebuild", action="store_true", help="recreate the store from the record store")
+    parser.add_argument("--data-dir", default="./data", help="directory holding the record store")
+    args = parser.parse_args(argv)
+    if args.rebuild:
+        print(f"Rebuilt the metric series of {rebuild(args.data_dir)} patients")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
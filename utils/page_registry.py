@@ -0,0 +1,38 @@
+# page_registry.py
+# This script will handle the sidebar page registry for main.py. Each page is named by its module
+# and function instead of being imported up front, so a page module (and whatever visualization
+# libraries it pulls in: pandas, altair, plotly, streamlit_elements) is only imported the first
+# time that page is opened. The first import of every page is timed so the cost of each page can
+# be shown in the sidebar.
+#
+#=======================================================================================
+
+import importlib
+import time
+
+# Sidebar label -> (module, page function), in sidebar order
+PAGES = {
+    "Patient Information": ("src.patient_info", "patient_info_page"),
+    "SOAP Notes": ("src.soap_info", "soap_notes_page"),
+    "Treatment Plan": ("src.treatment_plan_info", "treatment_plan_page"),
+    "Progress Tracker": ("src.progress_tracker_info", "progress_tracker_page"),
+    "Patient Summary": ("src.patient_summary_info", "patient_summary_page"),
+    "Clinic Analytics": ("src.cohort_analytics_info", "cohort_analytics_page"),
+    "Search Notes": ("src.search_info", "search_page"),
+}
+
+# Seconds spent importing each page the first time it was opened in this server process.
+# Modules shared between pages are only counted against the first page that imported them.
+_import_seconds = {}
+
+
+def load_page(label):
+    module_name, function_name = PAGES[label]
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    _import_seconds.setdefault(label, time.perf_counter() - start)
+    return getattr(module, function_name)
+
+
+def import_times():
+    return dict(_import_seconds)
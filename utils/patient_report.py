@@ -0,0 +1,172 @@
+# patient_report.py
+# This script will handle composing the PDF reports offered for download in the app: the
+# comprehensive patient report (patient information, active treatment plan, progress charts and
+# the full SOAP history), the single treatment plan document and the patient summary written by
+# the monthly batch job (utils/batch_reports.py). Pages are laid out with
+# pdf_report.ReportDocument, which streams each finished page into the output buffer.
+#
+#=======================================================================================
+
+import io
+from datetime import date
+
+from utils import record_store
+from utils.patient_summary import build_patient_summary
+from utils.pdf_report import ReportDocument, line_chart
+from utils.visit_metrics import metric_rows
+
+PATIENT_FIELDS = [
+    ("Patient ID", "patient_id"), ("Date of Birth", "dob"), ("Gender", "gender"),
+    ("Contact Number", "contact_number"), ("Email", "email"), ("Occupation", "occupation"),
+    ("Initial Visit", "visit_date"), ("Primary Complaint", "primary_complaint"),
+    ("Pain Onset", "pain_onset"), ("Pain Cause", "pain_cause"),
+    ("Medical History", "medical_history"), ("Current Medications", "current_medications"),
+    ("Allergies", "allergies"), ("Exercise Frequency", "exercise_frequency"),
+    ("Sleep", "sleep_hours"), ("Stress Level", "stress_level"),
+]
+PLAN_FIELDS = [
+    ("Diagnosis", "diagnosis"), ("Start Date", "plan_start_date"), ("Duration", "plan_duration"),
+    ("Initial Phase", "initial_phase"), ("Maintenance Phase", "maintenance_phase"),
+    ("Treatment Modalities", "treatment_modalities"), ("Chiropractic Techniques", "chiro_techniques"),
+    ("Treatment Areas", "treatment_areas"), ("Exercises", "exercises"),
+    ("Exercise Frequency", "exercise_frequency"), ("Home Care", "home_care"),
+    ("Short-term Goals", "short_term_goals"), ("Long-term Goals", "long_term_goals"),
+    ("Outcome Measures", "outcome_measures"), ("Precautions", "precautions"),
+    ("Lifestyle Changes", "lifestyle_changes"), ("Referrals", "referrals"),
+    ("Re-evaluation", "reevaluation_frequency"),
+]
+ROM_FLEXION = ["cervical_spine_flexion", "thoracic_spine_flexion", "lumbar_spine_flexion",
+               "shoulders_flexion", "hips_flexion"]
+
+
+def _display(value):
+    if isinstance(value, list):
+        return ", ".join(str(item) for item in value) or "-"
+    return "-" if value in (None, "") else value
+
+
+def _write_fields(doc, record, fields):
+    for label, key in fields:
+        if key in record:
+            doc.field(label, _display(record[key]))
+
+
+def _write_progress_charts(doc, patient_id, data_dir):
+    rows = metric_rows(patient_id, ["pain_level"] + ROM_FLEXION, data_dir)
+    if not rows:
+        doc.text("No SOAP notes recorded yet.")
+        return
+    labels = tuple(row[0] for row in rows)
+    pain = (("Pain Level", tuple(row[1] for row in rows)),)
+    rom = tuple((column.replace("_flexion", "").replace("_", " ").title(),
+                 tuple(row[i + 2] for row in rows)) for i, column in enumerate(ROM_FLEXION))
+    doc.chart("PainChart", line_chart("Pain Level (0-10)", labels, pain))
+    doc.chart("RomChart", line_chart("Flexion Range of Motion (degrees)", labels, rom))
+
+
+def _write_soap_note(doc, note):
+    doc.heading(f"Visit {note['visit_date']}", size=11)
+    doc.text("Subjective", bold=True)
+    doc.text(f"{_display(note.get('chief_complaint'))} - pain {note.get('pain_level')}/10, "
+             f"{_display(note.get('pain_frequency'))}; location: {_display(note.get('pain_location'))}; "
+             f"character: {_display(note.get('pain_characteristics'))}", indent=10)
+    doc.text("Objective", bold=True)
+    rom = ", ".join(f"{key.replace('_', ' ')} {note[key]}" for key in ROM_FLEXION if key in note)
+    doc.text(f"ROM: {rom}", indent=10)
+    doc.text(f"Palpation: {_display(note.get('palpation'))}", indent=10)
+    doc.text("Assessment", bold=True)
+    doc.text(f"{_display(note.get('diagnosis'))} (differential: {_display(note.get('differential_diagnosis'))}); "
+             f"prognosis {_display(note.get('prognosis'))}", indent=10)
+    doc.text("Plan", bold=True)
+    doc.text(f"{_display(note.get('treatment_provided'))}; {_display(note.get('treatment_frequency'))} for "
+             f"{_display(note.get('treatment_duration'))}. Home care: {_display(note.get('home_care_instructions'))}. "
+             f"Follow-up {_display(note.get('follow_up'))}; referrals: {_display(note.get('referrals'))}", indent=10)
+    doc.spacer()
+
+
+def write_patient_report(patient_id, out, data_dir="./data"):
+    patient = record_store.get_patient_info(patient_id, data_dir) or {"patient_id": patient_id}
+    name = patient.get("patient_name") or f"Patient {patient_id}"
+    doc = ReportDocument(out, f"Patient Report - {name}", f"Generated {date.today().isoformat()}")
+
+    doc.heading("Patient Information")
+    _write_fields(doc, patient, PATIENT_FIELDS)
+
+    doc.heading("Active Treatment Plan")
+    plan = record_store.get_active_treatment_plan(patient_id, data_dir)
+    if plan:
+        _write_fields(doc, plan, PLAN_FIELDS)
+    else:
+        doc.text("No treatment plan on file.")
+
+    doc.heading("Progress")
+    _write_progress_charts(doc, patient_id, data_dir)
+
+    # SOAP notes are decoded one at a time and each page is written out as soon as it fills
+    doc.heading("SOAP History")
+    for note in record_store.iter_soap_notes(patient_id, data_dir):
+        _write_soap_note(doc, note)
+    doc.close()
+
+
+def write_treatment_plan_report(plan, out):
+    doc = ReportDocument(out, f"Treatment Plan - {plan.get('patient_name') or plan.get('patient_id')}",
+                         f"Generated {date.today().isoformat()}")
+    doc.heading("Treatment Plan")
+    _write_fields(doc, plan, [("Patient ID", "patient_id")] + PLAN_FIELDS)
+    doc.field("Informed Consent", "Yes" if plan.get("informed_consent") else "No")
+    doc.close()
+
+
+def write_patient_summary_report(patient_id, out, as_of=None, data_dir="./data"):
+    # Same content as the Patient Summary page; returns False when the patient has no intake record
+    summary = build_patient_summary(patient_id, as_of, data_dir)
+    if summary is None:
+        return False
+    as_of = as_of or date.today()
+    doc = ReportDocument(out, f"Patient Summary - {summary['patient_name']}", f"As of {as_of.isoformat()}")
+
+    doc.heading("Patient Information")
+    doc.field("Patient ID", patient_id)
+    for label, value in summary["info"].items():
+        doc.field(label, _display(value))
+
+    doc.heading("Treatment Progress")
+    for metric, initial, current in summary["progress"]:
+        doc.field(metric, f"initial {_display(initial)}, current {_display(current)}")
+    if summary["pain_history"]:
+        labels = tuple(visit_date for visit_date, _ in summary["pain_history"])
+        pain = (("Pain Level", tuple(value for _, value in summary["pain_history"])),)
+        doc.chart("PainChart", line_chart("Pain Level (0-10)", labels, pain))
+    else:
+        doc.text("No SOAP notes recorded yet.")
+
+    doc.heading("Recent SOAP Notes")
+    for note in summary["recent_notes"]:
+        _write_soap_note(doc, note)
+
+    doc.heading("Upcoming Appointments")
+    for appointment in summary["upcoming_appointments"]:
+        doc.text(f"{appointment} - Follow-up")
+    if not summary["upcoming_appointments"]:
+        doc.text("No upcoming appointments.")
+
+    doc.heading("Current Treatment Recommendations")
+    for i, recommendation in enumerate(summary["recommendations"], start=1):
+        doc.text(f"{i}. {recommendation}")
+    if not summary["has_treatment_plan"]:
+        doc.text("No treatment plan on file.")
+    doc.close()
+    return True
+
+
+def patient_report_pdf(patient_id, data_dir="./data"):
+    buffer = io.BytesIO()
+    write_patient_report(patient_id, buffer, data_dir)
+    return buffer.getvalue()
+
+
+def treatment_plan_pdf(plan):
+    buffer = io.BytesIO()
+    write_treatment_plan_report(plan, buffer)
+    return buffer.getvalue()
@@ -0,0 +1,83 @@
+# patient_summary.py
+# This script will handle assembling the per-patient summary shown on the Patient Summary page
+# (key facts, treatment progress, pain history, recent notes, upcoming appointments and current
+# recommendations). It only needs the record store, so the same summary feeds the page, the
+# summary PDF and the batch report job.
+#
+#=======================================================================================
+
+import json
+from datetime import date
+
+from utils import record_store
+from utils.visit_metrics import metric_rows, ROM_COLUMNS
+
+RECENT_NOTES = 2
+
+
+def _recent_soap_notes(conn, patient_id, as_of, limit):
+    rows = conn.execute("SELECT data FROM soap_notes WHERE patient_id = ? AND visit_date <= ? "
+                        "ORDER BY visit_date DESC LIMIT ?", (patient_id, as_of, limit)).fetchall()
+    return [json.loads(row[0]) for row in rows]
+
+
+def _upcoming_follow_ups(conn, patient_id, as_of):
+    rows = conn.execute("SELECT DISTINCT json_extract(data, '$.follow_up') AS follow_up FROM soap_notes "
+                        "WHERE patient_id = ? AND visit_date <= ? AND follow_up >= ? ORDER BY follow_up",
+                        (patient_id, as_of, as_of))
+    return [row[0] for row in rows]
+
+
+def _recommendations(treatment_plan):
+    if not treatment_plan:
+        return []
+    # The plan's lists may be left empty (None) on the form
+    return ([f"{modality} ({treatment_plan['initial_phase']})"
+             for modality in treatment_plan.get('treatment_modalities') or []] +
+            [f"{exercise} exercises ({treatment_plan['exercise_frequency']})"
+             for exercise in treatment_plan.get('exercises') or []] +
+            list(treatment_plan.get('lifestyle_changes') or []))
+
+
+def build_patient_summary(patient_id, as_of=None, data_dir="./data"):
+    # Everything is as of the given day (default today); returns None when there is no intake record
+    patient = record_store.get_patient_info(patient_id, data_dir)
+    if patient is None:
+        return None
+    as_of = as_of or date.today()
+    conn = record_store.get_connection(data_dir)
+
+    rows = [row for row in metric_rows(patient_id, ["pain_level"] + ROM_COLUMNS, data_dir)
+            if row[0] <= as_of.isoformat()]
+    # dob may be left empty on the intake form
+    dob = date.fromisoformat(patient["dob"]) if patient.get("dob") else None
+    info = {
+        "Age": (as_of - dob).days // 365 if dob else "-",
+        "Gender": patient["gender"],
+        "Initial Consultation": patient["visit_date"],
+        "Chief Complaint": patient["primary_complaint"],
+        "Total Visits": len(rows),
+        "Last Visit": rows[-1][0] if rows else "-",
+    }
+
+    progress = []
+    if rows:
+        first, last = rows[0], rows[-1]
+        rom_initial = sum(value or 0 for value in first[2:])
+        rom_current = sum(value or 0 for value in last[2:])
+        progress = [("Pain Level", first[1], last[1]),
+                    ("ROM Improvement", 0, rom_current - rom_initial)]
+
+    plans = record_store.query_treatment_plans(patient_id, end_date=as_of, data_dir=data_dir)
+    treatment_plan = plans[-1] if plans else None
+    return {
+        "patient_id": patient_id,
+        "patient_name": patient["patient_name"],
+        "info": info,
+        "progress": progress,
+        "pain_history": [(row[0], row[1]) for row in rows],
+        "recent_notes": _recent_soap_notes(conn, patient_id, as_of.isoformat(), RECENT_NOTES),
+        "upcoming_appointments": _upcoming_follow_ups(conn, patient_id, as_of.isoformat()),
+        "recommendations": _recommendations(treatment_plan),
+        "has_treatment_plan": treatment_plan is not None,
+    }
@@ -0,0 +1,233 @@
+# pdf_report.py
+# This script will handle writing PDF documents without any third-party library. The writer
+# streams objects straight into the output as each page is finished, keeping only object byte
+# offsets in memory, so a long report never holds all of its pages at once.
+#
+# [Caching]
+# Page templates (header band + footer rule) are rendered once per title and reused for every
+# page. Charts are drawn once as vector Form XObjects ("pre-rendered" images): their drawing
+# commands are cached by data, written to the file once, and placed on a page with one operator.
+#
+#=======================================================================================
+
+import functools
+import zlib
+
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792  # US Letter, in points
+MARGIN = 54
+HEADER_HEIGHT = 48
+FOOTER_HEIGHT = 30
+CHART_COLORS = [(0.20, 0.47, 0.80), (0.85, 0.33, 0.20), (0.30, 0.65, 0.35), (0.55, 0.40, 0.70),
+                (0.90, 0.60, 0.10)]
+
+# Object ids reserved up front; everything else is numbered as it is written
+CATALOG_ID, PAGES_ID, RESOURCES_ID, FONT_REGULAR_ID, FONT_BOLD_ID = 1, 2, 3, 4, 5
+FONTS = {"F1": FONT_REGULAR_ID, "F2": FONT_BOLD_ID}
+
+
+def pdf_string(text):
+    text = str(text).encode("cp1252", errors="replace").decode("latin-1")
+    return "(" + text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+
+def text_width(text, size):
+    # Helvetica averages a little over half an em per character; good enough for wrapping
+    return len(text) * size * 0.52
+
+
+def wrap_text(text, size, width):
+    lines = []
+    for paragraph in str(text).splitlines() or [""]:
+        line = ""
+        for word in paragraph.split(" "):
+            candidate = f"{line} {word}" if line else word
+            if text_width(candidate, size) <= width or not line:
+                line = candidate
+            else:
+                lines.append(line)
+                line = word
+        lines.append(line)
+    return lines
+
+
+class PdfWriter:
+    def __init__(self, out):
+        self.out = out
+        self.offsets = {}
+        self.page_ids = []
+        self.xobjects = {}
+        self.next_id = FONT_BOLD_ID + 1
+        self.position = 0
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write(self, data):
+        self.out.write(data)
+        self.position += len(data)
+
+    def reserve_id(self):
+        obj_id = self.next_id
+        self.next_id += 1
+        return obj_id
+
+    def write_object(self, obj_id, body):
+        self.offsets[obj_id] = self.position
+        self._write(f"{obj_id} 0 obj\n".encode() + body + b"\nendobj\n")
+
+    def write_stream(self, obj_id, dictionary, content):
+        data = zlib.compress(content)
+        self.write_object(obj_id, f"<< {dictionary} /Filter /FlateDecode /Length {len(data)} >>\nstream\n".encode()
+                          + data + b"\nendstream")
+
+    def add_xobject(self, name, width, height, content):
+        # A reusable drawing (chart); written once, drawn on any page with "/name Do"
+        if name not in self.xobjects:
+            obj_id = self.reserve_id()
+            font_resources = " ".join(f"/{font} {font_id} 0 R" for font, font_id in FONTS.items())
+            self.write_stream(obj_id, f"/Type /XObject /Subtype /Form /BBox [0 0 {width} {height}] "
+                                      f"/Resources << /Font << {font_resources} >> >>", content)
+            self.xobjects[name] = obj_id
+        return name
+
+    def add_page(self, content):
+        contents_id, page_id = self.reserve_id(), self.reserve_id()
+        self.write_stream(contents_id, "", content)
+        self.write_object(page_id, (f"<< /Type /Page /Parent {PAGES_ID} 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+                                    f"/Resources {RESOURCES_ID} 0 R /Contents {contents_id} 0 R >>").encode())
+        self.page_ids.append(page_id)
+
+    def close(self):
+        self.write_object(FONT_REGULAR_ID, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica "
+                                           b"/Encoding /WinAnsiEncoding >>")
+        self.write_object(FONT_BOLD_ID, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold "
+                                        b"/Encoding /WinAnsiEncoding >>")
+        fonts = " ".join(f"/{font} {font_id} 0 R" for font, font_id in FONTS.items())
+        xobjects = " ".join(f"/{name} {obj_id} 0 R" for name, obj_id in self.xobjects.items())
+        self.write_object(RESOURCES_ID, f"<< /Font << {fonts} >> /XObject << {xobjects} >> >>".encode())
+        kids = " ".join(f"{page_id} 0 R" for page_id in self.page_ids)
+        self.write_object(PAGES_ID, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>".encode())
+        self.write_object(CATALOG_ID, f"<< /Type /Catalog /Pages {PAGES_ID} 0 R >>".encode())
+
+        xref_position = self.position
+        xref = [f"xref\n0 {self.next_id}\n", "0000000000 65535 f \n"]
+        xref += [f"{self.offsets[obj_id]:010d} 00000 n \n" for obj_id in range(1, self.next_id)]
+        self._write("".join(xref).encode())
+        self._write(f"trailer\n<< /Size {self.next_id} /Root {CATALOG_ID} 0 R >>\nstartxref\n{xref_position}\n%%EOF\n"
+                    .encode())
+
+#=======================================================================================
+# Cached templates and charts
+#=======================================================================================
+
+@functools.lru_cache(maxsize=64)
+def page_template(title, subtitle):
+    # Header band and footer rule shared by every page of a report
+    top = PAGE_HEIGHT - MARGIN
+    return "\n".join([
+        "q 0.20 0.29 0.37 rg",
+        f"{MARGIN} {top - 6} {PAGE_WIDTH - 2 * MARGIN} 2 re f Q",
+        f"BT /F2 14 Tf 0.17 0.24 0.31 rg {MARGIN} {top + 6} Td {pdf_string(title)} Tj ET",
+        f"BT /F1 9 Tf 0.45 0.45 0.45 rg {PAGE_WIDTH - MARGIN - text_width(subtitle, 9):.1f} {top + 8} Td "
+        f"{pdf_string(subtitle)} Tj ET",
+        f"q 0.75 0.75 0.75 RG 0.5 w {MARGIN} {MARGIN + 10} m {PAGE_WIDTH - MARGIN} {MARGIN + 10} l S Q",
+    ]).encode("latin-1") + b"\n"
+
+
+@functools.lru_cache(maxsize=256)
+def line_chart(title, labels, series, width=PAGE_WIDTH - 2 * MARGIN, height=200):
+    # labels: tuple of x labels; series: tuple of (name, tuple of values or None)
+    plot_left, plot_bottom = 36, 36
+    plot_width, plot_height = width - plot_left - 10, height - plot_bottom - 28
+    values = [v for _, points in series for v in points if v is not None]
+    low, high = (min(values), max(values)) if values else (0, 1)
+    if high == low:
+        high = low + 1
+
+    def x_at(i):
+        return plot_left + (plot_width * i / max(1, len(labels) - 1))
+
+    def y_at(v):
+        return plot_bottom + plot_height * (v - low) / (high - low)
+
+    ops = [f"BT /F2 10 Tf 0 0 0 rg 0 {height - 12} Td {pdf_string(title)} Tj ET",
+           f"q 0.6 0.6 0.6 RG 0.5 w {plot_left} {plot_bottom} m {plot_left} {plot_bottom + plot_height} l S",
+           f"{plot_left} {plot_bottom} m {plot_left + plot_width} {plot_bottom} l S Q"]
+    for v in (low, (low + high) / 2, high):
+        ops.append(f"BT /F1 7 Tf 0.3 0.3 0.3 rg 2 {y_at(v) - 2:.1f} Td {pdf_string(f'{v:g}')} Tj ET")
+    step = max(1, len(labels) // 6)
+    for i in range(0, len(labels), step):
+        ops.append(f"BT /F1 7 Tf 0.3 0.3 0.3 rg {x_at(i) - 18:.1f} {plot_bottom - 12} Td {pdf_string(labels[i])} Tj ET")
+
+    for index, (name, points) in enumerate(series):
+        r, g, b = CHART_COLORS[index % len(CHART_COLORS)]
+        path, pen_down = [], False
+        for i, v in enumerate(points):
+            if v is None:
+                pen_down = False
+                continue
+            path.append(f"{x_at(i):.1f} {y_at(v):.1f} {'l' if pen_down else 'm'}")
+            pen_down = True
+        ops.append(f"q {r} {g} {b} RG 1.2 w {' '.join(path)} S Q" if path else "")
+        legend_x = plot_left + index * 110
+        ops.append(f"q {r} {g} {b} rg {legend_x} {height - 26} 8 6 re f Q "
+                   f"BT /F1 7 Tf 0.2 0.2 0.2 rg {legend_x + 11} {height - 26} Td {pdf_string(name)} Tj ET")
+    return "\n".join(op for op in ops if op).encode("latin-1")
+
+#=======================================================================================
+# Page flow
+#=======================================================================================
+
+class ReportDocument:
+    # Flows headings, text and charts down the page, writing each page out as soon as it is full
+    def __init__(self, out, title, subtitle=""):
+        self.writer = PdfWriter(out)
+        self.title = title
+        self.subtitle = subtitle
+        self.page_number = 0
+        self.ops = []
+        self._new_page()
+
+    def _new_page(self):
+        self.page_number += 1
+        self.ops = [page_template(self.title, self.subtitle).decode("latin-1"),
+                    f"BT /F1 8 Tf 0.45 0.45 0.45 rg {PAGE_WIDTH / 2 - 12} {MARGIN} Td "
+                    f"{pdf_string(f'Page {self.page_number}')} Tj ET"]
+        self.y = PAGE_HEIGHT - MARGIN - HEADER_HEIGHT
+
+    def _flush_page(self):
+        self.writer.add_page("\n".join(self.ops).encode("latin-1"))
+        self.ops = []
+
+    def _ensure_space(self, height):
+        if self.y - height < MARGIN + FOOTER_HEIGHT:
+            self._flush_page()
+            self._new_page()
+
+    def heading(self, text, size=13):
+        # Keep a heading together with at least a few lines of what follows it
+        self._ensure_space(size + 60)
+        self.y -= size + 8
+        self.ops.append(f"BT /F2 {size} Tf 0.17 0.24 0.31 rg {MARGIN} {self.y:.1f} Td {pdf_string(text)} Tj ET")
+        self.y -= 6
+
+    def text(self, text, size=10, bold=False, indent=0):
+        font = "F2" if bold else "F1"
+        for line in wrap_text(text, size, PAGE_WIDTH - 2 * MARGIN - indent):
+            self._ensure_space(size + 4)
+            self.y -= size + 4
+            self.ops.append(f"BT /{font} {size} Tf 0 0 0 rg {MARGIN + indent} {self.y:.1f} Td {pdf_string(line)} Tj ET")
+
+    def field(self, label, value, size=10):
+        self.text(f"{label}: {value}", size=size)
+
+    def spacer(self, height=8):
+        self.y -= height
+
+    def chart(self, name, content, width=PAGE_WIDTH - 2 * MARGIN, height=200):
+        self.writer.add_xobject(name, width, height, content)
+        self._ensure_space(height + 10)
+        self.y -= height + 10
+        self.ops.append(f"q 1 0 0 1 {MARGIN} {self.y:.1f} cm /{name} Do Q")
+
+    def close(self):
+        self._flush_page()
+        self.writer.close()
@@ -0,0 +1,66 @@
+# record_cache.py
+# This script will handle the process-wide cache of parsed records. Streamlit re-runs a page top
+# to bottom on every widget interaction, so without it the same patient, SOAP and treatment-plan
+# JSON files would be re-opened and re-parsed on every click.
+#
+# Entries are keyed by (record type, patient_id, date) and evicted least-recently-used once
+# MAX_ENTRIES is reached (set BODYRES_RECORD_CACHE_SIZE to change it, 0 disables the cache).
+# data_handler invalidates a patient's entries whenever it saves a record for them. Cached
+# records are shared between sessions, so callers must treat them as read-only.
+#
+#=======================================================================================
+
+import os
+import threading
+from collections import OrderedDict
+
+MAX_ENTRIES = int(os.environ.get("BODYRES_RECORD_CACHE_SIZE", 1024))
+
+_lock = threading.Lock()
+_entries = OrderedDict()
+_stats = {"hits": 0, "misses": 0}
+_generation = 0
+_MISSING = object()
+
+
+def get(record_type, patient_id, record_date, loader):
+    # Return the cached record, or call loader() and cache its result (None included)
+    key = (record_type, patient_id, record_date)
+    with _lock:
+        value = _entries.get(key, _MISSING)
+        if value is not _MISSING:
+            _entries.move_to_end(key)
+            _stats["hits"] += 1
+            return value
+        _stats["misses"] += 1
+        generation = _generation
+
+    value = loader()
+    if MAX_ENTRIES > 0:
+        with _lock:
+            if generation != _generation:
+                return value  # a save landed while loading; don't cache a possibly stale record
+            _entries[key] = value
+            _entries.move_to_end(key)
+            while len(_entries) > MAX_ENTRIES:
+                _entries.popitem(last=False)
+    return value
+
+
+def invalidate(record_type, patient_id):
+    global _generation
+    with _lock:
+        _generation += 1
+        for key in [key for key in _entries if key[0] == record_type and key[1] == patient_id]:
+            del _entries[key]
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+        _stats["hits"] = _stats["misses"] = 0
+
+
+def stats():
+    with _lock:
+        return dict(_stats, entries=len(_entries), max_entries=MAX_ENTRIES)
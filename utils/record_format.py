@@ -0,0 +1,149 @@
+# record_format.py
+# This script will handle the on-disk encoding of record files. Records can be written as:
+#   json    - the original indented JSON documents (default)
+#   binary  - the compact tagged encoding from records.py (no field names stored)
+#   msgpack - MessagePack, when the optional msgpack package is installed
+# The write format is chosen with the BODYRES_RECORD_FORMAT environment variable. File names
+# don't change with the format; readers detect it from the first bytes of each file, so a data
+# directory holding a mix of old JSON and newer binary files reads the same.
+#
+# Usage (rewrite every record file and SOAP note container in one format):
+#   python -m utils.record_format --to binary --data-dir ./data
+#
+#=======================================================================================
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+from utils import data_layout, records
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+FORMATS = ["json", "binary", "msgpack"]
+WRITE_FORMAT = os.environ.get("BODYRES_RECORD_FORMAT", "json")
+
+
+def detect_format(data):
+    if data[:2] == records.MAGIC:
+        return "binary"
+    first = data[:1]
+    if first.isspace():
+        first = data.lstrip()[:1]
+    if first == b"{":
+        return "json"
+    if first and (0x80 <= first[0] <= 0x8f or first[0] in (0xde, 0xdf)):
+        return "msgpack"
+    raise ValueError("unrecognized record file format")
+
+
+def encode(record_type, record, fmt=None):
+    fmt = fmt or WRITE_FORMAT
+    if fmt == "binary":
+        # The binary layout is fixed per record type; records that don't fit it exactly stay JSON
+        try:
+            typed = records.from_dict(record_type, record)
+            if typed.to_dict() == record:
+                return typed.to_bytes()
+        except (TypeError, ValueError):
+            pass
+        fmt = "json"
+    if fmt == "msgpack":
+        if msgpack is None:
+            raise RuntimeError("BODYRES_RECORD_FORMAT=msgpack needs the msgpack package (pip install msgpack)")
+        return msgpack.packb(record, use_bin_type=True)
+    if fmt == "json":
+        return json.dumps(record, indent=4).encode("utf-8")
+    raise ValueError(f"unknown record format {fmt!r} (expected one of {', '.join(FORMATS)})")
+
+
+def decode(data):
+    fmt = detect_format(data)
+    if fmt == "binary":
+        return records.dict_from_bytes(data)
+    if fmt == "msgpack":
+        if msgpack is None:
+            raise RuntimeError("this record is MessagePack-encoded; install the msgpack package to read it")
+        return msgpack.unpackb(data, raw=False)
+    return json.loads(data)
+
+
+def read_record(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return decode(f.read())
+
+
+def _write_atomic(path, data):
+    # Write to a temp file and rename over the target so readers never see a partial file. Each
+    # write gets its own temp file, so two writers of the same record can't trip over each other.
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".",
+                                    suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_record(path, record_type, record, fmt=None):
+    _write_atomic(path, encode(record_type, record, fmt))
+
+#=======================================================================================
+# Conversion
+#=======================================================================================
+
+def convert(data_dir, fmt, patterns, progress=print):
+    # Rewrite every record file, and every note in the SOAP note containers, not already in fmt (run
+    # with the app stopped so no save races it). Returns (records converted, records left as they
+    # were, bytes before, bytes after).
+    # Imported here: soap_container itself imports this module
+    from utils import soap_container
+
+    converted, kept, before, after = 0, 0, 0, 0
+    for record_type, pattern in patterns.items():
+        for path in data_layout.glob_records(pattern, data_dir):
+            with open(path, "rb") as f:
+                data = f.read()
+            if detect_format(data) == fmt:
+                continue
+            encoded = encode(record_type, decode(data), fmt)
+            if detect_format(encoded) != fmt:
+                kept += 1
+                continue
+            _write_atomic(path, encoded)
+            converted += 1
+            before += len(data)
+            after += len(encoded)
+    for patient_id in soap_container.container_patient_ids(data_dir):
+        counts = soap_container.convert(patient_id, fmt, data_dir)
+        converted, kept, before, after = [total + count for total, count in
+                                          zip((converted, kept, before, after), counts)]
+    progress(f"Converted {converted} records to {fmt}: {before / 1024:.0f} KB -> {after / 1024:.0f} KB"
+             + (f" ({kept} records with non-standard fields left as they were)" if kept else ""))
+    return converted, kept, before, after
+
+
+def main(argv=None):
+    # Imported here: data_handler itself imports this module
+    from utils.data_handler import RECORD_PATTERNS
+
+    parser = argparse.ArgumentParser(description="Rewrite every record file in one on-disk format.")
+    parser.add_argument("--to", choices=FORMATS, required=True, help="format to convert to")
+    parser.add_argument("--data-dir", default="./data", help="directory holding the record files")
+    args = parser.parse_args(argv)
+    convert(args.data_dir, args.to, RECORD_PATTERNS)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
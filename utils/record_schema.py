@@ -0,0 +1,132 @@
+# record_schema.py
+# This script will handle turning the record schemas declared in data_handler into validators.
+# A schema maps each field name to a small spec dict:
+#   type     - "str", "id", "number", "integer", "bool", "date", "time", "list" or "object"
+#   required - the key must be present (default False)
+#   nullable - None is accepted (default True)
+#   minimum / maximum, min_length, enum, pattern - the usual constraints
+#   items    - spec (or type name) every list element must match
+#   properties / values - specs for an object's known keys / for every value
+# compile_schema() resolves every spec once into a flat list of checks, so validating a record is
+# a single pass over its fields with no schema interpretation left at save or import time.
+#
+#=======================================================================================
+
+import re
+from datetime import date, time
+
+ID_PATTERN = r"[A-Za-z0-9][A-Za-z0-9._-]{0,63}"
+_MISSING = object()
+
+
+def _is_date(value):
+    try:
+        return isinstance(value, str) and len(value) == 10 and date.fromisoformat(value) is not None
+    except ValueError:
+        return False
+
+
+def _is_time(value):
+    try:
+        return isinstance(value, str) and time.fromisoformat(value) is not None
+    except ValueError:
+        return False
+
+
+TYPE_CHECKS = {
+    "str": (lambda value: isinstance(value, str), "must be text"),
+    "id": (lambda value: isinstance(value, str), "must be text"),
+    "number": (lambda value: isinstance(value, (int, float)) and not isinstance(value, bool), "must be a number"),
+    "integer": (lambda value: isinstance(value, int) and not isinstance(value, bool), "must be a whole number"),
+    "bool": (lambda value: isinstance(value, bool), "must be true or false"),
+    "date": (_is_date, "must be a YYYY-MM-DD date"),
+    "time": (_is_time, "must be an HH:MM[:SS] time"),
+    "list": (lambda value: isinstance(value, list), "must be a list"),
+    "object": (lambda value: isinstance(value, dict), "must be an object"),
+}
+
+
+def _compile_value(spec):
+    # -> check(value) returning an error message or None; value is known not to be None
+    if isinstance(spec, str):
+        spec = {"type": spec}
+    is_type, type_error = TYPE_CHECKS[spec["type"]]
+    checks = []
+    if "min_length" in spec:
+        min_length = spec["min_length"]
+        checks.append((lambda value: len(value.strip() if isinstance(value, str) else value) >= min_length,
+                       "must not be blank" if min_length == 1 else f"must have at least {min_length} entries"))
+    if spec["type"] == "id":
+        id_pattern = re.compile(ID_PATTERN)
+        checks.append((lambda value: id_pattern.fullmatch(value) is not None,
+                       "is not a valid ID (letters, digits, '.', '_' or '-', starting with a letter or digit)"))
+    if "pattern" in spec:
+        pattern = re.compile(spec["pattern"])
+        checks.append((lambda value: pattern.fullmatch(value) is not None, f"must match {pattern.pattern}"))
+    if "minimum" in spec:
+        minimum = spec["minimum"]
+        checks.append((lambda value: value >= minimum, f"must be at least {minimum}"))
+    if "maximum" in spec:
+        maximum = spec["maximum"]
+        checks.append((lambda value: value <= maximum, f"must be at most {maximum}"))
+    if "enum" in spec:
+        options = frozenset(spec["enum"])
+        checks.append((lambda value: value in options, f"must be one of {', '.join(map(str, spec['enum']))}"))
+    nested = None
+    if "items" in spec:
+        item_check = _compile_value(spec["items"])
+
+        def nested(value):
+            for index, item in enumerate(value):
+                error = item_check(item) if item is not None else "is empty"
+                if error:
+                    return f"[{index}] {error}"
+            return None
+    elif "properties" in spec or "values" in spec:
+        object_check = compile_schema(spec.get("properties", {}))
+        value_check = _compile_value(spec["values"]) if "values" in spec else None
+
+        def nested(value):
+            errors = object_check(value)
+            if value_check is not None:
+                for key, item in value.items():
+                    error = value_check(item) if item is not None else None
+                    if error:
+                        errors.append(f"{key} {error}")
+            return f"({'; '.join(errors)})" if errors else None
+
+    def check(value):
+        if not is_type(value):
+            return type_error
+        for is_valid, error in checks:
+            if not is_valid(value):
+                return error
+        return nested(value) if nested is not None else None
+
+    return check
+
+
+def compile_schema(schema):
+    # -> validate(record) returning a list of "field problem" messages (empty when the record is valid)
+    fields = [(name, spec.get("required", False), spec.get("nullable", True), _compile_value(spec))
+              for name, spec in schema.items()]
+
+    def validate(record):
+        if not isinstance(record, dict):
+            return ["record must be an object"]
+        errors = []
+        for name, required, nullable, check in fields:
+            value = record.get(name, _MISSING)
+            if value is _MISSING:
+                if required:
+                    errors.append(f"{name} is missing")
+            elif value is None:
+                if not nullable:
+                    errors.append(f"{name} is empty")
+            else:
+                error = check(value)
+                if error:
+                    errors.append(f"{name} {error}")
+        return errors
+
+    return validate
@@ -0,0 +1,184 @@
+# record_store.py
+# This script will handle the indexed record store that sits behind data_handler. Every saved
+# patient record, SOAP note and treatment plan is mirrored into a local SQLite database so that
+# lookups such as "all notes for patient X between two dates" are index queries instead of a
+# directory scan that opens and parses every JSON file.
+#
+# [Tables]
+# patient_info    - one row per patient_id (latest intake form)
+# soap_notes      - one row per (patient_id, visit_date)
+# treatment_plans - one row per (patient_id, plan_start_date)
+#
+#=======================================================================================
+
+import json
+import os
+import sqlite3
+
+DB_FILENAME = "records.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS patient_info (
+    patient_id TEXT PRIMARY KEY,
+    patient_name TEXT,
+    visit_date TEXT,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS soap_notes (
+    patient_id TEXT NOT NULL,
+    visit_date TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (patient_id, visit_date)
+);
+CREATE TABLE IF NOT EXISTS treatment_plans (
+    patient_id TEXT NOT NULL,
+    plan_start_date TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (patient_id, plan_start_date)
+);
+CREATE INDEX IF NOT EXISTS idx_soap_notes_visit_date ON soap_notes (visit_date);
+CREATE INDEX IF NOT EXISTS idx_treatment_plans_start_date ON treatment_plans (plan_start_date);
+"""
+
+_connections = {}
+
+
+def get_connection(data_dir="./data"):
+    # One connection per data directory, created lazily and reused for the life of the process
+    db_path = os.path.join(data_dir, DB_FILENAME)
+    conn = _connections.get(db_path)
+    if conn is None:
+        os.makedirs(data_dir, exist_ok=True)
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        _connections[db_path] = conn
+    return conn
+
+
+def close_connections():
+    for conn in _connections.values():
+        conn.close()
+    _connections.clear()
+
+#=======================================================================================
+# Writes
+#=======================================================================================
+
+def _patient_info_row(patient_data):
+    return (patient_data["patient_id"], patient_data.get("patient_name"),
+            patient_data.get("visit_date"), json.dumps(patient_data))
+
+
+def _soap_note_row(soap_data):
+    return (soap_data["patient_id"], soap_data["visit_date"], json.dumps(soap_data))
+
+
+def _treatment_plan_row(treatment_plan_data):
+    return (treatment_plan_data["patient_id"], treatment_plan_data["plan_start_date"],
+            json.dumps(treatment_plan_data))
+
+
+INSERTS = {
+    "patient_info": ("INSERT OR REPLACE INTO patient_info (patient_id, patient_name, visit_date, data) "
+                     "VALUES (?, ?, ?, ?)", _patient_info_row),
+    "soap_notes": ("INSERT OR REPLACE INTO soap_notes (patient_id, visit_date, data) "
+                   "VALUES (?, ?, ?)", _soap_note_row),
+    "treatment_plans": ("INSERT OR REPLACE INTO treatment_plans (patient_id, plan_start_date, data) "
+                        "VALUES (?, ?, ?)", _treatment_plan_row),
+}
+
+
+def index_records(record_type, records, data_dir="./data"):
+    # Insert (or replace) a batch of records of one type inside a single transaction
+    sql, to_row = INSERTS[record_type]
+    conn = get_connection(data_dir)
+    with conn:
+        conn.executemany(sql, (to_row(record) for record in records))
+
+
+def index_record(record_type, record, data_dir="./data"):
+    index_records(record_type, [record], data_dir)
+
+#=======================================================================================
+# Queries
+#=======================================================================================
+
+def list_patients(data_dir="./data"):
+    conn = get_connection(data_dir)
+    return conn.execute(
+        "SELECT patient_id, patient_name FROM patient_info ORDER BY patient_name, patient_id"
+    ).fetchall()
+
+
+def patient_exists(patient_id, data_dir="./data"):
+    conn = get_connection(data_dir)
+    return conn.execute("SELECT 1 FROM patient_info WHERE patient_id = ?", (patient_id,)).fetchone() is not None
+
+
+def get_patient_info(patient_id, data_dir="./data"):
+    conn = get_connection(data_dir)
+    row = conn.execute("SELECT data FROM patient_info WHERE patient_id = ?", (patient_id,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def query_soap_notes(patient_id, start_date=None, end_date=None, data_dir="./data"):
+    # Dates are ISO strings (or date objects), so range filters compare lexically on the index
+    sql = "SELECT data FROM soap_notes WHERE patient_id = ?"
+    params = [patient_id]
+    if start_date is not None:
+        sql += " AND visit_date >= ?"
+        params.append(str(start_date))
+    if end_date is not None:
+        sql += " AND visit_date <= ?"
+        params.append(str(end_date))
+    sql += " ORDER BY visit_date"
+    conn = get_connection(data_dir)
+    return [json.loads(row[0]) for row in conn.execute(sql, params)]
+
+
+def soap_note_dates(patient_id, data_dir="./data"):
+    # Visit dates only (oldest first), straight from the primary key index
+    conn = get_connection(data_dir)
+    return [visit_date for (visit_date,) in conn.execute(
+        "SELECT visit_date FROM soap_notes WHERE patient_id = ? ORDER BY visit_date", (patient_id,))]
+
+
+def iter_soap_notes(patient_id, data_dir="./data"):
+    # Lazily decode one note at a time (oldest first) for long histories
+    conn = get_connection(data_dir)
+    for (data,) in conn.execute("SELECT data FROM soap_notes WHERE patient_id = ? ORDER BY visit_date",
+                                (patient_id,)):
+        yield json.loads(data)
+
+
+def get_latest_soap_note(patient_id, data_dir="./data"):
+    conn = get_connection(data_dir)
+    row = conn.execute(
+        "SELECT data FROM soap_notes WHERE patient_id = ? ORDER BY visit_date DESC LIMIT 1", (patient_id,)
+    ).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def query_treatment_plans(patient_id, start_date=None, end_date=None, data_dir="./data"):
+    sql = "SELECT data FROM treatment_plans WHERE patient_id = ?"
+    params = [patient_id]
+    if start_date is not None:
+        sql += " AND plan_start_date >= ?"
+        params.append(str(start_date))
+    if end_date is not None:
+        sql += " AND plan_start_date <= ?"
+        params.append(str(end_date))
+    sql += " ORDER BY plan_start_date"
+    conn = get_connection(data_dir)
+    return [json.loads(row[0]) for row in conn.execute(sql, params)]
+
+
+def get_active_treatment_plan(patient_id, data_dir="./data"):
+    conn = get_connection(data_dir)
+    row = conn.execute(
+        "SELECT data FROM treatment_plans WHERE patient_id = ? ORDER BY plan_start_date DESC LIMIT 1",
+        (patient_id,)
+    ).fetchone()
+    return json.loads(row[0]) if row else None
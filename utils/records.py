@@ -0,0 +1,297 @@
+# records.py
+# This script will handle the typed record classes behind data_handler's save functions:
+# PatientInfo, SoapNote and TreatmentPlan. Each is a __slots__ class (no per-instance __dict__),
+# and the numeric blocks are fixed-length arrays instead of one dict entry per value:
+#   PatientInfo.pain_intensity / pain_frequency - one signed byte per pain type (PAIN_TYPES)
+#   SoapNote.rom                                - one double per ROM measurement (ROM_FIELDS)
+# so tens of thousands of notes can be held in memory for analytics cheaply.
+#
+# [Serialization]
+# to_dict() returns exactly the JSON document the app has always saved, and from_dict() reads it
+# back (missing keys become None). to_bytes() / from_bytes() use a compact binary layout: a 4-byte
+# header (magic, record type, layout version), the raw arrays, then every other field as one
+# compact JSON array in declaration order, so no field names are stored and the bulk of the
+# decoding still runs in the C JSON parser.
+#
+#=======================================================================================
+
+import json
+import math
+from array import array
+from datetime import date, time
+
+PAIN_TYPES = ["sharp", "shooting", "aching", "burning", "tingling", "numbness"]
+PAIN_FREQUENCIES = ["Constant", "Intermittent", "Occasional"]
+ROM_FIELDS = [
+    "cervical_spine_flexion", "cervical_spine_extension",
+    "thoracic_spine_flexion", "thoracic_spine_extension",
+    "lumbar_spine_flexion", "lumbar_spine_extension",
+    "shoulders_flexion", "shoulders_extension",
+    "hips_flexion", "hips_extension",
+]
+
+MAGIC = b"BR"
+LAYOUT_VERSION = 1
+MISSING_BYTE = -1
+
+
+def _iso(value):
+    return value.isoformat() if isinstance(value, (date, time)) else value
+
+
+def _byte_value(value, name):
+    if value is None:
+        return MISSING_BYTE
+    if value != int(value) or not 0 <= value <= 127:
+        raise ValueError(f"{name} must be a whole number between 0 and 127, got {value!r}")
+    return int(value)
+
+
+def _from_byte(value):
+    return None if value == MISSING_BYTE else value
+
+
+def _number(value):
+    # Whole-number doubles come back as ints so the saved JSON is unchanged
+    if math.isnan(value):
+        return None
+    return int(value) if value.is_integer() else value
+
+
+class Record:
+    __slots__ = ()
+    RECORD_TYPE = None
+    TYPE_CODE = None
+    PARAMS = []         # constructor arguments, in the order the old save_* functions took them
+    SCALARS = []        # slots holding plain values, in binary order
+    ARRAYS = []         # (slot, typecode, length) for the fixed numeric arrays
+
+    def __init__(self, *args, **kwargs):
+        if len(args) > len(self.PARAMS):
+            raise TypeError(f"{type(self).__name__} takes {len(self.PARAMS)} arguments, got {len(args)}")
+        values = dict(zip(self.PARAMS, args))
+        for key, value in kwargs.items():
+            if key in values:
+                raise TypeError(f"{type(self).__name__} got multiple values for {key!r}")
+            values[key] = value
+        missing = [param for param in self.PARAMS if param not in values]
+        unknown = [key for key in values if key not in self._param_set]
+        if missing:
+            raise TypeError(f"{type(self).__name__} missing arguments: {', '.join(missing)}")
+        if unknown:
+            raise TypeError(f"{type(self).__name__} got unexpected arguments: {', '.join(unknown)}")
+        self._assign(values)
+
+    def __init_subclass__(cls):
+        cls._param_set = frozenset(cls.PARAMS)
+        RECORD_CLASSES[cls.TYPE_CODE] = cls
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"{type(self).__name__}(patient_id={self.patient_id!r})"
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{param: data.get(param) for param in cls.PARAMS})
+
+    def to_dict(self):
+        return self.dict_from_parts([getattr(self, slot) for slot, _, _ in self.ARRAYS],
+                                    [getattr(self, slot) for slot in self.SCALARS])
+
+    def to_bytes(self):
+        out = bytearray(MAGIC + bytes([self.TYPE_CODE, LAYOUT_VERSION]))
+        for slot, _, _ in self.ARRAYS:
+            out += getattr(self, slot).tobytes()
+        out += json.dumps([getattr(self, slot) for slot in self.SCALARS], separators=(",", ":")).encode("utf-8")
+        return bytes(out)
+
+
+RECORD_CLASSES = {}
+
+#=======================================================================================
+# Record types
+#=======================================================================================
+
+class PatientInfo(Record):
+    RECORD_TYPE = "patient_info"
+    TYPE_CODE = 1
+    PARAMS = ([
+        "patient_name", "patient_id", "dob", "gender",
+        "contact_number", "email", "visit_date", "visit_time",
+        "occupation", "height_ft", "height_in", "weight_lbs",
+        "emergency_name", "emergency_relation", "emergency_number",
+        "medical_history", "current_medications", "allergies",
+        "exercise_frequency", "exercise_types", "sleep_hours", "stress_level",
+        "previous_chiro",
+        "primary_complaint", "pain_onset", "pain_cause",
+    ] + [f"pain_intensity_{pain_type}" for pain_type in PAIN_TYPES]
+      + [f"pain_freq_{pain_type}" for pain_type in PAIN_TYPES]
+      + ["consent", "privacy_agreement"])
+    SCALARS = [param for param in PARAMS if not param.startswith(("pain_intensity_", "pain_freq_"))]
+    ARRAYS = [("pain_intensity", "b", len(PAIN_TYPES)), ("pain_frequency", "b", len(PAIN_TYPES))]
+    __slots__ = SCALARS + [slot for slot, _, _ in ARRAYS]
+
+    def _assign(self, values):
+        for slot in self.SCALARS:
+            setattr(self, slot, values[slot])
+        self.dob, self.visit_date, self.pain_onset = _iso(self.dob), _iso(self.visit_date), _iso(self.pain_onset)
+        self.visit_time = _iso(self.visit_time)
+        self.pain_intensity = array("b", (_byte_value(values[f"pain_intensity_{pain_type}"], pain_type)
+                                          for pain_type in PAIN_TYPES))
+        frequencies = [values[f"pain_freq_{pain_type}"] for pain_type in PAIN_TYPES]
+        for frequency in frequencies:
+            if frequency is not None and frequency not in PAIN_FREQUENCIES:
+                raise ValueError(f"unknown pain frequency {frequency!r}")
+        self.pain_frequency = array("b", (MISSING_BYTE if frequency is None else PAIN_FREQUENCIES.index(frequency)
+                                          for frequency in frequencies))
+
+    @classmethod
+    def from_dict(cls, data):
+        values = {param: data.get(param) for param in cls.SCALARS}
+        characteristics = data.get("pain_characteristics") or {}
+        for pain_type in PAIN_TYPES:
+            values[f"pain_intensity_{pain_type}"] = characteristics.get(pain_type, {}).get("intensity")
+            values[f"pain_freq_{pain_type}"] = characteristics.get(pain_type, {}).get("frequency")
+        return cls(**values)
+
+    def filename(self):
+        return f"patient_info_{self.patient_id}.json"
+
+    @classmethod
+    def dict_from_parts(cls, arrays, scalars):
+        pain_intensity, pain_frequency = arrays
+        data = dict(zip(cls.SCALARS[:-2], scalars))
+        data["pain_characteristics"] = {
+            pain_type: {
+                "intensity": _from_byte(intensity),
+                "frequency": None if frequency == MISSING_BYTE else PAIN_FREQUENCIES[frequency],
+            }
+            for pain_type, intensity, frequency in zip(PAIN_TYPES, pain_intensity, pain_frequency)
+        }
+        data["consent"], data["privacy_agreement"] = scalars[-2:]
+        return data
+
+
+class SoapNote(Record):
+    RECORD_TYPE = "soap_notes"
+    TYPE_CODE = 2
+    PARAMS = [
+        "patient_id", "visit_date", "chief_complaint", "pain_location", "pain_characteristics", "pain_level",
+        "pain_frequency", "aggravating_factors", "relieving_factors", "affected_activities",
+        "associated_symptoms",
+        "vital_signs", "blood_pressure", "heart_rate", "respiratory_rate",
+        "temperature", "height_ft", "height_in", "weight_lbs",
+    ] + ROM_FIELDS + [
+        "ortho_straight_leg_raise", "ortho_kernig_sign", "ortho_brudzinski_sign",
+        "ortho_spurling_test", "ortho_valsalva_maneuver",
+        "neuro_deep_tendon_reflexes", "neuro_muscle_strength", "neuro_sensation",
+        "palpation",
+        "diagnosis", "differential_diagnosis", "prognosis",
+        "treatment_provided", "treatment_frequency", "treatment_duration",
+        "home_care_instructions", "follow_up", "referrals",
+    ]
+    SCALARS = [param for param in PARAMS if param not in ROM_FIELDS]
+    ARRAYS = [("rom", "d", len(ROM_FIELDS))]
+    __slots__ = SCALARS + ["rom"]
+
+    def _assign(self, values):
+        for slot in self.SCALARS:
+            setattr(self, slot, values[slot])
+        self.visit_date, self.follow_up = _iso(self.visit_date), _iso(self.follow_up)
+        self.rom = array("d", (math.nan if values[field] is None else values[field] for field in ROM_FIELDS))
+
+    def filename(self):
+        return f"soap_notes_{self.patient_id}_{self.visit_date.replace('-', '')[2:]}.json"
+
+    def rom_value(self, field):
+        return _number(self.rom[ROM_FIELDS.index(field)])
+
+    @classmethod
+    def dict_from_parts(cls, arrays, scalars):
+        # Same key order as the saved documents: the ROM block sits between weight_lbs and the ortho tests
+        position = cls.PARAMS.index(ROM_FIELDS[0])
+        return dict(zip(cls.PARAMS, scalars[:position] + [_number(value) for value in arrays[0]] + scalars[position:]))
+
+
+class TreatmentPlan(Record):
+    RECORD_TYPE = "treatment_plans"
+    TYPE_CODE = 3
+    PARAMS = [
+        "patient_name", "patient_id", "diagnosis",
+        "plan_start_date", "plan_duration",
+        "initial_phase", "maintenance_phase",
+        "treatment_modalities",
+        "chiro_techniques",
+        "treatment_areas",
+        "exercises", "exercise_frequency",
+        "home_care",
+        "short_term_goals", "long_term_goals",
+        "outcome_measures",
+        "precautions",
+        "lifestyle_changes",
+        "referrals",
+        "reevaluation_frequency",
+        "informed_consent",
+    ]
+    SCALARS = PARAMS
+    __slots__ = PARAMS
+
+    def _assign(self, values):
+        for slot in self.SCALARS:
+            setattr(self, slot, values[slot])
+        self.plan_start_date = _iso(self.plan_start_date)
+
+    def filename(self):
+        return f"treatment_plan_{self.patient_id}_{self.plan_start_date.replace('-', '')}.json"
+
+    @classmethod
+    def dict_from_parts(cls, arrays, scalars):
+        return dict(zip(cls.SCALARS, scalars))
+
+
+RECORD_TYPES = {cls.RECORD_TYPE: cls for cls in RECORD_CLASSES.values()}
+
+
+def from_dict(record_type, data):
+    return RECORD_TYPES[record_type].from_dict(data)
+
+#=======================================================================================
+# Binary decoding
+#=======================================================================================
+
+def _split(data):
+    # -> (record class, arrays, scalar values) of one binary record
+    data = bytes(data)
+    if data[:2] != MAGIC or data[2] not in RECORD_CLASSES or data[3] != LAYOUT_VERSION:
+        raise ValueError("not a binary patient record")
+    cls = RECORD_CLASSES[data[2]]
+    arrays = []
+    offset = 4
+    for _, typecode, length in cls.ARRAYS:
+        values = array(typecode)
+        size = values.itemsize * length
+        values.frombytes(data[offset:offset + size])
+        arrays.append(values)
+        offset += size
+    scalars = json.loads(data[offset:])
+    if len(scalars) != len(cls.SCALARS):
+        raise ValueError(f"binary {cls.RECORD_TYPE} record has {len(scalars)} fields, expected {len(cls.SCALARS)}")
+    return cls, arrays, scalars
+
+
+def from_bytes(data):
+    cls, arrays, scalars = _split(data)
+    record = cls.__new__(cls)
+    for (slot, _, _), values in zip(cls.ARRAYS, arrays):
+        setattr(record, slot, values)
+    for slot, value in zip(cls.SCALARS, scalars):
+        setattr(record, slot, value)
+    return record
+
+
+def dict_from_bytes(data):
+    # Straight to the saved-document dict, without building the record object in between
+    cls, arrays, scalars = _split(data)
+    return cls.dict_from_parts(arrays, scalars)
@@ -0,0 +1,107 @@
+# save_queue.py
+# This script will handle the background save pipeline behind data_handler.submit_record. A save
+# from a page is put on a bounded queue and the Streamlit script thread carries on; a small pool
+# of writer threads drains the queues in batches and resolves a concurrent.futures.Future per save
+# that the page can poll.
+#
+# [Ordering and back-pressure]
+# Each writer thread owns one queue and saves are routed by key (the patient_id), so one
+# patient's saves are always written in the order they were submitted. When a queue is full
+# submit() blocks until there is room (up to SUBMIT_TIMEOUT seconds), so a disk that can't keep
+# up slows the pages down instead of growing memory without bound.
+#
+# flush() waits until everything submitted so far is written; data_handler calls it at exit.
+#
+#=======================================================================================
+
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+WORKERS = int(os.environ.get("BODYRES_SAVE_WORKERS", 2))
+QUEUE_SIZE = int(os.environ.get("BODYRES_SAVE_QUEUE_SIZE", 64))
+BATCH_SIZE = 32
+SUBMIT_TIMEOUT = float(os.environ.get("BODYRES_SAVE_TIMEOUT", 30))
+
+_STOP = object()
+
+
+class SaveQueue:
+    def __init__(self, write_batch, workers=WORKERS, queue_size=QUEUE_SIZE, batch_size=BATCH_SIZE):
+        # write_batch(items) writes a list of submitted items and returns one result per item
+        self._write_batch = write_batch
+        self._batch_size = batch_size
+        self._queues = [queue.Queue(maxsize=queue_size) for _ in range(max(1, workers))]
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def _start(self):
+        # Writer threads are started on the first submit
+        with self._lock:
+            if not self._threads:
+                for index, items in enumerate(self._queues):
+                    thread = threading.Thread(target=self._run, args=(items,), name=f"save-writer-{index}",
+                                              daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+
+    def submit(self, key, item, timeout=SUBMIT_TIMEOUT):
+        self._start()
+        future = Future()
+        try:
+            self._queues[hash(key) % len(self._queues)].put((item, future), timeout=timeout)
+        except queue.Full:
+            raise RuntimeError(f"saves are backing up: nothing could be queued for {timeout:.0f}s, "
+                               "check that the data directory is reachable") from None
+        return future
+
+    def _run(self, items):
+        while True:
+            batch = [items.get()]
+            while batch[-1] is not _STOP and len(batch) < self._batch_size:
+                try:
+                    batch.append(items.get_nowait())
+                except queue.Empty:
+                    break
+            stop = batch[-1] is _STOP
+            if stop:
+                batch.pop()
+            if batch:
+                self._write(batch)
+            for _ in range(len(batch) + stop):
+                items.task_done()
+            if stop:
+                return
+
+    def _write(self, batch):
+        batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            results = self._write_batch([item for item, _ in batch])
+        except Exception:
+            # Retry one by one so a single bad save doesn't fail the rest of the batch
+            for item, future in batch:
+                try:
+                    future.set_result(self._write_batch([item])[0])
+                except Exception as error:
+                    future.set_exception(error)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def flush(self):
+        # Block until every save submitted so far has been written (or has failed)
+        for items in self._queues:
+            items.join()
+
+    def close(self):
+        # Flush, then stop the writer threads; a later submit starts them again
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for items in self._queues:
+            if threads:
+                items.put(_STOP)
+        for thread in threads:
+            thread.join()
@@ -0,0 +1,97 @@
+# search_index.py
+# This script will handle full-text search over the free-text fields of SOAP notes. The index is
+# an SQLite FTS5 table (an inverted index) kept in the record store database and updated on every
+# save, so "all notes mentioning radiculopathy" is one ranked index lookup.
+#
+# [Query syntax]
+# radiculopathy          - notes containing the word (stemmed, so "radiculopathies" matches too)
+# radic*                 - prefix match
+# "lower back pain"      - exact phrase
+# Multiple terms must all match; results are ranked by BM25.
+#
+#=======================================================================================
+
+import re
+
+from utils.record_store import get_connection
+
+TEXT_FIELDS = [
+    "chief_complaint", "palpation", "diagnosis", "differential_diagnosis",
+    "neuro_deep_tendon_reflexes", "neuro_muscle_strength", "neuro_sensation",
+    "home_care_instructions",
+]
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS soap_search_docs (
+    doc_id INTEGER PRIMARY KEY,
+    patient_id TEXT NOT NULL,
+    visit_date TEXT NOT NULL,
+    UNIQUE (patient_id, visit_date)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS soap_search USING fts5(
+    {", ".join(TEXT_FIELDS)},
+    tokenize = 'porter unicode61',
+    prefix = '2 3 4'
+);
+"""
+
+_initialized = set()
+
+
+def _connection(data_dir):
+    conn = get_connection(data_dir)
+    if data_dir not in _initialized:
+        conn.executescript(SCHEMA)
+        _initialized.add(data_dir)
+    return conn
+
+
+def index_soap_notes(soap_notes, data_dir="./data"):
+    # Re-saving a note replaces its index entry, keyed by (patient_id, visit_date)
+    conn = _connection(data_dir)
+    insert = (f"INSERT INTO soap_search (rowid, {', '.join(TEXT_FIELDS)}) "
+              f"VALUES (?, {', '.join('?' * len(TEXT_FIELDS))})")
+    with conn:
+        for soap_data in soap_notes:
+            key = (soap_data["patient_id"], soap_data["visit_date"])
+            conn.execute("INSERT OR IGNORE INTO soap_search_docs (patient_id, visit_date) VALUES (?, ?)", key)
+            doc_id = conn.execute("SELECT doc_id FROM soap_search_docs WHERE patient_id = ? AND visit_date = ?",
+                                  key).fetchone()[0]
+            conn.execute("DELETE FROM soap_search WHERE rowid = ?", (doc_id,))
+            conn.execute(insert, [doc_id] + [soap_data.get(field) or "" for field in TEXT_FIELDS])
+
+
+_TERM = re.compile(r'"([^"]+)"|(\S+)')
+
+
+def build_match_query(text):
+    # Turn user input into a safe FTS5 expression: every term is quoted, a trailing * stays a prefix
+    terms = []
+    for phrase, word in _TERM.findall(text):
+        if phrase:
+            terms.append('"' + phrase.replace('"', "") + '"')
+            continue
+        prefix = word.endswith("*")
+        word = re.sub(r"[^\w]", " ", word).strip()
+        if word:
+            terms.append('"' + word + '"' + ("*" if prefix else ""))
+    return " AND ".join(terms)
+
+
+def search_soap_notes(text, limit=50, patient_id=None, data_dir="./data"):
+    match = build_match_query(text)
+    if not match:
+        return []
+    sql = ("SELECT docs.patient_id, docs.visit_date, "
+           "snippet(soap_search, -1, '**', '**', ' ... ', 12) AS snippet, bm25(soap_search) AS score "
+           "FROM soap_search JOIN soap_search_docs AS docs ON docs.doc_id = soap_search.rowid "
+           "WHERE soap_search MATCH ?")
+    params = [match]
+    if patient_id is not None:
+        sql += " AND docs.patient_id = ?"
+        params.append(patient_id)
+    sql += " ORDER BY score LIMIT ?"
+    params.append(limit)
+    rows = _connection(data_dir).execute(sql, params).fetchall()
+    return [{"patient_id": pid, "visit_date": visit_date, "snippet": snippet, "score": -score}
+            for pid, visit_date, snippet, score in rows]
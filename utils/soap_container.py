@@ -0,0 +1,248 @@
+# soap_container.py
+# This script will handle the per-patient SOAP note containers. Instead of one file per visit,
+# every note a patient gets is appended to a single data file, with a small side index of
+# where each visit date lives:
+#   soap_notes_<patient_id>.notes - [header][encoded record] entries, appended in save order
+#   soap_notes_<patient_id>.idx   - fixed-width (visit_date, offset, length) entries
+# Records are encoded with record_format (whatever BODYRES_RECORD_FORMAT selects). Re-saving a
+# visit appends a new copy; the last index entry for a date wins, and compact() drops the dead
+# copies once they outweigh the live ones.
+#
+# Reads map the data file with mmap and slice out only the requested visits, so "the last 10
+# visits" or "the note from one date" never touches the rest of the history. Each record header
+# repeats the visit date and length; if the index ever disagrees with the data file (a crash
+# between the two writes) it is rebuilt by scanning the data file, and the next append first cuts
+# off a record torn by a crash so it doesn't land behind it.
+#
+# Usage (move per-visit soap_notes_*_yymmdd.json files into containers):
+#   python -m utils.soap_container --data-dir ./data
+#
+#=======================================================================================
+
+import argparse
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+
+from utils import data_layout, record_format
+
+RECORD_HEADER = struct.Struct("<4s10sI")   # magic, visit_date (ISO), record length
+INDEX_ENTRY = struct.Struct("<10sQI")      # visit_date, offset of the record header, record length
+HEADER_MAGIC = b"SOAP"
+LEGACY_FILE = re.compile(r"soap_notes_(?P<patient_id>.+)_(?P<yymmdd>\d{6})\.json$")
+
+_lock = threading.Lock()
+
+
+def container_paths(patient_id, data_dir="./data", create=False):
+    base = data_layout.record_path(patient_id, f"soap_notes_{patient_id}", data_dir, create)
+    return base + ".notes", base + ".idx"
+
+
+def _read_index(index_path):
+    # {visit_date: (offset, length)}; a torn trailing entry (crash mid-append) is ignored
+    if not os.path.exists(index_path):
+        return {}
+    with open(index_path, "rb") as f:
+        data = f.read()
+    usable = len(data) - len(data) % INDEX_ENTRY.size
+    return {visit_date.decode("ascii"): (offset, length)
+            for visit_date, offset, length in INDEX_ENTRY.iter_unpack(data[:usable])}
+
+
+def _scan(mapped):
+    # Rebuild the index from the record headers in the data file
+    index = {}
+    offset = 0
+    while offset + RECORD_HEADER.size <= len(mapped):
+        magic, visit_date, length = RECORD_HEADER.unpack_from(mapped, offset)
+        if magic != HEADER_MAGIC or offset + RECORD_HEADER.size + length > len(mapped):
+            break  # torn final record
+        index[visit_date.decode("ascii")] = (offset, length)
+        offset += RECORD_HEADER.size + length
+    return index
+
+
+def _write_index(index_path, index):
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(b"".join(INDEX_ENTRY.pack(visit_date.encode("ascii"), offset, length)
+                         for visit_date, (offset, length) in sorted(index.items())))
+    os.replace(tmp_path, index_path)
+
+
+def _valid(mapped, index, dates):
+    for visit_date in dates:
+        offset, length = index[visit_date]
+        if offset + RECORD_HEADER.size + length > len(mapped):
+            return False
+        magic, header_date, header_length = RECORD_HEADER.unpack_from(mapped, offset)
+        if magic != HEADER_MAGIC or header_date.decode("ascii") != visit_date or header_length != length:
+            return False
+    return True
+
+#=======================================================================================
+# Writes
+#=======================================================================================
+
+def _end(index):
+    # Where the last record in the index ends; appends are in file order, so that is the data file's size
+    return max((offset + RECORD_HEADER.size + length for offset, length in index.values()), default=0)
+
+
+def _repair(data_path, index_path):
+    # A crash mid-append leaves a torn record or index entry at the end: cut the data file back to its
+    # last complete record and rebuild the index from the headers (caller holds _lock)
+    with open(data_path, "r+b") as f:
+        index = {}
+        if os.fstat(f.fileno()).st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                index = _scan(mapped)
+        f.truncate(_end(index))
+    _write_index(index_path, index)
+    return index
+
+
+def append_note(soap_data, data_dir="./data"):
+    visit_date = soap_data["visit_date"]
+    encoded = record_format.encode("soap_notes", soap_data)
+    data_path, index_path = container_paths(soap_data["patient_id"], data_dir, create=True)
+    with _lock:
+        index = _read_index(index_path)
+        index_size = os.path.getsize(index_path) if os.path.exists(index_path) else 0
+        if os.path.exists(data_path) and (os.path.getsize(data_path) != _end(index) or index_size % INDEX_ENTRY.size):
+            index = _repair(data_path, index_path)
+        with open(data_path, "ab") as f:
+            offset = f.tell()
+            f.write(RECORD_HEADER.pack(HEADER_MAGIC, visit_date.encode("ascii"), len(encoded)) + encoded)
+        with open(index_path, "ab") as f:
+            f.write(INDEX_ENTRY.pack(visit_date.encode("ascii"), offset, len(encoded)))
+        index[visit_date] = (offset, len(encoded))
+        live = sum(RECORD_HEADER.size + length for _, length in index.values())
+        if os.path.getsize(data_path) > 2 * live:
+            _compact(soap_data["patient_id"], data_dir)
+
+
+def _rewrite(patient_id, data_dir, reencode=None):
+    # Rewrite the container with only the latest copy of each visit, passing each encoded record
+    # through reencode(data) -> data when given (caller holds _lock)
+    data_path, index_path = container_paths(patient_id, data_dir)
+    index = {}
+    tmp_path = data_path + ".tmp"
+    with open(data_path, "rb") as source, open(tmp_path, "wb") as target:
+        with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            live = _read_index(index_path)
+            if not _valid(mapped, live, live):
+                live = _scan(mapped)
+            for visit_date, (offset, length) in sorted(live.items()):
+                data = mapped[offset + RECORD_HEADER.size:offset + RECORD_HEADER.size + length]
+                if reencode is not None:
+                    data = reencode(data)
+                index[visit_date] = (target.tell(), len(data))
+                target.write(RECORD_HEADER.pack(HEADER_MAGIC, visit_date.encode("ascii"), len(data)) + data)
+    # Data first: if we stop before the index is replaced, readers notice and rescan
+    os.replace(tmp_path, data_path)
+    _write_index(index_path, index)
+
+
+def _compact(patient_id, data_dir):
+    _rewrite(patient_id, data_dir)
+
+
+def compact(patient_id, data_dir="./data"):
+    with _lock:
+        _compact(patient_id, data_dir)
+
+
+def convert(patient_id, fmt, data_dir="./data"):
+    # Re-encode the notes of one container in fmt (record_format.convert does every container).
+    # Returns (notes converted, notes left as they were, bytes before, bytes after).
+    counts = [0, 0, 0, 0]
+
+    def reencode(data):
+        if record_format.detect_format(data) == fmt:
+            return data
+        encoded = record_format.encode("soap_notes", record_format.decode(data), fmt)
+        if record_format.detect_format(encoded) != fmt:
+            counts[1] += 1
+            return data
+        counts[0] += 1
+        counts[2] += len(data)
+        counts[3] += len(encoded)
+        return encoded
+
+    with _lock:
+        data_path = container_paths(patient_id, data_dir)[0]
+        if os.path.exists(data_path) and os.path.getsize(data_path):
+            _rewrite(patient_id, data_dir, reencode)
+    return tuple(counts)
+
+#=======================================================================================
+# Reads
+#=======================================================================================
+
+def container_patient_ids(data_dir="./data"):
+    return sorted(os.path.basename(path)[len("soap_notes_"):-len(".notes")]
+                  for path in data_layout.glob_records("soap_notes_*.notes", data_dir))
+
+
+def visit_dates(patient_id, data_dir="./data"):
+    return sorted(_read_index(container_paths(patient_id, data_dir)[1]))
+
+
+def read_notes(patient_id, dates=None, data_dir="./data"):
+    # {visit_date: note} for the requested dates (all when None); dates without a note are skipped
+    data_path, index_path = container_paths(patient_id, data_dir)
+    if not os.path.exists(data_path) or os.path.getsize(data_path) == 0:
+        return {}
+    with open(data_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        index = _read_index(index_path)
+        wanted = sorted(index) if dates is None else sorted(set(dates) & index.keys())
+        # Only the headers of the requested visits are checked against the index
+        if not _valid(mapped, index, wanted):
+            index = _scan(mapped)
+            wanted = sorted(index) if dates is None else sorted(set(dates) & index.keys())
+            with _lock:
+                # Unless a compaction replaced the file after we mapped it, persist the repaired index
+                if os.fstat(f.fileno()).st_ino == os.stat(data_path).st_ino:
+                    _write_index(index_path, index)
+        notes = {}
+        for visit_date in wanted:
+            offset, length = index[visit_date]
+            start = offset + RECORD_HEADER.size
+            notes[visit_date] = record_format.decode(mapped[start:start + length])
+        return notes
+
+#=======================================================================================
+# Packing per-visit files
+#=======================================================================================
+
+def pack_legacy_files(data_dir="./data", progress=print):
+    # Append every soap_notes_<patient_id>_<yymmdd>.json file to its patient's container, then remove it
+    packed = 0
+    for path in data_layout.glob_records("soap_notes_*_" + "[0-9]" * 6 + ".json", data_dir):
+        if not LEGACY_FILE.match(os.path.basename(path)):
+            continue
+        note = record_format.read_record(path)
+        existing = read_notes(note["patient_id"], [note["visit_date"]], data_dir)
+        if note["visit_date"] not in existing:
+            append_note(note, data_dir)
+        os.remove(path)
+        packed += 1
+    progress(f"Packed {packed} SOAP note files into per-patient containers")
+    return packed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Move per-visit SOAP note files into per-patient containers.")
+    parser.add_argument("--data-dir", default="./data", help="directory holding the record files")
+    args = parser.parse_args(argv)
+    pack_legacy_files(args.data_dir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
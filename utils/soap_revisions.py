@@ -0,0 +1,161 @@
+# soap_revisions.py
+# This script will handle the revision history of SOAP notes. The patient's container
+# (soap_container) only serves the latest version of each visit; every saved version is also
+# appended to soap_notes_<patient_id>.revs as one compact JSON line holding a delta against the
+# version before it:
+#   {"visit_date", "revision", "saved", "hash", "set": {changed fields}, "unset": [removed fields]}
+# Revision 1 sets every field. A note saved before revisions existed becomes revision 1 (marked
+# "baseline") the first time it is amended, so amending it never loses the original.
+#
+# Each line carries the SHA-256 content hash of the full version it produces (record_hash), so
+# the trail can be checked, and data_handler skips saves whose hash matches what is stored.
+#
+# Usage (print the history of one visit):
+#   python -m utils.soap_revisions --patient-id 123 --visit-date 2024-07-31 --data-dir ./data
+#
+#=======================================================================================
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+from datetime import datetime
+
+from utils import data_layout
+
+_lock = threading.Lock()
+_indexes = {}   # revisions path -> (file size, {visit_date: (latest revision, hash)})
+
+
+def record_hash(record):
+    # Content hash of a record: key order and whitespace don't matter, values do
+    return hashlib.sha256(json.dumps(record, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+def revisions_path(patient_id, data_dir="./data", create=False):
+    return data_layout.record_path(patient_id, f"soap_notes_{patient_id}.revs", data_dir, create)
+
+
+def diff(old, new):
+    # The delta that turns old into new (old may be None)
+    old = old or {}
+    return {"set": {key: value for key, value in new.items() if key not in old or old[key] != value},
+            "unset": [key for key in old if key not in new]}
+
+
+def apply_delta(record, entry):
+    record = {key: value for key, value in (record or {}).items() if key not in entry["unset"]}
+    record.update(entry["set"])
+    return record
+
+
+def _entries(path):
+    # Every complete line of a revisions file, oldest first; a torn final line is ignored
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break
+            yield json.loads(line)
+
+
+def _revision_index(path):
+    # {visit_date: (latest revision, hash)}, rebuilt whenever the file has grown since it was read
+    size = os.path.getsize(path) if os.path.exists(path) else 0
+    cached = _indexes.get(path)
+    if cached is None or cached[0] != size:
+        index = {}
+        for entry in _entries(path):
+            index[entry["visit_date"]] = (entry["revision"], entry["hash"])
+        cached = _indexes[path] = (size, index)
+    return cached[1]
+
+
+def _version(path, visit_date, revision=None):
+    # Rebuild one version (the latest when revision is None) by replaying the visit's deltas
+    record = None
+    for entry in _entries(path):
+        if entry["visit_date"] == visit_date:
+            record = apply_delta(record, entry)
+            if entry["revision"] == revision:
+                break
+    return record
+
+#=======================================================================================
+# Writes
+#=======================================================================================
+
+def _append(path, index, visit_date, revision, content_hash, delta, **extra):
+    entry = dict({"visit_date": visit_date, "revision": revision, "saved": datetime.now().isoformat(timespec="seconds"),
+                  "hash": content_hash}, **delta, **extra)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+    index[visit_date] = (revision, content_hash)
+    _indexes[path] = (os.path.getsize(path), index)
+
+
+def record_revision(note, current, data_dir="./data"):
+    # Append note as the next revision of its visit; current is the version stored before this save
+    # (None for a new visit). Returns the revision number. Re-recording the latest version (e.g. a
+    # replayed write-log entry) appends nothing.
+    path = revisions_path(note["patient_id"], data_dir, create=True)
+    visit_date = note["visit_date"]
+    note_hash = record_hash(note)
+    with _lock:
+        index = _revision_index(path)
+        latest = index.get(visit_date)
+        if latest is not None and latest[1] == note_hash:
+            return latest[0]
+        if latest is None:
+            revision, base = 0, None
+            if current is not None:
+                # Saved before revisions were kept: record it first so the original isn't lost
+                revision, base = 1, current
+                _append(path, index, visit_date, revision, record_hash(current), diff(None, current), baseline=True)
+        else:
+            revision = latest[0]
+            # Normally the stored note is the latest revision; after a crash between the revision and
+            # the container write it isn't, so the delta base is rebuilt from the revisions themselves
+            base = current if current is not None and record_hash(current) == latest[1] else _version(path, visit_date)
+        _append(path, index, visit_date, revision + 1, note_hash, diff(base, note))
+        return revision + 1
+
+#=======================================================================================
+# Reads
+#=======================================================================================
+
+def note_history(patient_id, visit_date, data_dir="./data"):
+    # Every version of one visit's note, oldest first: [{"revision", "saved", "hash", "changed", "record"}]
+    history = []
+    record = None
+    for entry in _entries(revisions_path(patient_id, data_dir)):
+        if entry["visit_date"] != visit_date:
+            continue
+        record = apply_delta(record, entry)
+        history.append({"revision": entry["revision"], "saved": entry["saved"], "hash": entry["hash"],
+                        "changed": sorted(entry["set"]) + sorted(entry["unset"]), "record": record})
+    return history
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Print the revision history of one SOAP note.")
+    parser.add_argument("--patient-id", required=True)
+    parser.add_argument("--visit-date", required=True, help="YYYY-MM-DD")
+    parser.add_argument("--data-dir", default="./data", help="directory holding the record files")
+    args = parser.parse_args(argv)
+    history = note_history(args.patient_id, args.visit_date, args.data_dir)
+    if not history:
+        print(f"No revisions recorded for {args.patient_id} on {args.visit_date}")
+    for version in history:
+        intact = record_hash(version["record"]) == version["hash"]
+        changed = ", ".join(version["changed"]) if version["revision"] > 1 else "(first version)"
+        print(f"r{version['revision']}  {version['saved']}  {version['hash'][:12]}"
+              f"{'' if intact else '  HASH MISMATCH'}  {changed}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
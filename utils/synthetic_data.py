@@ -0,0 +1,241 @@
+# synthetic_data.py
+# This script will handle generating synthetic (fake but realistic) patient data for demos and
+# load testing. Visits for every patient are generated in one vectorized NumPy pass as
+# (patients x visits) arrays, so millions of visit rows take seconds. The result can be turned
+# into nivo heatmap payloads for the dashboard or into data_handler-compatible JSON records.
+#
+# Usage:
+#   python -m utils.synthetic_data --patients 1000 --visits 104 --out ./loadtest_data
+#
+#=======================================================================================
+
+import argparse
+import json
+import os
+
+import numpy as np
+
+PAIN_TYPES = ["Sharp", "Shooting", "Aching", "Burning", "Tingling", "Numbness"]
+
+# Typical healthy range of motion (degrees) per measurement; patients start below it and recover
+ROM_NORMALS = {
+    "cervical_spine_flexion": 50, "cervical_spine_extension": 60,
+    "thoracic_spine_flexion": 45, "thoracic_spine_extension": 25,
+    "lumbar_spine_flexion": 60, "lumbar_spine_extension": 25,
+    "shoulders_flexion": 180, "shoulders_extension": 50,
+    "hips_flexion": 120, "hips_extension": 30,
+}
+
+# (start, change per visit, noise) for each pain type's intensity, matching the dashboard demo:
+# burning and tingling ease off, aching slowly builds, the rest fluctuate around a level
+PAIN_TRENDS = {
+    "Sharp": (5, 0.0, 1.0), "Shooting": (4, 0.0, 1.0), "Aching": (3, 0.15, 0.5),
+    "Burning": (8, -0.2, 0.5), "Tingling": (9, -0.25, 0.5), "Numbness": (3, 0.0, 1.0),
+}
+
+DIAGNOSES = ["Lumbar radiculopathy", "Cervical strain", "Thoracic outlet syndrome",
+             "Sacroiliac joint dysfunction", "Rotator cuff tendinopathy", "Hip osteoarthritis"]
+PAIN_LOCATIONS = ["Neck", "Upper Back", "Middle Back", "Lower Back", "Shoulders", "Hips"]
+TREATMENTS = ["Spinal Manipulation", "Soft Tissue Therapy", "Electrical Stimulation",
+              "Ultrasound", "Exercise Prescription", "Hot/Cold Therapy"]
+MODALITIES = ["Spinal Manipulation", "Soft Tissue Therapy", "Electrical Stimulation", "Ultrasound",
+              "Mechanical Traction", "Therapeutic Exercises", "Kinesio Taping", "Dry Needling"]
+PROGNOSES = ["Poor", "Fair", "Good", "Very Good", "Excellent"]
+
+
+def generate_visits(num_patients=1, num_visits=30, start_date="2024-01-01", seed=None):
+    # Returns a dict of flat, equal-length arrays (one entry per visit, patient-major order)
+    rng = np.random.default_rng(seed)
+    shape = (num_patients, num_visits)
+    visit_index = np.broadcast_to(np.arange(num_visits), shape)
+
+    # Weekly visits starting somewhere in the first year, each a day or two either side of schedule
+    first_visit = np.datetime64(start_date, "D") + rng.integers(0, 365, size=(num_patients, 1))
+    visit_dates = first_visit + visit_index * 7 + rng.integers(-1, 2, size=shape)
+    visit_dates[:, 0] = first_visit[:, 0]
+
+    recovery_rate = rng.uniform(0.02, 0.12, size=(num_patients, 1))
+    initial_pain = rng.uniform(5, 9, size=(num_patients, 1))
+    pain_level = np.clip(np.rint(initial_pain * np.exp(-recovery_rate * visit_index)
+                                 + rng.normal(0, 0.7, size=shape)), 0, 10)
+
+    columns = {
+        "patient": np.broadcast_to(np.arange(num_patients)[:, None], shape).ravel(),
+        "visit_index": visit_index.ravel(),
+        "visit_date": visit_dates.ravel(),
+        "pain_level": pain_level.ravel().astype(np.int64),
+    }
+    for pain_type, (start, slope, noise) in PAIN_TRENDS.items():
+        intensity = start + slope * visit_index + rng.uniform(-noise, noise, size=shape)
+        columns[f"{pain_type.lower()}_intensity"] = np.clip(intensity, 1, 10).ravel()
+
+    initial_fraction = rng.uniform(0.4, 0.8, size=(num_patients, 1))
+    recovered = 1 - (1 - initial_fraction) * np.exp(-recovery_rate * visit_index)
+    for column, normal in ROM_NORMALS.items():
+        rom = normal * recovered + rng.normal(0, normal * 0.03, size=shape)
+        columns[column] = np.clip(np.rint(rom), 0, 180).astype(np.int64).ravel()
+
+    columns["heart_rate"] = np.rint(rng.normal(72, 8, size=shape)).astype(np.int64).ravel()
+    columns["respiratory_rate"] = np.rint(rng.normal(16, 2, size=shape)).astype(np.int64).ravel()
+    columns["temperature"] = np.round(rng.normal(36.8, 0.3, size=shape), 1).ravel()
+    return columns
+
+#=======================================================================================
+# Nivo payloads
+#=======================================================================================
+
+def heatmap_payload(visits, patient=0):
+    # One nivo HeatMap series per pain type, one cell per visit
+    rows = np.flatnonzero(visits["patient"] == patient)
+    dates = np.datetime_as_string(visits["visit_date"][rows]).tolist()
+    return [
+        {"id": pain_type,
+         "data": [{"x": x, "y": y} for x, y in zip(dates, visits[f"{pain_type.lower()}_intensity"][rows].tolist())]}
+        for pain_type in PAIN_TYPES
+    ]
+
+#=======================================================================================
+# data_handler-compatible records
+#=======================================================================================
+
+def patient_id_for(patient):
+    return f"SYN{patient:06d}"
+
+
+def soap_records(visits, seed=None):
+    # Yield SOAP note dicts with the same keys save_soap_info writes
+    rng = np.random.default_rng(seed)
+    n = len(visits["patient"])
+    locations = rng.choice(PAIN_LOCATIONS, size=n)
+    treatments = rng.choice(TREATMENTS, size=(n, 2))
+    prognoses = np.array(PROGNOSES)[np.clip(5 - visits["pain_level"] // 2, 0, 4)]
+    dates = np.datetime_as_string(visits["visit_date"]).tolist()
+    follow_ups = np.datetime_as_string(visits["visit_date"] + 7).tolist()
+    intensities = np.stack([visits[f"{pain_type.lower()}_intensity"] for pain_type in PAIN_TYPES], axis=1)
+    columns = {key: visits[key].tolist() for key in
+               ["patient", "pain_level", "heart_rate", "respiratory_rate", "temperature", *ROM_NORMALS]}
+
+    for i in range(n):
+        record = {
+            "patient_id": patient_id_for(columns["patient"][i]),
+            "visit_date": dates[i],
+            "chief_complaint": f"{locations[i]} pain",
+            "pain_location": [str(locations[i])],
+            "pain_characteristics": [pain_type for pain_type, intensity in zip(PAIN_TYPES, intensities[i])
+                                     if intensity >= 5],
+            "pain_level": columns["pain_level"][i],
+            "pain_frequency": "Intermittent",
+            "aggravating_factors": ["Sitting"],
+            "relieving_factors": ["Stretching"],
+            "affected_activities": ["Work"],
+            "associated_symptoms": ["Stiffness"],
+            "vital_signs": True,
+            "blood_pressure": "120/80",
+            "heart_rate": columns["heart_rate"][i],
+            "respiratory_rate": columns["respiratory_rate"][i],
+            "temperature": columns["temperature"][i],
+            "height_ft": 5,
+            "height_in": 8,
+            "weight_lbs": 165,
+        }
+        for column in ROM_NORMALS:
+            record[column] = columns[column][i]
+        record.update({
+            "ortho_straight_leg_raise": "Negative",
+            "ortho_kernig_sign": "Negative",
+            "ortho_brudzinski_sign": "Not Performed",
+            "ortho_spurling_test": "Negative",
+            "ortho_valsalva_maneuver": "Negative",
+            "neuro_deep_tendon_reflexes": "2+ and symmetric",
+            "neuro_muscle_strength": "5/5 throughout",
+            "neuro_sensation": "Intact to light touch",
+            "palpation": f"Hypertonicity and tenderness, {locations[i].lower()}",
+            "diagnosis": DIAGNOSES[columns["patient"][i] % len(DIAGNOSES)],
+            "differential_diagnosis": "Mechanical pain",
+            "prognosis": str(prognoses[i]),
+            "treatment_provided": sorted(set(treatments[i].tolist())),
+            "treatment_frequency": "1x per week",
+            "treatment_duration": "Ongoing",
+            "home_care_instructions": "Daily stretching and ice after activity",
+            "follow_up": follow_ups[i],
+            "referrals": ["None"],
+        })
+        yield record
+
+
+def patient_records(visits, seed=None):
+    # Yield (patient_info, treatment_plan) dict pairs for every synthetic patient
+    rng = np.random.default_rng(seed)
+    first_rows = np.flatnonzero(visits["visit_index"] == 0)
+    for row in first_rows.tolist():
+        patient = int(visits["patient"][row])
+        patient_id = patient_id_for(patient)
+        first_visit = str(visits["visit_date"][row])
+        intensities = {pain_type.lower(): {"intensity": int(round(visits[f"{pain_type.lower()}_intensity"][row])),
+                                           "frequency": str(rng.choice(["Constant", "Intermittent", "Occasional"]))}
+                       for pain_type in PAIN_TYPES}
+        patient_info = {
+            "patient_name": f"Synthetic Patient {patient}", "patient_id": patient_id,
+            "dob": str(np.datetime64(first_visit) - int(rng.integers(18 * 365, 80 * 365))),
+            "gender": str(rng.choice(["Male", "Female", "Other"])),
+            "contact_number": "555 000 0000", "email": f"{patient_id.lower()}@example.com",
+            "visit_date": first_visit, "visit_time": "09:00:00", "occupation": "Office worker",
+            "height_ft": 5.0, "height_in": 8.0, "weight_lbs": 165.0,
+            "emergency_name": "Emergency Contact", "emergency_relation": "Spouse",
+            "emergency_number": "555 000 0001", "medical_history": "", "current_medications": "",
+            "allergies": "", "exercise_frequency": "1-2 times/week", "exercise_types": ["Walking"],
+            "sleep_hours": int(rng.integers(5, 10)), "stress_level": int(rng.integers(0, 11)),
+            "previous_chiro": "No", "primary_complaint": DIAGNOSES[patient % len(DIAGNOSES)],
+            "pain_onset": first_visit, "pain_cause": "", "pain_characteristics": intensities,
+            "consent": True, "privacy_agreement": True,
+        }
+        treatment_plan = {
+            "patient_name": patient_info["patient_name"], "patient_id": patient_id,
+            "diagnosis": DIAGNOSES[patient % len(DIAGNOSES)], "plan_start_date": first_visit,
+            "plan_duration": "3 months", "initial_phase": "2x per week", "maintenance_phase": "1x per week",
+            "treatment_modalities": sorted(set(rng.choice(MODALITIES, size=3).tolist())),
+            "chiro_techniques": ["Diversified Technique"], "treatment_areas": ["Lumbar Spine"],
+            "exercises": ["Stretching", "Core Stability"], "exercise_frequency": "Daily",
+            "home_care": "Daily stretching", "short_term_goals": "Reduce pain",
+            "long_term_goals": "Return to full activity", "outcome_measures": ["Pain Scale (VAS)"],
+            "precautions": "", "lifestyle_changes": ["Ergonomic Adjustments"], "referrals": ["None"],
+            "reevaluation_frequency": "Every 4 weeks", "informed_consent": True,
+        }
+        yield patient_info, treatment_plan
+
+
+def write_records(visits, out_dir, seed=None):
+    # Write the dataset using data_handler's file naming so it can be bulk imported
+    os.makedirs(out_dir, exist_ok=True)
+    count = 0
+    for patient_info, treatment_plan in patient_records(visits, seed):
+        with open(os.path.join(out_dir, f"patient_info_{patient_info['patient_id']}.json"), "w") as f:
+            json.dump(patient_info, f)
+        plan_date = treatment_plan["plan_start_date"].replace("-", "")
+        with open(os.path.join(out_dir, f"treatment_plan_{treatment_plan['patient_id']}_{plan_date}.json"), "w") as f:
+            json.dump(treatment_plan, f)
+        count += 2
+    for record in soap_records(visits, seed):
+        visit_date = record["visit_date"].replace("-", "")[2:]
+        with open(os.path.join(out_dir, f"soap_notes_{record['patient_id']}_{visit_date}.json"), "w") as f:
+            json.dump(record, f)
+        count += 1
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic patient dataset for load testing.")
+    parser.add_argument("--patients", type=int, default=100)
+    parser.add_argument("--visits", type=int, default=52, help="weekly visits per patient")
+    parser.add_argument("--start-date", default="2024-01-01")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--out", default="./loadtest_data", help="directory to write JSON records to")
+    args = parser.parse_args(argv)
+
+    visits = generate_visits(args.patients, args.visits, args.start_date, args.seed)
+    count = write_records(visits, args.out, args.seed)
+    print(f"Wrote {count} records for {args.patients} patients to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
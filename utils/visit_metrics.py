@@ -0,0 +1,77 @@
+# visit_metrics.py
+# This script will handle the visit metrics table: a narrow, numeric copy of every SOAP note
+# holding only the columns the dashboards chart (pain level, range of motion and vitals).
+# It is updated whenever data_handler saves a SOAP note, so the progress tracker and the
+# patient summary can load a patient's whole history with one query into pandas instead of
+# re-parsing every SOAP JSON document.
+#
+#=======================================================================================
+
+from utils.record_store import get_connection
+
+ROM_COLUMNS = [
+    "cervical_spine_flexion", "cervical_spine_extension",
+    "thoracic_spine_flexion", "thoracic_spine_extension",
+    "lumbar_spine_flexion", "lumbar_spine_extension",
+    "shoulders_flexion", "shoulders_extension",
+    "hips_flexion", "hips_extension",
+]
+VITAL_COLUMNS = ["heart_rate", "respiratory_rate", "temperature"]
+METRIC_COLUMNS = ["pain_level"] + ROM_COLUMNS + VITAL_COLUMNS
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS visit_metrics ("
+    "patient_id TEXT NOT NULL, visit_date TEXT NOT NULL, "
+    + ", ".join(f"{column} REAL" for column in METRIC_COLUMNS)
+    + ", PRIMARY KEY (patient_id, visit_date))"
+)
+UPSERT = (
+    f"INSERT OR REPLACE INTO visit_metrics (patient_id, visit_date, {', '.join(METRIC_COLUMNS)}) "
+    f"VALUES ({', '.join('?' * (len(METRIC_COLUMNS) + 2))})"
+)
+
+
+def _connection(data_dir):
+    conn = get_connection(data_dir)
+    conn.execute(SCHEMA)
+    return conn
+
+
+def _metrics_row(soap_data):
+    # Vitals are only present when "Record Vital Signs" was ticked
+    vitals_recorded = soap_data.get("vital_signs", True)
+    row = [soap_data["patient_id"], soap_data["visit_date"]]
+    for column in METRIC_COLUMNS:
+        if column in VITAL_COLUMNS and not vitals_recorded:
+            row.append(None)
+        else:
+            row.append(soap_data.get(column))
+    return row
+
+
+def update_visit_metrics(soap_notes, data_dir="./data"):
+    conn = _connection(data_dir)
+    with conn:
+        conn.executemany(UPSERT, (_metrics_row(soap_data) for soap_data in soap_notes))
+
+
+def metric_rows(patient_id, columns, data_dir="./data"):
+    # Plain (visit_date, *columns) tuples for callers that don't want pandas
+    conn = _connection(data_dir)
+    return conn.execute(f"SELECT visit_date, {', '.join(columns)} FROM visit_metrics "
+                        f"WHERE patient_id = ? ORDER BY visit_date", (patient_id,)).fetchall()
+
+
+def load_visit_metrics(patient_id=None, data_dir="./data"):
+    # One vectorized read; visit_date comes back as a datetime column sorted oldest -> newest
+    import pandas as pd
+
+    sql = "SELECT * FROM visit_metrics"
+    params = ()
+    if patient_id is not None:
+        sql += " WHERE patient_id = ?"
+        params = (patient_id,)
+    sql += " ORDER BY patient_id, visit_date"
+    metrics = pd.read_sql_query(sql, _connection(data_dir), params=params)
+    metrics["visit_date"] = pd.to_datetime(metrics["visit_date"])
+    return metrics
@@ -0,0 +1,174 @@
+# write_log.py
+# This script will handle the append-only write-ahead log used by data_handler. Every save is
+# first appended to the log as one compact JSON line, then materialized into the record files
+# and the record store. fsync is batched (every FSYNC_BATCH_SIZE records, and at exit), so a burst
+# of saves costs one sequential append each; a timer syncs whatever is still pending FSYNC_INTERVAL
+# seconds after the first unsynced append, so a lone save is on disk within that time too.
+#
+# If the process dies part way through a save, the log still holds the record and
+# replay() hands it back so data_handler can finish the write on the next start. A torn
+# final line (crash mid-append) is ignored. Compaction first rotates the log (renames it to
+# write_log.jsonl.compacting, so new appends start a fresh log and saves are never held up),
+# then replays the rotated entries, keeping only the latest one per file, and deletes it. A
+# rotated log left behind by a crash is replayed ahead of the live one by the next compaction.
+#
+#=======================================================================================
+
+import atexit
+import json
+import os
+import threading
+import time
+
+LOG_FILENAME = "write_log.jsonl"
+ROTATED_SUFFIX = ".compacting"
+FSYNC_BATCH_SIZE = 32
+FSYNC_INTERVAL = 1.0
+COMPACT_BYTES = 4 * 1024 * 1024
+
+_lock = threading.Lock()
+_log_files = {}
+_pending = {}
+_last_sync = {}
+_timers = {}
+
+
+def log_path(data_dir="./data"):
+    return os.path.join(data_dir, LOG_FILENAME)
+
+
+def _log_file(data_dir):
+    path = log_path(data_dir)
+    f = _log_files.get(path)
+    if f is None:
+        os.makedirs(data_dir, exist_ok=True)
+        f = open(path, "a", encoding="utf-8")
+        _log_files[path] = f
+        _pending[path] = 0
+        _last_sync[path] = time.monotonic()
+    return path, f
+
+
+def _sync(path):
+    f = _log_files[path]
+    f.flush()
+    os.fsync(f.fileno())
+    _pending[path] = 0
+    _last_sync[path] = time.monotonic()
+
+
+def append(record_type, filename, record, data_dir="./data"):
+    entry = json.dumps({"type": record_type, "file": filename, "record": record}, separators=(",", ":"))
+    with _lock:
+        path, f = _log_file(data_dir)
+        f.write(entry + "\n")
+        _pending[path] += 1
+        if (_pending[path] >= FSYNC_BATCH_SIZE
+                or time.monotonic() - _last_sync[path] >= FSYNC_INTERVAL):
+            _sync(path)
+        elif path not in _timers:
+            timer = _timers[path] = threading.Timer(FSYNC_INTERVAL, _timed_sync, args=(path,))
+            timer.daemon = True
+            timer.start()
+        return f.tell()
+
+
+def _timed_sync(path):
+    with _lock:
+        _timers.pop(path, None)
+        # A rotated (or closed) log was synced when it was moved aside
+        if path in _log_files and _pending[path]:
+            _sync(path)
+
+
+def sync(data_dir=None):
+    # Force any batched appends to disk (all logs when data_dir is None)
+    with _lock:
+        paths = [log_path(data_dir)] if data_dir is not None else list(_log_files)
+        for path in paths:
+            if path in _log_files and _pending[path]:
+                _sync(path)
+
+
+def _entries(path):
+    # (record_type, filename, record) for every complete entry of one log file, oldest first
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break  # torn write from a crash mid-append
+            entry = json.loads(line)
+            yield entry["type"], entry["file"], entry["record"]
+
+
+def replay(data_dir="./data"):
+    # Yield (record_type, filename, record) for every complete entry, oldest first
+    path = log_path(data_dir)
+    yield from _entries(path + ROTATED_SUFFIX)
+    yield from _entries(path)
+
+
+def needs_compaction(log_size):
+    return log_size >= COMPACT_BYTES
+
+
+def _complete_size(path):
+    # Size of the file up to and including its last newline (drops a torn final line)
+    with open(path, "rb") as f:
+        data = f.read()
+    return data.rfind(b"\n") + 1
+
+
+def rotate(data_dir="./data"):
+    # Move the live log aside so the next append starts a fresh one; returns the rotated log's path.
+    # A rotated log an earlier compaction didn't finish keeps its entries, ahead of the live ones.
+    with _lock:
+        path = log_path(data_dir)
+        f = _log_files.pop(path, None)
+        if f is not None:
+            f.flush()
+            os.fsync(f.fileno())
+            f.close()
+        rotated = path + ROTATED_SUFFIX
+        if os.path.exists(path):
+            if os.path.exists(rotated):
+                with open(rotated, "r+b") as target, open(path, "rb") as source:
+                    target.truncate(_complete_size(rotated))
+                    target.seek(0, os.SEEK_END)
+                    target.write(source.read())
+                    target.flush()
+                    os.fsync(target.fileno())
+                os.remove(path)
+            else:
+                os.replace(path, rotated)
+        return rotated
+
+
+def compact(apply, data_dir="./data", rotated=None):
+    # Re-apply the newest entry for each file in the rotated log (rotating first unless the caller
+    # already did), then delete it. Appends carry on into the live log meanwhile.
+    if rotated is None:
+        rotated = rotate(data_dir)
+    latest = {}
+    for record_type, filename, record in _entries(rotated):
+        latest[filename] = (record_type, record)
+    for filename, (record_type, record) in latest.items():
+        apply(record_type, filename, record)
+    if os.path.exists(rotated):
+        os.remove(rotated)
+    return len(latest)
+
+
+def close():
+    sync()
+    with _lock:
+        for timer in _timers.values():
+            timer.cancel()
+        _timers.clear()
+        for f in _log_files.values():
+            f.close()
+        _log_files.clear()
+
+
+atexit.register(close)